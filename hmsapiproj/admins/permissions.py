@@ -1,23 +1,22 @@
 from rest_framework import permissions
+from apibackendapp.roles import DOCTOR, STAFF, has_role, is_admin
 
 # --- Helper Permissions ---
-# These check the User Group membership
+# These check the User Group membership.
+# Group names are resolved once per request by apibackendapp.roles.
 
 class IsAdminUser(permissions.BasePermission):
     def has_permission(self, request, view):
         # Check if user is in 'Admin' group or is a superuser
-        return request.user.is_authenticated and (
-            request.user.is_superuser or 
-            request.user.groups.filter(name='Admin').exists()
-        )
+        return is_admin(request.user)
 
 class IsDoctorUser(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.groups.filter(name='Doctor').exists()
+        return request.user.is_authenticated and has_role(request.user, DOCTOR)
 
 class IsStaffUser(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.groups.filter(name='Staff').exists()
+        return request.user.is_authenticated and has_role(request.user, STAFF)
 
 # --- ViewSet-Specific Permissions ---
 
@@ -26,10 +25,7 @@ class AdminOnlyPermissions(permissions.BasePermission):
     Allows access only to 'Admin' users or Superusers.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (
-            request.user.is_superuser or 
-            request.user.groups.filter(name='Admin').exists()
-        )
+        return is_admin(request.user)
 
 class StaffManagementPermissions(permissions.BasePermission):
     """
@@ -40,15 +36,15 @@ class StaffManagementPermissions(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
             
-        is_admin = request.user.is_superuser or request.user.groups.filter(name='Admin').exists()
-        is_staff = request.user.groups.filter(name='Staff').exists()
+        is_admin_user = is_admin(request.user)
+        is_staff = has_role(request.user, STAFF)
 
         # Allow 'Admin' or 'Staff' to view
         if request.method in permissions.SAFE_METHODS: # GET, HEAD, OPTIONS
-            return is_admin or is_staff
+            return is_admin_user or is_staff
         
         # Only 'Admin' can create, update, or delete
-        return is_admin
+        return is_admin_user
 
 class DoctorSelfViewPermissions(permissions.BasePermission):
     """
@@ -61,12 +57,12 @@ class DoctorSelfViewPermissions(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # obj is the Doctor instance
-        is_admin = request.user.is_superuser or request.user.groups.filter(name='Admin').exists()
-        is_staff = request.user.groups.filter(name='Staff').exists()
-        is_doctor = request.user.groups.filter(name='Doctor').exists()
+        is_admin_user = is_admin(request.user)
+        is_staff = has_role(request.user, STAFF)
+        is_doctor = has_role(request.user, DOCTOR)
         
         # Admin has full control
-        if is_admin:
+        if is_admin_user:
             return True
 
         # Staff can view any doctor profile
@@ -75,6 +71,7 @@ class DoctorSelfViewPermissions(permissions.BasePermission):
         
         # A doctor can view or update their *own* profile
         if is_doctor:
-            return obj.user == request.user
+            # (token users carry the id as a string claim)
+            return str(obj.user_id) == str(request.user.pk)
 
         return False
\ No newline at end of file
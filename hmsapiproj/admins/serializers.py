@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.hashers import make_password
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from apibackendapp.models import Staff, Specialization, Doctor
+from apibackendapp.authentication import add_role_claims
 
 # Basic User Serializer for nested display
 class UserSerializer(serializers.ModelSerializer):
@@ -95,4 +97,10 @@ class SignupSerializer(serializers.ModelSerializer):
 
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField()
-    password = serializers.CharField(write_only=True)
\ No newline at end of file
+    password = serializers.CharField(write_only=True)
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Used by /api/token/ so those tokens carry the same role claims as /login/."""
+    @classmethod
+    def get_token(cls, user):
+        return add_role_claims(super().get_token(user), user)
\ No newline at end of file
@@ -1,3 +1,35 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apibackendapp.models import Doctor, Specialization, Staff
+from apibackendapp.tests import ListQueryCountMixin
+
+
+class ListQueryCountTests(ListQueryCountMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin'))
+        self.added = 0
+        self.add_rows(2)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.added += 1
+            specialization = Specialization.objects.create(
+                specialization_id=f'S{self.added:03d}', specialization_name=f'Specialization {self.added}',
+            )
+            Doctor.objects.create(
+                name=f'Doctor {self.added}', specialization=specialization,
+                user=User.objects.create_user(f'doctor{self.added}'),
+            )
+            Staff.objects.create(
+                staff_id=f'ST{self.added:03d}', fullname=f'Staff {self.added}',
+                user=User.objects.create_user(f'staff{self.added}'),
+            )
+
+    def test_lists_run_fixed_queries(self):
+        self.assertListQueriesFlat(
+            self.client, ['/admins/staff/', '/admins/doctors/', '/admins/specializations/', '/admins/all-users/'],
+            lambda: self.add_rows(20),
+        )
@@ -3,12 +3,13 @@ from rest_framework import viewsets, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 
 # --- CORRECT IMPORT: Import models from apibackendapp ---
 from apibackendapp.models import Staff, Specialization, Doctor
+from apibackendapp.authentication import role_tokens_for_user
+from apibackendapp.optimizer import OptimizedQuerysetMixin
 
 from .serializers import (
     StaffSerializer, 
@@ -26,14 +27,16 @@ from .permissions import (
 )
 
 # --- Helper Function to Generate Tokens ---
+# The tokens carry the user's roles and doctor_id/staff_id as claims,
+# so requests can be served without a User lookup when STATELESS_JWT is on.
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = role_tokens_for_user(user)
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
     }
 
-class StaffViewSet(viewsets.ModelViewSet):
+class StaffViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Staff.objects.all()
     serializer_class = StaffSerializer
     
@@ -65,12 +68,12 @@ class StaffViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(serializer.data)
         return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
 
-class SpecializationViewSet(viewsets.ModelViewSet):
+class SpecializationViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Specialization.objects.all()
     serializer_class = SpecializationSerializer
     permission_classes = [StaffManagementPermissions]
 
-class DoctorViewSet(viewsets.ModelViewSet):
+class DoctorViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
 
@@ -102,7 +105,7 @@ class DoctorViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(serializer.data)
         return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AdminOnlyPermissions] 
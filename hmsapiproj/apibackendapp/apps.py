@@ -7,3 +7,4 @@ class ApibackendappConfig(AppConfig):
     # NEW: This method ensures signals.py is loaded when the app starts.
     def ready(self):
         import apibackendapp.signals
+        import apibackendapp.checks
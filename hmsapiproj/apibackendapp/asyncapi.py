@@ -0,0 +1,60 @@
+from functools import wraps
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, PermissionDenied
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .authentication import StatelessJWTAuthentication, aauthenticate_request
+from .roles import ahas_role
+
+# Async read views for the ASGI server (hmsapiproj/asgi.py). DRF views are
+# sync only, so these are plain Django async views that keep DRF's
+# authentication, permission messages, error bodies and JSON output.
+
+
+def render(data, status=200, headers=None):
+    """JSON response with the bytes DRF's JSONRenderer writes for the sync views."""
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json', headers=headers)
+
+
+def error_response(exc):
+    """Same status, body and headers as DRF's exception handler."""
+    data = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+    headers = None
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        headers = {'WWW-Authenticate': StatelessJWTAuthentication().authenticate_header(None)}
+    return render(data, exc.status_code, headers)
+
+
+async def require_role(user, *roles, superuser=True, message=None):
+    """Raises PermissionDenied unless the user has one of `roles` (or is a superuser)."""
+    if superuser and user.is_superuser:
+        return
+    if not await ahas_role(user, *roles):
+        raise PermissionDenied(message)
+
+
+def async_api_view(view):
+    """
+    Decorator for an async GET view. Authenticates the bearer token (401
+    without one), calls the view with a DRF Request so query_params and the
+    paginators work, and renders APIExceptions the way DRF does. The view
+    returns data (rendered as JSON) or an HttpResponse.
+    """
+    @require_safe
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            user = await aauthenticate_request(request)
+            if user is None:
+                raise NotAuthenticated()
+            api_request = Request(request, authenticators=())
+            api_request.user = user
+            result = await view(api_request, *args, **kwargs)
+        except APIException as exc:
+            return error_response(exc)
+        return result if isinstance(result, HttpResponse) else render(result)
+
+    return wrapper
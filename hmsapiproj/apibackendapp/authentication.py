@@ -0,0 +1,130 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Doctor, Staff
+from .roles import get_roles
+
+# Claims added to every token by role_tokens_for_user.
+ROLES_CLAIM = 'roles'
+DOCTOR_ID_CLAIM = 'doctor_id'
+STAFF_ID_CLAIM = 'staff_id'
+
+
+def stateless_jwt_enabled():
+    return getattr(settings, 'STATELESS_JWT', False)
+
+
+def add_role_claims(token, user):
+    """
+    Embeds the user's roles and profile IDs in `token`.
+    Access tokens created from this refresh token (including on
+    /api/token/refresh/) copy these claims.
+    """
+    token['username'] = user.get_username()
+    token['is_superuser'] = user.is_superuser
+    token[ROLES_CLAIM] = sorted(get_roles(user))
+    token[DOCTOR_ID_CLAIM] = Doctor.objects.filter(user=user).values_list('doctor_id', flat=True).first()
+    token[STAFF_ID_CLAIM] = Staff.objects.filter(user=user).values_list('staff_id', flat=True).first()
+    return token
+
+
+def role_tokens_for_user(user):
+    """RefreshToken.for_user() with role / profile claims attached."""
+    return add_role_claims(RefreshToken.for_user(user), user)
+
+
+class RoleTokenUser(TokenUser):
+    """
+    request.user in stateless mode: built from the token claims alone.
+    Roles are pre-loaded so apibackendapp.roles never queries the groups table.
+    """
+    def __init__(self, token):
+        super().__init__(token)
+        self._role_names = frozenset(token.get(ROLES_CLAIM, ()))
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that skips the User lookup when STATELESS_JWT is on
+    and the token carries role claims. Tokens issued without the claims
+    (or with the setting off) are authenticated against the database as usual.
+    """
+    def get_user(self, validated_token):
+        if stateless_jwt_enabled() and ROLES_CLAIM in validated_token:
+            return RoleTokenUser(validated_token)
+        return super().get_user(validated_token)
+
+    async def aget_user(self, validated_token):
+        """get_user() for async views; only the database lookup leaves the event loop."""
+        if stateless_jwt_enabled() and ROLES_CLAIM in validated_token:
+            return RoleTokenUser(validated_token)
+        return await sync_to_async(super().get_user)(validated_token)
+
+
+def _validated_token(authenticator, request, query_param):
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None and query_param:
+        raw_token = request.GET.get(query_param)
+    if not raw_token:
+        return None
+    return authenticator.get_validated_token(raw_token)
+
+
+def authenticate_request(request, query_param=None):
+    """
+    request.user for plain Django views (outside DRF): the user of the
+    Authorization: Bearer token, or of the `query_param` GET parameter
+    when given (EventSource cannot send headers). None without a token;
+    raises InvalidToken / AuthenticationFailed for a bad one.
+    """
+    authenticator = StatelessJWTAuthentication()
+    validated_token = _validated_token(authenticator, request, query_param)
+    if validated_token is None:
+        return None
+    return authenticator.get_user(validated_token)
+
+
+async def aauthenticate_request(request, query_param=None):
+    """authenticate_request() for async views."""
+    authenticator = StatelessJWTAuthentication()
+    validated_token = _validated_token(authenticator, request, query_param)
+    if validated_token is None:
+        return None
+    return await authenticator.aget_user(validated_token)
+
+
+def get_doctor_id(user):
+    """
+    Returns the doctor_id linked to `user`, or None.
+    Read from the token claim in stateless mode, otherwise looked up once per request.
+    """
+    if isinstance(user, RoleTokenUser):
+        return user.token.get(DOCTOR_ID_CLAIM)
+
+    if not hasattr(user, '_doctor_id'):
+        user._doctor_id = Doctor.objects.filter(user=user).values_list('doctor_id', flat=True).first()
+    return user._doctor_id
+
+
+async def aget_doctor_id(user):
+    """get_doctor_id() for async views."""
+    if isinstance(user, RoleTokenUser):
+        return user.token.get(DOCTOR_ID_CLAIM)
+
+    if not hasattr(user, '_doctor_id'):
+        user._doctor_id = await Doctor.objects.filter(user=user).values_list('doctor_id', flat=True).afirst()
+    return user._doctor_id
+
+
+def get_staff_id(user):
+    """Same as get_doctor_id, for the Staff profile."""
+    if isinstance(user, RoleTokenUser):
+        return user.token.get(STAFF_ID_CLAIM)
+
+    if not hasattr(user, '_staff_id'):
+        user._staff_id = Staff.objects.filter(user=user).values_list('staff_id', flat=True).first()
+    return user._staff_id
@@ -0,0 +1,136 @@
+import threading
+import uuid
+from collections import namedtuple
+
+from django.core.cache import cache
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .models import Medicine, LabTest
+
+# Kept in the shared default cache (see checks.py), so a bump reaches every process
+VERSION_KEY = 'catalog:version'
+
+# Catalogs kept in memory: model -> immutable record type with one slot per column.
+CATALOG_MODELS = (Medicine, LabTest)
+_record_types = {}
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def record_type(model):
+    """namedtuple with the model's column names (FKs as e.g. medicine_category_id)."""
+    if model not in _record_types:
+        _record_types[model] = namedtuple(
+            f'{model.__name__}Record', [field.attname for field in model._meta.concrete_fields]
+        )
+    return _record_types[model]
+
+
+def to_instance(model, record):
+    """Unsaved model instance equal to the stored row (usable as an FK value, no query)."""
+    instance = model(**record._asdict())
+    instance._state.adding = False
+    return instance
+
+
+class CatalogSnapshot:
+    """Medicines and lab tests of one catalog version, loaded with one query per table."""
+
+    def __init__(self, version):
+        self.version = version
+        self.records = {}
+        for model in CATALOG_MODELS:
+            Record = record_type(model)
+            rows = model.objects.order_by('pk').values_list(*Record._fields)
+            self.records[model] = {row[0]: Record(*row) for row in rows}
+        self._serialized = {}
+
+    def get(self, model, pk):
+        return self.records[model].get(pk)
+
+    def exists(self, model, pk):
+        return pk in self.records[model]
+
+    def serialized(self, model, serializer_class):
+        """serializer_class(many=True).data over the whole catalog, computed once per version."""
+        if serializer_class not in self._serialized:
+            instances = [to_instance(model, record) for record in self.records[model].values()]
+            self._serialized[serializer_class] = list(serializer_class(instances, many=True).data)
+        return self._serialized[serializer_class]
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Called when a Medicine or LabTest changes; every process reloads on its next read."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_catalog():
+    """
+    The current catalog snapshot of this process. Costs one cache read for
+    the version; the tables are only queried again after bump_version().
+    """
+    global _snapshot
+
+    version = get_version()
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version != version:
+        with _lock:
+            if _snapshot is None or _snapshot.version != version:
+                _snapshot = CatalogSnapshot(version)
+            snapshot = _snapshot
+    return snapshot
+
+
+class CatalogRelatedField(serializers.RelatedField):
+    """
+    Writable FK field for Medicine / LabTest that validates the submitted ID
+    against the in-memory catalog instead of querying the table per item.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Invalid pk "{pk_value}" - object does not exist.',
+        'incorrect_type': 'Incorrect type. Expected pk value, received {data_type}.',
+    }
+
+    def __init__(self, model, **kwargs):
+        self.model = model
+        if not kwargs.get('read_only'):
+            kwargs.setdefault('queryset', model.objects.all())
+        super().__init__(**kwargs)
+
+    def use_pk_only_optimization(self):
+        return True
+
+    def to_internal_value(self, data):
+        if not isinstance(data, (str, int)) or isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        record = get_catalog().get(self.model, str(data))
+        if record is None:
+            self.fail('does_not_exist', pk_value=data)
+        return to_instance(self.model, record)
+
+    def to_representation(self, value):
+        return value.pk
+
+
+class CatalogListMixin:
+    """
+    list() for Medicine / LabTest endpoints, served from the catalog snapshot.
+    The serializer output is computed once per catalog version; pagination works as before.
+    """
+    def list(self, request, *args, **kwargs):
+        data = get_catalog().serialized(self.get_queryset().model, self.get_serializer_class())
+
+        page = self.paginate_queryset(data)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(data)
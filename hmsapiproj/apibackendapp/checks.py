@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core import checks
+
+# Cache backends whose entries only exist in the process that wrote them
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+# Cache backends that read and write entries with database queries
+DATABASE_CACHES = (
+    'django.core.cache.backends.db.DatabaseCache',
+)
+
+
+def is_shared_cache(alias='default'):
+    """True when every server process reads and writes the same cache entries."""
+    return settings.CACHES.get(alias, {}).get('BACKEND') not in PROCESS_LOCAL_CACHES
+
+
+def is_database_cache(alias='default'):
+    """True when a cache hit costs a database query."""
+    return settings.CACHES.get(alias, {}).get('BACKEND') in DATABASE_CACHES
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The catalog (catalog.py) and doctor directory (reception/directory.py)
+    versions are bumped in the cache: a process-local cache would leave
+    every other worker serving its old snapshot.
+    """
+    if is_shared_cache():
+        return []
+    return [checks.Error(
+        f"CACHES['default'] uses {settings.CACHES.get('default', {}).get('BACKEND')}, which is not shared "
+        "between server processes.",
+        hint="Use DatabaseCache (python manage.py createcachetable), Redis or Memcached.",
+        id='apibackendapp.E001',
+    )]
@@ -0,0 +1,105 @@
+import random
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import Client
+
+from .metrics import registry
+
+# One endpoint of the benchmark suite. `request(rng, data)` returns
+# (path, body) for the next call; `data` is the seeded dataset (IDs).
+Scenario = namedtuple('Scenario', ['name', 'role', 'method', 'path', 'request'])
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    index = max(int(round(q / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def queries_per_request():
+    """Mean and max queries per request from the request metrics (QueryMetricsMiddleware)."""
+    endpoints = registry.snapshot().values()
+    requests = sum(stats['requests'] for stats in endpoints)
+    if not requests:
+        return None
+    total = sum(stats['queries']['mean'] * stats['requests'] for stats in endpoints)
+    return {
+        'mean': round(total / requests, 2),
+        'max': max(stats['queries']['max'] for stats in endpoints),
+    }
+
+
+def run_scenario(scenario, tokens, data, requests, concurrency, warmup=5, seed=1):
+    """
+    Sends `requests` calls of `scenario` from `concurrency` client threads,
+    each authenticated with the token of the scenario's role, and returns
+    latency, throughput, status code and queries-per-request figures.
+    """
+    clients = threading.local()
+    headers = {'HTTP_AUTHORIZATION': f'Bearer {tokens[scenario.role]}'}
+    # Request paths are drawn up front so every run sends the same sequence
+    rng = random.Random(seed)
+    calls = [scenario.request(rng, data) for _ in range(warmup + requests)]
+
+    def send(call):
+        if not hasattr(clients, 'client'):
+            clients.client = Client()
+        path, body = call
+        method = getattr(clients.client, scenario.method.lower())
+        start = time.perf_counter()
+        if body is None:
+            response = method(path, **headers)
+        else:
+            response = method(path, body, content_type='application/json', **headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return (time.perf_counter() - start) * 1000, response.status_code
+
+    for call in calls[:warmup]:
+        send(call)
+
+    registry.clear()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, calls[warmup:]))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    statuses = Counter(str(status) for _, status in results)
+    return {
+        'method': scenario.method,
+        'path': scenario.path,
+        'role': scenario.role,
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': sum(count for status, count in statuses.items() if not status.startswith('2')),
+        'status_codes': dict(sorted(statuses.items())),
+        'throughput_rps': round(requests / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'mean': round(sum(latencies) / len(latencies), 2),
+            'max': round(latencies[-1], 2),
+        },
+        'queries_per_request': queries_per_request(),
+    }
+
+
+def compare(baseline, results):
+    """Lines comparing p95 latency and throughput with a previous results file."""
+    lines = []
+    for name, current in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            lines.append(f"{name}: new")
+            continue
+        p95 = current['latency_ms']['p95'] / before['latency_ms']['p95'] - 1 if before['latency_ms']['p95'] else 0
+        rps = current['throughput_rps'] / before['throughput_rps'] - 1 if before['throughput_rps'] else 0
+        lines.append(f"{name}: p95 {p95:+.0%}, throughput {rps:+.0%}")
+    return lines
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apibackendapp.models import Patient
+from apibackendapp.search import SEARCH_KEY_FIELDS, patient_search_keys
+
+
+class Command(BaseCommand):
+    help = "Fills the Patient search key columns for rows saved before patient search (or a key) existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--all', action='store_true',
+                            help="Recompute every patient, not only those with an empty surname_key.")
+
+    def handle(self, *args, **options):
+        patients = Patient.objects.order_by('patient_id').only('patient_id', 'patient_name')
+        if not options['all']:
+            patients = patients.filter(surname_key='')
+
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = None
+        while True:
+            # Seek on the primary key so each batch is an index range scan
+            batch = patients.filter(patient_id__gt=last_id) if last_id else patients
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+
+            for patient in batch:
+                for field, value in patient_search_keys(patient.patient_name).items():
+                    setattr(patient, field, value)
+            with transaction.atomic():
+                Patient.objects.bulk_update(batch, SEARCH_KEY_FIELDS)
+
+            updated += len(batch)
+            last_id = batch[-1].patient_id
+            self.stdout.write(f"updated {updated} patients")
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {updated} patients updated."))
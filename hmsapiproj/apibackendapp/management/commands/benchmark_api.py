@@ -0,0 +1,208 @@
+import json
+import logging
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.db.models import Count
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.utils import timezone
+
+from apibackendapp.authentication import role_tokens_for_user
+from apibackendapp.loadtest import Scenario, compare, run_scenario
+from apibackendapp.models import Appointment, Doctor, LabTestReport, Patient, Staff
+from apibackendapp.roles import DOCTOR, RECEPTION, STAFF
+from apibackendapp.seeding import FIRST_NAMES, generate_dataset, seed_users
+
+SCENARIOS = [
+    # admins
+    Scenario('admins.staff-list', 'admin', 'GET', '/admins/staff/',
+             lambda rng, data: ('/admins/staff/', None)),
+    Scenario('admins.doctor-list', 'admin', 'GET', '/admins/doctors/',
+             lambda rng, data: ('/admins/doctors/', None)),
+    Scenario('admins.user-list', 'admin', 'GET', '/admins/all-users/',
+             lambda rng, data: ('/admins/all-users/', None)),
+    # reception
+    Scenario('reception.patient-list', 'reception', 'GET', '/reception/patients/?page_size=50',
+             lambda rng, data: ('/reception/patients/?page_size=50', None)),
+    Scenario('reception.patient-detail', 'reception', 'GET', '/reception/patients/<id>/',
+             lambda rng, data: (f"/reception/patients/{rng.choice(data['patients'])}/", None)),
+    Scenario('reception.patient-detail-async', 'reception', 'GET', '/reception/async/patients/<id>/',
+             lambda rng, data: (f"/reception/async/patients/{rng.choice(data['patients'])}/", None)),
+    Scenario('reception.patient-search', 'reception', 'GET', '/reception/patients/search/?q=<prefix>',
+             lambda rng, data: (f"/reception/patients/search/?q={rng.choice(FIRST_NAMES)[:3]}", None)),
+    Scenario('reception.doctor-directory', 'reception', 'GET', '/reception/doctors/',
+             lambda rng, data: ('/reception/doctors/', None)),
+    Scenario('reception.appointment-list', 'reception', 'GET', '/reception/appointments/?page_size=50',
+             lambda rng, data: ('/reception/appointments/?page_size=50', None)),
+    Scenario('reception.appointment-create', 'reception', 'POST', '/reception/appointments/',
+             lambda rng, data: ('/reception/appointments/', {
+                 'patient': rng.choice(data['patients']), 'doctor': rng.choice(data['doctors']),
+             })),
+    # doctor
+    Scenario('doctor.my-appointments', 'doctor', 'GET', '/doctor/my-appointments/?page_size=50',
+             lambda rng, data: ('/doctor/my-appointments/?page_size=50', None)),
+    Scenario('doctor.my-appointments-async', 'doctor', 'GET', '/doctor/async/my-appointments/?page_size=50',
+             lambda rng, data: ('/doctor/async/my-appointments/?page_size=50', None)),
+    Scenario('doctor.consultation-list', 'doctor', 'GET', '/doctor/consultations/',
+             lambda rng, data: ('/doctor/consultations/', None)),
+    Scenario('doctor.prescription-list', 'doctor', 'GET', '/doctor/prescriptions/',
+             lambda rng, data: ('/doctor/prescriptions/', None)),
+    Scenario('doctor.lab-reports', 'doctor', 'GET', '/doctor/lab-reports/?limit=20',
+             lambda rng, data: ('/doctor/lab-reports/?limit=20', None)),
+    Scenario('doctor.lab-reports-async', 'doctor', 'GET', '/doctor/async/lab-reports/?page_size=20',
+             lambda rng, data: ('/doctor/async/lab-reports/?page_size=20', None)),
+    # labtec
+    Scenario('labtec.labtest-list', 'staff', 'GET', '/labtec/labtests/',
+             lambda rng, data: ('/labtec/labtests/', None)),
+    Scenario('labtec.prescription-list', 'staff', 'GET', '/labtec/prescriptions/',
+             lambda rng, data: ('/labtec/prescriptions/', None)),
+    Scenario('labtec.report-detail', 'staff', 'GET', '/labtec/report/<id>/',
+             lambda rng, data: (f"/labtec/report/{rng.choice(data['reports'])}/", None)),
+    Scenario('labtec.report-batch', 'staff', 'GET', '/labtec/reports/?ids=<10 ids>',
+             lambda rng, data: (f"/labtec/reports/?ids={','.join(rng.sample(data['reports'], 10))}", None)),
+]
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway test database and drives the admins, reception, doctor and labtec "
+        "endpoints with concurrent authenticated clients. Writes p50/p95/p99 latency, throughput "
+        "and queries per request of every scenario to a JSON file. "
+        "Use --settings=hmsapiproj.settings_benchmark to run against SQLite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=5000)
+        parser.add_argument('--appointments', type=int, default=20000)
+        parser.add_argument('--doctors', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=200, help="Timed requests per scenario.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Client threads per scenario.")
+        parser.add_argument('--scenario', action='append',
+                            help="Run only scenarios whose name starts with this (repeatable), e.g. reception.")
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--baseline', help="Earlier results file to compare with.")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Keep the test database (and its seeded data) for the next run.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+        if verbosity < 2:
+            # The budget / N+1 warnings would repeat for every request; the
+            # results file has the query counts
+            logging.getLogger('apibackendapp.middleware').setLevel(logging.ERROR)
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity, interactive=False, keepdb=options['keepdb'],
+            aliases={DEFAULT_DB_ALIAS}, serialized_aliases=set(),
+        )
+        try:
+            results = self.run(options)
+        finally:
+            teardown_databases(old_config, verbosity, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+            output.write('\n')
+        self.stdout.write(f"results written to {options['output']}")
+
+        if baseline is not None:
+            for line in compare(baseline, results):
+                self.stdout.write(f"  {line}")
+
+    def run(self, options):
+        if not Appointment.objects.exists():
+            self.seed(options)
+        data = {
+            'patients': list(Patient.objects.values_list('pk', flat=True)),
+            'doctors': list(Doctor.objects.values_list('pk', flat=True)),
+            'reports': list(LabTestReport.objects.values_list('pk', flat=True)),
+        }
+        tokens = self.tokens()
+
+        selected = [
+            scenario for scenario in SCENARIOS
+            if not options['scenario'] or any(scenario.name.startswith(prefix) for prefix in options['scenario'])
+        ]
+        scenarios = {}
+        for scenario in selected:
+            result = run_scenario(
+                scenario, tokens, data, options['requests'], options['concurrency'], seed=options['seed'],
+            )
+            scenarios[scenario.name] = result
+            queries = result['queries_per_request']
+            self.stdout.write(
+                f"{scenario.name:34} {result['throughput_rps']:8.1f} req/s   "
+                f"p50 {result['latency_ms']['p50']:7.2f}   p95 {result['latency_ms']['p95']:7.2f}   "
+                f"p99 {result['latency_ms']['p99']:7.2f} ms   "
+                f"{queries['mean'] if queries else '?'} queries   {result['errors']} errors"
+            )
+
+        return {
+            'meta': {
+                'git_commit': git_commit(),
+                'created': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'dataset': {
+                    'patients': len(data['patients']),
+                    'doctors': len(data['doctors']),
+                    'appointments': Appointment.objects.count(),
+                    'lab_reports': len(data['reports']),
+                },
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'seed': options['seed'],
+            },
+            'scenarios': scenarios,
+        }
+
+    def seed(self, options):
+        generate_dataset(
+            options['appointments'], patients=options['patients'], doctors=options['doctors'],
+            days=90, seed=options['seed'], log=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+
+    def tokens(self):
+        """Access token per scenario role."""
+        users = seed_users(['bench-admin', 'bench-reception'])
+        admin = users['bench-admin']
+        admin.is_superuser = admin.is_staff = True
+        admin.save(update_fields=['is_superuser', 'is_staff'])
+        users['bench-reception'].groups.add(Group.objects.get_or_create(name=RECEPTION)[0])
+
+        # The doctor with the most appointments, and the first lab staff member
+        doctor = Doctor.objects.annotate(appointments=Count('appointment')).order_by('-appointments').first()
+        doctor.user.groups.add(Group.objects.get_or_create(name=DOCTOR)[0])
+        staff = Staff.objects.order_by('pk').first()
+        staff.user.groups.add(Group.objects.get_or_create(name=STAFF)[0])
+
+        return {
+            'admin': role_tokens_for_user(admin).access_token,
+            'reception': role_tokens_for_user(users['bench-reception']).access_token,
+            'doctor': role_tokens_for_user(doctor.user).access_token,
+            'staff': role_tokens_for_user(staff.user).access_token,
+        }
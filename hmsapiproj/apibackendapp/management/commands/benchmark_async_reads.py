@@ -0,0 +1,162 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+
+from apibackendapp.authentication import role_tokens_for_user
+from apibackendapp.models import Patient
+from reception import async_views
+from reception.views import PatientViewSet, DoctorViewSet
+
+
+@contextmanager
+def query_delay(seconds):
+    """Adds `seconds` of latency to every query on every connection, like a remote database."""
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # Fired again each time a thread's connection object reconnects
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    if not seconds:
+        yield
+        return
+    connection_created.connect(install)
+    for connection in connections.all(initialized_only=True):
+        connection.execute_wrappers.append(delay)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+        for connection in connections.all(initialized_only=True):
+            if delay in connection.execute_wrappers:
+                connection.execute_wrappers.remove(delay)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the throughput of the sync (WSGI thread pool) and async (ASGI event loop) "
+        "versions of the patient detail and doctor directory endpoints under concurrent requests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True,
+                            help="User the requests are made as (superuser or Reception member).")
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and path.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Requests in flight at once.")
+        parser.add_argument('--threads', type=int, default=8,
+                            help="Worker threads of the WSGI path (e.g. gunicorn --threads).")
+        parser.add_argument('--query-delay-ms', type=float, default=0,
+                            help="Latency added to every query to stand in for a remote MySQL server.")
+        parser.add_argument('--endpoint', choices=['patient', 'directory'], action='append',
+                            help="Endpoint to run (repeatable; default all).")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}.")
+        patient_id = Patient.objects.order_by('pk').values_list('pk', flat=True).first()
+        if patient_id is None:
+            raise CommandError("tblpatient is empty.")
+
+        token = role_tokens_for_user(user).access_token
+        factory = RequestFactory(HTTP_AUTHORIZATION=f'Bearer {token}')
+        cases = {
+            'patient': (
+                f'/reception/patients/{patient_id}/', {'pk': patient_id},
+                PatientViewSet.as_view({'get': 'retrieve'}), async_views.patient_detail,
+            ),
+            'directory': (
+                '/reception/doctors/', {},
+                DoctorViewSet.as_view({'get': 'list'}), async_views.doctor_directory,
+            ),
+        }
+
+        self.stdout.write(
+            f"{options['requests']} requests per run, {options['concurrency']} concurrent, "
+            f"{options['threads']} WSGI threads, {options['query_delay_ms']:g} ms per query"
+        )
+        with query_delay(options['query_delay_ms'] / 1000):
+            for name in options['endpoint'] or cases:
+                path, kwargs, sync_view, async_view = cases[name]
+                request = lambda: factory.get(path)
+                # Warm up caches (directory snapshot, roles) outside the timed runs
+                self.run_sync(sync_view, request, kwargs, 1, 1, 1)
+
+                wsgi = self.run_sync(sync_view, request, kwargs, options['requests'],
+                                     options['concurrency'], options['threads'])
+                asgi = asyncio.run(self.run_async(async_view, request, kwargs, options['requests'],
+                                                  options['concurrency']))
+                self.stdout.write(f"{name} ({path})")
+                self.report('wsgi', wsgi)
+                self.report('asgi', asgi)
+
+    def report(self, label, result):
+        elapsed, latencies = result
+        latencies.sort()
+        self.stdout.write(
+            f"  {label}: {len(latencies) / elapsed:8.1f} req/s   "
+            f"p50 {statistics.median(latencies):7.2f} ms   "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1]:7.2f} ms"
+        )
+
+    def run_sync(self, view, make_request, kwargs, total, concurrency, threads):
+        """`concurrency` clients served by a pool of `threads`, like a threaded WSGI worker."""
+        latencies = []
+        slots = threading.Semaphore(concurrency)
+
+        def call(sent):
+            try:
+                response = view(make_request(), **kwargs)
+                response.render()
+                if response.status_code != 200:
+                    raise CommandError(f"Got HTTP {response.status_code}: {response.content[:200]!r}")
+                latencies.append((time.perf_counter() - sent) * 1000)
+            finally:
+                # What WSGIHandler does at the end of every request
+                close_old_connections()
+                slots.release()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            futures = []
+            for _ in range(total):
+                slots.acquire()
+                futures.append(pool.submit(call, time.perf_counter()))
+            for future in futures:
+                future.result()
+        return time.perf_counter() - start, latencies
+
+    async def run_async(self, view, make_request, kwargs, total, concurrency):
+        """`concurrency` clients served by one event loop, like an ASGI worker."""
+        latencies = []
+        slots = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with slots:
+                # ASGIHandler gives each request its own context, so the sync
+                # ORM calls of concurrent requests run on separate threads
+                async with ThreadSensitiveContext():
+                    sent = time.perf_counter()
+                    response = await view(make_request(), **kwargs)
+                    if response.status_code != 200:
+                        raise CommandError(f"Got HTTP {response.status_code}: {response.content[:200]!r}")
+                    latencies.append((time.perf_counter() - sent) * 1000)
+                    await sync_to_async(close_old_connections)()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(call() for _ in range(total)))
+        return time.perf_counter() - start, latencies
@@ -0,0 +1,72 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apibackendapp.models import MedicineCategory, Medicine, MedicineStock, MedicineLot
+from apibackendapp.stock import dispense
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures FEFO dispensing latency with --lots medicine lots spread over --medicines "
+        "medicines. The data is created in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lots', type=int, default=100_000)
+        parser.add_argument('--medicines', type=int, default=1000)
+        parser.add_argument('--issues', type=int, default=1000, help="Dispenses to time.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            medicine_ids = self.create_lots(rng, options['medicines'], options['lots'])
+
+            times = []
+            for _ in range(options['issues']):
+                medicine_id = rng.choice(medicine_ids)
+                start = time.perf_counter()
+                dispense(medicine_id, rng.randint(1, 40), note='benchmark')
+                times.append((time.perf_counter() - start) * 1000)
+
+            transaction.set_rollback(True)
+
+        times.sort()
+        self.stdout.write(f"{options['issues']} dispenses over {options['lots']} lots / {options['medicines']} medicines")
+        self.stdout.write(f"  median {statistics.median(times):.2f} ms, "
+                          f"p95 {times[int(len(times) * 0.95) - 1]:.2f} ms, max {times[-1]:.2f} ms")
+
+    def create_lots(self, rng, medicines, lots):
+        today = timezone.localdate()
+        category = MedicineCategory.objects.create(medicine_category_id='BENCH', medicine_category_name='Benchmark')
+        medicine_ids = [f'BM{i:06d}' for i in range(medicines)]
+        Medicine.objects.bulk_create(
+            Medicine(medicine_id=medicine_id, medicine_name=f'Benchmark {medicine_id}', medicine_category=category)
+            for medicine_id in medicine_ids
+        )
+
+        quantities = [rng.randint(10, 200) for _ in range(lots)]
+        stock_of = [rng.randrange(medicines) for _ in range(lots)]
+        totals = [0] * medicines
+        for stock_index, quantity in zip(stock_of, quantities):
+            totals[stock_index] += quantity
+        MedicineStock.objects.bulk_create(
+            MedicineStock(medicine_stock_id=f'BS{i:06d}', medicine_id=medicine_ids[i],
+                          stock_in_hand=totals[i], re_order_level=50)
+            for i in range(medicines)
+        )
+        MedicineLot.objects.bulk_create(
+            (
+                MedicineLot(medicine_stock_id=f'BS{stock_index:06d}', lot_number=f'L{i}', quantity=quantity,
+                            expiry_date=today + timedelta(days=rng.randint(-30, 720)))
+                for i, (stock_index, quantity) in enumerate(zip(stock_of, quantities))
+            ),
+            batch_size=5000,
+        )
+        return medicine_ids
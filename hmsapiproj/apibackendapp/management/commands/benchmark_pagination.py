@@ -0,0 +1,66 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+
+from apibackendapp.models import Patient
+from apibackendapp.pagination import KeysetPagination
+from apibackendapp.seeding import seed_patients
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the latency of a deep page of the patient list (ordered by patient_name) "
+        "with LimitOffsetPagination and KeysetPagination."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help="Patients needed in tblpatient (default 1,000,000).")
+        parser.add_argument('--seed', action='store_true',
+                            help="Insert random patients until --rows is reached. Writes to the configured database!")
+        parser.add_argument('--page', type=int, default=1000, help="Page number to fetch (default 1000).")
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        existing = Patient.objects.count()
+        if existing < options['rows']:
+            if not options['seed']:
+                self.stderr.write(f"tblpatient has {existing} rows; pass --seed to insert {options['rows'] - existing} more.")
+                return
+            seed_patients(options['rows'] - existing, log=self.stdout.write)
+
+        queryset = Patient.objects.all().order_by('patient_name')
+        page_size = options['page_size']
+        offset = (options['page'] - 1) * page_size
+        factory = RequestFactory()
+
+        # Cursor pointing at the last row of the previous page (setup, not timed)
+        keyset = KeysetPagination()
+        keyset.ordering = keyset.get_ordering(queryset)
+        last_row = queryset.order_by(*keyset.order_expressions(False))[offset - 1]
+        cursor = keyset.encode_cursor(last_row, False)
+
+        offset_request = Request(factory.get('/patients/', {'limit': page_size, 'offset': offset}))
+        keyset_request = Request(factory.get('/patients/', {'page_size': page_size, 'cursor': cursor}))
+
+        offset_times = self.measure(LimitOffsetPagination, queryset, offset_request, options['repeat'])
+        keyset_times = self.measure(KeysetPagination, queryset, keyset_request, options['repeat'])
+
+        self.stdout.write(f"page {options['page']} ({page_size} rows) of {Patient.objects.count()} patients")
+        self.stdout.write(f"  limit/offset: median {statistics.median(offset_times):.2f} ms")
+        self.stdout.write(f"  keyset:       median {statistics.median(keyset_times):.2f} ms")
+
+    def measure(self, pagination_class, queryset, request, repeat):
+        times = []
+        for _ in range(repeat):
+            paginator = pagination_class()
+            start = time.perf_counter()
+            page = paginator.paginate_queryset(queryset, request)
+            paginator.get_paginated_response([patient.pk for patient in page])
+            times.append((time.perf_counter() - start) * 1000)
+        return times
@@ -0,0 +1,53 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from apibackendapp.models import Patient
+from apibackendapp.search import search_patients
+from apibackendapp.seeding import seed_patients, FIRST_NAMES, LAST_NAMES
+
+
+class Command(BaseCommand):
+    help = "Measures search_patients latency for name prefix, sounds-like, phone and date of birth queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help="Patients needed in tblpatient (default 1,000,000).")
+        parser.add_argument('--seed', action='store_true',
+                            help="Insert random patients until --rows is reached. Writes to the configured database!")
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        existing = Patient.objects.count()
+        if existing < options['rows']:
+            if not options['seed']:
+                self.stderr.write(f"tblpatient has {existing} rows; pass --seed to insert {options['rows'] - existing} more.")
+                return
+            seed_patients(options['rows'] - existing, log=self.stdout.write)
+
+        rng = random.Random(7)
+        sample = list(Patient.objects.order_by('patient_id').values('contact_info', 'date_of_birth')[:1000])
+        query_sets = {
+            "name prefix": [rng.choice(FIRST_NAMES)[:rng.randint(2, 5)] for _ in range(options['queries'])],
+            "surname prefix": [rng.choice(LAST_NAMES)[:rng.randint(3, 5)] for _ in range(options['queries'])],
+            "full name": [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(options['queries'])],
+            "sounds like": [rng.choice(['Jhon', 'Smithe', 'Sarra', 'Tommas', 'Priyah']) for _ in range(options['queries'])],
+            "phone prefix": [(rng.choice(sample)['contact_info'] or '9')[:6] for _ in range(options['queries'])],
+            "date of birth": [str(rng.choice(sample)['date_of_birth']) for _ in range(options['queries'])],
+        }
+
+        self.stdout.write(f"{Patient.objects.count()} patients, top {options['limit']} results")
+        for name, queries in query_sets.items():
+            times = []
+            for query in queries:
+                start = time.perf_counter()
+                search_patients(query, limit=options['limit'])
+                times.append((time.perf_counter() - start) * 1000)
+            times.sort()
+            self.stdout.write(
+                f"  {name:<14} median {statistics.median(times):.2f} ms, "
+                f"p95 {times[int(len(times) * 0.95) - 1]:.2f} ms"
+            )
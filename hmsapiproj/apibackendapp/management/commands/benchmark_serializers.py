@@ -0,0 +1,73 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from apibackendapp.projection import get_projection
+from labtec.views import LabTestPrescriptionView
+from reception.serializers import AppointmentDetailSerializer
+from reception.views import AppointmentViewSet
+
+# name -> (list queryset, serializer of the list)
+CASES = {
+    'reception.appointments': (lambda: AppointmentViewSet.queryset.all(), AppointmentDetailSerializer),
+    'labtec.prescriptions': (lambda: LabTestPrescriptionView.queryset.all(), LabTestPrescriptionView.serializer_class),
+}
+
+
+def timed(function, repeat):
+    """(median ms, result of the last call)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares building one list page with the DRF serializer (model instances) and with its "
+        "values() projection (apibackendapp/projection.py) for reception appointments and labtec "
+        "prescriptions, and checks both give the same JSON. Uses the rows already in the database "
+        "(see generate_dataset)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help="Rows per page.")
+        parser.add_argument('--repeat', type=int, default=50, help="Timed runs per path; the median is shown.")
+        parser.add_argument('--case', choices=list(CASES), action='append', help="Case to run (repeatable; default all).")
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        renderer = JSONRenderer()
+
+        for name in options['case'] or CASES:
+            queryset_factory, serializer_class = CASES[name]
+
+            def page():
+                # A new queryset each time; a reused one would serve its cached rows
+                return queryset_factory()[:rows]
+
+            projection = get_projection(serializer_class)
+            if not page().exists():
+                raise CommandError(f"{name}: no rows; run generate_dataset first.")
+
+            # Query + build + render, as the list view does
+            drf_ms, drf_json = timed(lambda: renderer.render(serializer_class(list(page()), many=True).data), repeat)
+            fast_ms, fast_json = timed(lambda: renderer.render(projection.serialize(projection.values(page()))), repeat)
+            if drf_json != fast_json:
+                raise CommandError(f"{name}: the projection's JSON differs from {serializer_class.__name__}.")
+
+            # Building the dicts only, from rows already fetched (related objects cached after the first run)
+            instances, values = list(page()), list(projection.values(page()))
+            drf_build_ms, _ = timed(lambda: serializer_class(instances, many=True).data, repeat)
+            fast_build_ms, _ = timed(lambda: projection.serialize(values), repeat)
+
+            self.stdout.write(
+                f"{name} ({len(instances)} rows): "
+                f"page {drf_ms:.2f} -> {fast_ms:.2f} ms ({drf_ms / fast_ms:.1f}x), "
+                f"serialize {drf_build_ms:.2f} -> {fast_build_ms:.2f} ms ({drf_build_ms / fast_build_ms:.1f}x), "
+                f"identical JSON"
+            )
@@ -0,0 +1,26 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apibackendapp.stock import expire_lots, EXPIRY_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes off every medicine lot that expired before today (or --date): "
+        "empties the lots, reduces stock and records Expiry ledger entries. Run nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Treat this day (YYYY-MM-DD) as today.")
+        parser.add_argument('--batch-size', type=int, default=EXPIRY_BATCH_SIZE,
+                            help="Lots written off per transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD.")
+
+        lots, units = expire_lots(today, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote off {lots} expired lots ({units} units)."))
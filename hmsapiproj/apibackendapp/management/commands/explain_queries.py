@@ -0,0 +1,127 @@
+import json
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Value
+from django.utils import timezone
+
+from apibackendapp.models import (
+    Patient, Doctor, Specialization, Appointment, LabTestPrescription,
+    LabTestReport, Billing, Medicine, MedicineStock, MedicineLot
+)
+from apibackendapp.pagination import KeysetPagination
+from apibackendapp.stock import reorder_report
+from apibackendapp.utils import day_bounds
+
+
+def keyset_page(queryset, page_size=100):
+    """The query KeysetPagination runs for the first page of `queryset`."""
+    paginator = KeysetPagination()
+    paginator.ordering = paginator.get_ordering(queryset)
+    return queryset.order_by(*paginator.order_expressions(False))[:page_size]
+
+
+def full_scans(plan, vendor):
+    """Names of the tables the plan reads without an index."""
+    if vendor == 'sqlite':
+        return {
+            match.group(1)
+            for match in re.finditer(r'\bSCAN (\w+)(?!\w| USING)', plan)
+        }
+    if vendor == 'postgresql':
+        return set(re.findall(r'Seq Scan on (\w+)', plan))
+    if vendor == 'mysql':
+        tables = set()
+
+        def walk(node):
+            if isinstance(node, dict):
+                if node.get('access_type') == 'ALL':
+                    tables.add(node.get('table_name'))
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value)
+
+        walk(json.loads(plan))
+        return tables
+    raise CommandError(f"EXPLAIN parsing is not implemented for {vendor}.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs EXPLAIN on the queries behind the busy endpoints and fails if any of "
+        "them reads a table without an index. Run it against a seeded database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=1000,
+                            help="Ignore full scans of tables smaller than this; planners scan tiny tables on purpose.")
+
+    def endpoint_queries(self):
+        today = timezone.localdate()
+        day_start, day_end = day_bounds(today)
+        doctor_id = Doctor.objects.values_list('pk', flat=True).first() or 'D001'
+        patient_id = Patient.objects.values_list('pk', flat=True).first() or 'P001'
+
+        return [
+            ("reception patients list",
+             keyset_page(Patient.objects.order_by('patient_name'))),
+            ("reception appointments list",
+             keyset_page(Appointment.objects.select_related('patient', 'doctor', 'doctor__specialization')
+                         .order_by('-appointment_date'))),
+            ("reception appointment token (first booking of the day)",
+             Appointment.objects.filter(doctor_id=doctor_id, appointment_date__gte=day_start,
+                                        appointment_date__lt=day_end).values('token_number')),
+            ("doctor my-appointments",
+             keyset_page(Appointment.objects.filter(doctor_id=doctor_id).order_by('-appointment_date'))),
+            ("patient appointment history",
+             keyset_page(Appointment.objects.filter(patient_id=patient_id).order_by('-appointment_date'))),
+            ("labtec prescriptions list",
+             keyset_page(LabTestPrescription.objects.order_by('-created_date'))),
+            ("labtec unbilled lab tests of a patient",
+             LabTestPrescription.objects.filter(bill__isnull=True, appointment__patient_id=patient_id)),
+            ("pending lab reports",
+             LabTestReport.objects.filter(report_status='Pending')[:100]),
+            ("overdue bills",
+             Billing.objects.filter(payment_status='Pending', due_date__lt=today)[:100]),
+            ("medicines expiring within 30 days",
+             Medicine.objects.filter(expiry_date__lte=today + timedelta(days=30))[:100]),
+            ("low medicine stock",
+             MedicineStock.objects.filter(stock_in_hand__lte=10)[:100]),
+            ("stock reorder report",
+             reorder_report()),
+            ("FEFO lot allocation",
+             MedicineLot.objects.filter(medicine_stock_id='MS001', expiry_date__gte=today, quantity__gt=0,
+                                        written_off=False).order_by('expiry_date', 'id')[:10]),
+            ("nightly lot expiry sweep",
+             MedicineLot.objects.filter(written_off=Value(False), expiry_date__lt=today).order_by('expiry_date', 'id')[:1000]),
+        ]
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        table_rows = {
+            model._meta.db_table: model.objects.count()
+            for model in (Patient, Doctor, Specialization, Appointment, LabTestPrescription,
+                          LabTestReport, Billing, Medicine, MedicineStock, MedicineLot)
+        }
+
+        failures = []
+        for name, queryset in self.endpoint_queries():
+            plan = queryset.explain(format='json') if vendor == 'mysql' else queryset.explain()
+            scanned = {
+                table for table in full_scans(plan, vendor)
+                if table_rows.get(table, options['min_rows']) >= options['min_rows']
+            }
+            if scanned:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {name}: {', '.join(sorted(scanned))}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok         {name}"))
+            if options['verbosity'] > 1:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f"{len(failures)} endpoint queries do a full table scan.")
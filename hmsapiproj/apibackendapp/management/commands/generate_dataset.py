@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apibackendapp.seeding import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a deterministic synthetic hospital history: patients, appointments, consultations, "
+        "medicine prescriptions, lab results, lab reports and bills. Writes to the configured database!"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=100_000)
+        parser.add_argument('--patients', type=int, help="Default: a quarter of --appointments.")
+        parser.add_argument('--doctors', type=int, default=50)
+        parser.add_argument('--days', type=int, default=365, help="Days of history up to today.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=10_000,
+                            help="Appointments (with their related rows) per transaction.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        generator = DatasetGenerator(
+            options['appointments'], patients=options['patients'], doctors=options['doctors'],
+            days=options['days'], seed=options['seed'], batch_size=options['batch_size'],
+            log=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        counts = generator.run()
+        for name, count in counts.items():
+            self.stdout.write(f"{name:24} {count:>12,}")
+        self.stdout.write(f"done in {time.perf_counter() - start:.1f} s")
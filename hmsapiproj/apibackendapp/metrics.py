@@ -0,0 +1,229 @@
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Width of one slice of the rolling window
+SLOT_SECONDS = 60
+# The same statement run this many times in one request is reported as N+1
+DUPLICATE_THRESHOLD = 5
+
+
+def query_budget(endpoint):
+    """Queries one request to `endpoint` may run before a warning is logged (None = no limit)."""
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    if endpoint in budgets:
+        return budgets[endpoint]
+    return getattr(settings, 'QUERY_BUDGET', None)
+
+
+def metrics_window():
+    """Seconds of requests the metrics endpoint reports on."""
+    return getattr(settings, 'QUERY_METRICS_WINDOW', 900)
+
+
+# --- per-request recording ---
+
+class QueryRecorder:
+    """Query count, DB time and statements of one request."""
+    __slots__ = ('count', 'duration', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def duplicates(self):
+        """{sql: times run} for the statements run more than once."""
+        return {sql: times for sql, times in self.statements.items() if times > 1}
+
+
+# The recorder of the request being handled. Context variables follow the
+# request into sync_to_async threads, so async views are measured too.
+_current = ContextVar('query_recorder', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    """connection.execute_wrapper function installed on every connection."""
+    recorder = _current.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.duration += time.perf_counter() - start
+        recorder.count += 1
+        # The SQL still has its %s placeholders, so N+1 lookups share one entry
+        recorder.statements[sql] += 1
+
+
+def _install(sender, connection, **kwargs):
+    # Fired each time a thread's connection (re)connects; the list outlives it
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install_query_recorder():
+    """
+    Adds _record_query to every database connection. connection.execute_wrapper()
+    as a context manager only covers the current thread's connection, while
+    async views query from other threads, hence the connection_created hook.
+    """
+    connection_created.connect(_install, dispatch_uid='apibackendapp.metrics')
+    for connection in connections.all(initialized_only=True):
+        _install(None, connection)
+
+
+def start_request():
+    recorder = QueryRecorder()
+    return recorder, _current.set(recorder)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+# --- rolling histograms ---
+
+class Histogram:
+    __slots__ = ('buckets', 'count', 'total')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        index = 0
+        while index < len(BUCKETS_MS) and value > BUCKETS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+
+    def merge(self, other):
+        for index, count in enumerate(other.buckets):
+            self.buckets[index] += count
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (None past the last bound)."""
+        if not self.count:
+            return None
+        wanted = self.count * q / 100
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return bound
+        return None
+
+    def as_dict(self):
+        labels = [f'le_{bound}' for bound in BUCKETS_MS] + [f'gt_{BUCKETS_MS[-1]}']
+        return {
+            'mean': round(self.total / self.count, 2) if self.count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': dict(zip(labels, self.buckets)),
+        }
+
+
+class EndpointStats:
+    """Totals of one endpoint for one slot (or several merged slots)."""
+    __slots__ = ('requests', 'wall', 'db', 'queries', 'max_queries', 'duplicate_queries', 'over_budget')
+
+    def __init__(self):
+        self.requests = 0
+        self.wall = Histogram()
+        self.db = Histogram()
+        self.queries = 0
+        self.max_queries = 0
+        self.duplicate_queries = 0
+        self.over_budget = 0
+
+    def add(self, wall_ms, db_ms, queries, duplicate_queries, over_budget):
+        self.requests += 1
+        self.wall.add(wall_ms)
+        self.db.add(db_ms)
+        self.queries += queries
+        self.max_queries = max(self.max_queries, queries)
+        self.duplicate_queries += duplicate_queries
+        self.over_budget += over_budget
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.wall.merge(other.wall)
+        self.db.merge(other.db)
+        self.queries += other.queries
+        self.max_queries = max(self.max_queries, other.max_queries)
+        self.duplicate_queries += other.duplicate_queries
+        self.over_budget += other.over_budget
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'queries': {
+                'mean': round(self.queries / self.requests, 2) if self.requests else None,
+                'max': self.max_queries,
+            },
+            'duplicate_queries': self.duplicate_queries,
+            'over_budget': self.over_budget,
+            'wall_ms': self.wall.as_dict(),
+            'db_ms': self.db.as_dict(),
+        }
+
+
+class MetricsRegistry:
+    """
+    Per-endpoint stats of this process over the last metrics_window()
+    seconds, kept as SLOT_SECONDS slices. Every worker process has its own.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots = deque()  # [(slot number, {endpoint: EndpointStats})]
+
+    def _expire(self, now):
+        oldest = int((now - metrics_window()) // SLOT_SECONDS)
+        while self._slots and self._slots[0][0] <= oldest:
+            self._slots.popleft()
+
+    def record(self, endpoint, wall_ms, db_ms, queries, duplicate_queries, over_budget):
+        now = time.time()
+        slot = int(now // SLOT_SECONDS)
+        with self._lock:
+            if not self._slots or self._slots[-1][0] != slot:
+                self._slots.append((slot, {}))
+                self._expire(now)
+            endpoints = self._slots[-1][1]
+            if endpoint not in endpoints:
+                endpoints[endpoint] = EndpointStats()
+            endpoints[endpoint].add(wall_ms, db_ms, queries, duplicate_queries, over_budget)
+
+    def snapshot(self):
+        """{endpoint: stats dict} merged over the window, busiest endpoint first."""
+        with self._lock:
+            self._expire(time.time())
+            merged = {}
+            for _, endpoints in self._slots:
+                for endpoint, stats in endpoints.items():
+                    if endpoint not in merged:
+                        merged[endpoint] = EndpointStats()
+                    merged[endpoint].merge(stats)
+        ordered = sorted(merged.items(), key=lambda item: -item[1].requests)
+        return {endpoint: stats.as_dict() for endpoint, stats in ordered}
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,99 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .metrics import (
+    DUPLICATE_THRESHOLD, end_request, install_query_recorder, query_budget, registry, start_request,
+)
+from .roles import is_admin
+
+logger = logging.getLogger(__name__)
+
+
+def endpoint_name(request):
+    """'GET patient-detail': method plus the URL name (the route when unnamed)."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return f'{request.method} <unresolved>'
+    return f'{request.method} {match.view_name or match.route}'
+
+
+class QueryMetricsMiddleware:
+    """
+    Measures every request: wall time, time spent in the database, number of
+    queries and statements repeated within the request (N+1 lookups).
+
+    - adds a Server-Timing header (shown in the browser's network panel),
+      only with DEBUG on or for admins: it tells anyone how long the
+      database took, which helps timing attacks
+    - adds the numbers to the per-endpoint histograms of GET metrics/
+    - logs a warning when a request runs more queries than its QUERY_BUDGET
+      or repeats one statement DUPLICATE_THRESHOLD times or more
+
+    Streaming responses are measured up to the start of the stream.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install_query_recorder()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        recorder, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, recorder, start, self.show_timing(request))
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        recorder, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        # The role lookup may need a query
+        show_timing = await sync_to_async(self.show_timing)(request)
+        return self.finish(request, response, recorder, start, show_timing)
+
+    def finish(self, request, response, recorder, start, show_timing):
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = recorder.duration * 1000
+        endpoint = endpoint_name(request)
+        duplicates = recorder.duplicates()
+
+        budget = query_budget(endpoint)
+        over_budget = budget is not None and recorder.count > budget
+        if over_budget:
+            logger.warning(
+                "%s ran %d queries (budget %d) in %.1f ms: %s",
+                endpoint, recorder.count, budget, wall_ms, request.get_full_path(),
+            )
+        for sql, times in duplicates.items():
+            if times >= DUPLICATE_THRESHOLD:
+                logger.warning("%s ran the same query %d times (N+1?): %s", endpoint, times, sql[:500])
+
+        registry.record(
+            endpoint, wall_ms, db_ms, recorder.count,
+            sum(times - 1 for times in duplicates.values()), over_budget,
+        )
+
+        if show_timing and not response.has_header('Server-Timing'):
+            response['Server-Timing'] = (
+                f'db;dur={db_ms:.1f};desc="{recorder.count} queries", '
+                f'app;dur={wall_ms - db_ms:.1f}, total;dur={wall_ms:.1f}'
+            )
+        return response
+
+    def show_timing(self, request):
+        # DRF puts the user it authenticated (bearer token) on the request
+        return settings.DEBUG or is_admin(getattr(request, 'user', None))
@@ -0,0 +1,53 @@
+from django.db import migrations, models
+
+
+# (model, primary key field, prefix) for every auto generated ID.
+ID_SEQUENCES = [
+    ('Patient', 'patient_id', 'P'),
+    ('Appointment', 'appointment_id', 'APP'),
+    ('Doctor', 'doctor_id', 'D'),
+    ('Billing', 'bill_id', 'BIL'),
+    ('LabTest', 'lab_test_id', 'LT'),
+    ('LabTestPrescription', 'lab_test_prescription_id', 'LTP'),
+    ('LabTestReport', 'report_id', 'RPT'),
+]
+
+
+def seed_id_sequences(apps, schema_editor):
+    """Start every counter at the highest number already in use (numerically, not lexically)."""
+    IdSequence = apps.get_model('apibackendapp', 'IdSequence')
+
+    for model_name, field_name, prefix in ID_SEQUENCES:
+        model = apps.get_model('apibackendapp', model_name)
+        ids = model.objects.filter(
+            **{f'{field_name}__startswith': prefix}
+        ).values_list(field_name, flat=True)
+
+        highest = 0
+        for value in ids.iterator():
+            suffix = value[len(prefix):]
+            if suffix.isdigit():
+                highest = max(highest, int(suffix))
+
+        IdSequence.objects.update_or_create(prefix=prefix, defaults={'last_value': highest})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apibackendapp', '0002_remove_systemuser_role_alter_staff_user_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('prefix', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'tblidsequence',
+            },
+        ),
+        migrations.RunPython(seed_id_sequences, migrations.RunPython.noop),
+    ]
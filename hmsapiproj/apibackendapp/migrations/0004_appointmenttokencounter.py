@@ -0,0 +1,25 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apibackendapp', '0003_idsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentTokenCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_date', models.DateField()),
+                ('last_token', models.IntegerField(default=0)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='apibackendapp.doctor')),
+            ],
+            options={
+                'db_table': 'tblappointmenttoken',
+                'unique_together': {('doctor', 'token_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_billed_prescriptions(apps, schema_editor):
+    """
+    Bills used to total every lab test the patient had on the bill date, so
+    those prescriptions are already billed: attach them to the patient's
+    latest dated bill. Tests prescribed after that bill (and those of patients
+    whose bills have no date) were never billed and stay unlinked.
+    """
+    Billing = apps.get_model('apibackendapp', 'Billing')
+    LabTestPrescription = apps.get_model('apibackendapp', 'LabTestPrescription')
+
+    latest_bill = {}
+    bills = Billing.objects.filter(bill_date__isnull=False).order_by('bill_date', 'bill_id')
+    for bill_id, patient_id, bill_date in bills.values_list('bill_id', 'patient_id', 'bill_date'):
+        latest_bill[patient_id] = (bill_id, bill_date)
+
+    for patient_id, (bill_id, bill_date) in latest_bill.items():
+        LabTestPrescription.objects.filter(
+            appointment__patient_id=patient_id, bill__isnull=True, created_date__date__lte=bill_date
+        ).update(bill_id=bill_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apibackendapp', '0004_appointmenttokencounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='labtestprescription',
+            name='bill',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='apibackendapp.billing'),
+        ),
+        migrations.RunPython(link_billed_prescriptions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apibackendapp', '0005_labtestprescription_bill'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'appointment_id'], name='appointment_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'appointment_date'], name='appointment_doctor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'appointment_date'], name='appointment_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(fields=['payment_status', 'due_date'], name='billing_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labtestprescription',
+            index=models.Index(fields=['created_date', 'lab_test_prescription_id'], name='labtestpres_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labtestreport',
+            index=models.Index(fields=['report_status'], name='labtestreport_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['expiry_date'], name='medicine_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicinestock',
+            index=models.Index(fields=['stock_in_hand'], name='medicinestock_in_hand_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['patient_name', 'patient_id'], name='patient_name_idx'),
+        ),
+    ]
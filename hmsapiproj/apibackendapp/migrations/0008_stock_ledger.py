@@ -0,0 +1,45 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def flag_below_reorder(apps, schema_editor):
+    MedicineStock = apps.get_model('apibackendapp', 'MedicineStock')
+    MedicineStock.objects.filter(stock_in_hand__lte=F('re_order_level')).update(below_reorder=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apibackendapp', '0007_patient_search_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicinestock',
+            name='below_reorder',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='medicinestock',
+            index=models.Index(fields=['below_reorder', 'medicine_stock_id'], name='medicinestock_reorder_idx'),
+        ),
+        migrations.RunPython(flag_below_reorder, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='StockLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('change', models.IntegerField()),
+                ('balance_after', models.IntegerField()),
+                ('reason', models.CharField(choices=[('Prescription', 'Prescription'), ('Dispense', 'Dispense'), ('Receipt', 'Receipt'), ('Adjustment', 'Adjustment')], max_length=20)),
+                ('note', models.CharField(blank=True, default='', max_length=255)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('medicine_prescription', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='apibackendapp.medicineprescription')),
+                ('medicine_stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='apibackendapp.medicinestock')),
+            ],
+            options={
+                'db_table': 'tblstockledger',
+                'indexes': [models.Index(fields=['medicine_stock', 'created_date'], name='stockledger_stock_date_idx')],
+            },
+        ),
+    ]
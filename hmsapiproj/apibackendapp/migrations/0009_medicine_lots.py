@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apibackendapp', '0008_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MedicineLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lot_number', models.CharField(blank=True, default='', max_length=50)),
+                ('expiry_date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('received_date', models.DateTimeField(auto_now_add=True)),
+                ('written_off', models.BooleanField(default=False)),
+                ('medicine_stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='apibackendapp.medicinestock')),
+            ],
+            options={
+                'db_table': 'tblmedicinelot',
+                'indexes': [
+                    models.Index(fields=['medicine_stock', 'expiry_date', 'id'], name='medicinelot_fefo_idx'),
+                    models.Index(fields=['written_off', 'expiry_date'], name='medicinelot_expiry_idx'),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name='stockledgerentry',
+            name='medicine_lot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='apibackendapp.medicinelot'),
+        ),
+        migrations.AlterField(
+            model_name='stockledgerentry',
+            name='reason',
+            field=models.CharField(choices=[('Prescription', 'Prescription'), ('Dispense', 'Dispense'), ('Receipt', 'Receipt'), ('Adjustment', 'Adjustment'), ('Expiry', 'Expiry')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apibackendapp', '0009_medicine_lots'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(fields=['patient', 'bill_date', 'bill_id'], name='billing_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labtestreport',
+            index=models.Index(fields=['patient', 'report_date', 'report_id'], name='labtestreport_patient_date_idx'),
+        ),
+    ]
@@ -10,9 +10,6 @@ from django.contrib.auth.models import User
 #
 # The 'Staff' and 'Doctor' models have been updated to link
 # to the standard django.contrib.auth.models.User.
-from django.db.models.signals import pre_save
-from django.dispatch import receiver
-from .utils import generate_id
 
 # Note: We are creating a custom user model 'SystemUser' to match your 'tblUser' table.
 # In a standard new Django project, we would usually use django.contrib.auth.models.User.
@@ -88,9 +85,25 @@ class Patient(models.Model):
     contact_info = models.CharField(max_length=10, null=True, blank=True)
     address = models.CharField(max_length=500, null=True, blank=True)
     blood_group = models.CharField(max_length=10, null=True, blank=True)
+    # Search keys, filled from patient_name on save (see apibackendapp/search.py)
+    name_key = models.CharField(max_length=255, blank=True, default='', editable=False)
+    name_phonetic = models.CharField(max_length=255, blank=True, default='', editable=False)
+    surname_key = models.CharField(max_length=255, blank=True, default='', editable=False)
+    surname_phonetic = models.CharField(max_length=255, blank=True, default='', editable=False)
 
     class Meta:
         db_table = 'tblpatient'
+        indexes = [
+            # Patient lists are ordered by name (+ pk as the keyset tiebreaker)
+            models.Index(fields=['patient_name', 'patient_id'], name='patient_name_idx'),
+            # Patient search: name prefix, sounds-like, phone prefix, date of birth
+            models.Index(fields=['name_key', 'patient_id'], name='patient_name_key_idx'),
+            models.Index(fields=['name_phonetic', 'patient_id'], name='patient_phonetic_idx'),
+            models.Index(fields=['surname_key', 'patient_id'], name='patient_surname_key_idx'),
+            models.Index(fields=['surname_phonetic', 'patient_id'], name='patient_surname_phon_idx'),
+            models.Index(fields=['contact_info'], name='patient_contact_idx'),
+            models.Index(fields=['date_of_birth'], name='patient_dob_idx'),
+        ]
 
     def __str__(self):
         return self.patient_name
@@ -105,6 +118,12 @@ class Appointment(models.Model):
 
     class Meta:
         db_table = 'tblappointment'
+        indexes = [
+            # Reception list (newest first), a doctor's day / queue, a patient's history
+            models.Index(fields=['appointment_date', 'appointment_id'], name='appointment_date_idx'),
+            models.Index(fields=['doctor', 'appointment_date'], name='appointment_doctor_date_idx'),
+            models.Index(fields=['patient', 'appointment_date'], name='appointment_patient_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.appointment_id} - {self.patient.patient_name}"
@@ -129,6 +148,9 @@ class Medicine(models.Model):
 
     class Meta:
         db_table = 'tblmedicine'
+        indexes = [
+            models.Index(fields=['expiry_date'], name='medicine_expiry_idx'),
+        ]
 
     def __str__(self):
         return self.medicine_name
@@ -160,9 +182,65 @@ class MedicineStock(models.Model):
     stock_in_hand = models.IntegerField(default=0)
     re_order_level = models.IntegerField(default=0)
     medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE)
+    # stock_in_hand <= re_order_level, kept up to date by every stock movement
+    # (apibackendapp/stock.py) and on save, so the reorder report is an index lookup
+    below_reorder = models.BooleanField(default=False, editable=False)
 
     class Meta:
         db_table = 'tblmedicinestock'
+        indexes = [
+            models.Index(fields=['stock_in_hand'], name='medicinestock_in_hand_idx'),
+            models.Index(fields=['below_reorder', 'medicine_stock_id'], name='medicinestock_reorder_idx'),
+        ]
+
+class MedicineLot(models.Model):
+    # One delivered batch of a medicine with its own expiry. Issues take from
+    # the lot that expires first (apibackendapp/stock.py); expired lots are
+    # written off by the expire_medicine_lots command.
+    medicine_stock = models.ForeignKey(MedicineStock, on_delete=models.CASCADE)
+    lot_number = models.CharField(max_length=50, blank=True, default='')
+    expiry_date = models.DateField()
+    quantity = models.IntegerField(default=0)
+    received_date = models.DateTimeField(auto_now_add=True)
+    written_off = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'tblmedicinelot'
+        indexes = [
+            # FEFO: a stock row's lots by expiry
+            models.Index(fields=['medicine_stock', 'expiry_date', 'id'], name='medicinelot_fefo_idx'),
+            # Expiry sweep: lots not written off yet, by expiry
+            models.Index(fields=['written_off', 'expiry_date'], name='medicinelot_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.medicine_stock_id} {self.lot_number} ({self.expiry_date})"
+
+class StockLedgerEntry(models.Model):
+    # Every change to MedicineStock.stock_in_hand, written in the same
+    # transaction as the change (apibackendapp/stock.py).
+    PRESCRIPTION = 'Prescription'
+    DISPENSE = 'Dispense'
+    RECEIPT = 'Receipt'
+    ADJUSTMENT = 'Adjustment'
+    EXPIRY = 'Expiry'
+    REASONS = [(reason, reason) for reason in (PRESCRIPTION, DISPENSE, RECEIPT, ADJUSTMENT, EXPIRY)]
+
+    medicine_stock = models.ForeignKey(MedicineStock, on_delete=models.CASCADE)
+    # The lot the units came from / went to (None for stock not tracked in lots)
+    medicine_lot = models.ForeignKey(MedicineLot, on_delete=models.SET_NULL, null=True, blank=True)
+    change = models.IntegerField()  # negative when stock is issued
+    balance_after = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASONS)
+    medicine_prescription = models.ForeignKey(MedicinePrescription, on_delete=models.SET_NULL, null=True, blank=True)
+    note = models.CharField(max_length=255, blank=True, default='')
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'tblstockledger'
+        indexes = [
+            models.Index(fields=['medicine_stock', 'created_date'], name='stockledger_stock_date_idx'),
+        ]
 
 class LabTest(models.Model):
     lab_test_id = models.CharField(max_length=10, primary_key=True, blank=True)
@@ -179,16 +257,6 @@ class LabTest(models.Model):
         return self.lab_test_name
 
 
-@receiver(pre_save, sender=LabTest)
-def auto_id_labtest(sender, instance, **kwargs):
-    if not instance.lab_test_id:
-        instance.lab_test_id = generate_id(
-            prefix="LT",
-            model=LabTest,
-            field_name="lab_test_id"
-        )
-
-
 class LabTestPrescription(models.Model):
     lab_test_prescription_id = models.CharField(max_length=10, primary_key=True)
     lab_test = models.ForeignKey(LabTest, on_delete=models.CASCADE)
@@ -196,9 +264,15 @@ class LabTestPrescription(models.Model):
     created_date = models.DateTimeField(auto_now_add=True)
     remarks = models.TextField(null=True, blank=True)
     appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE)
+    # Set when the test is billed (labtec/billing.py), so it is never billed twice
+    bill = models.ForeignKey('Billing', on_delete=models.SET_NULL, null=True, blank=True)
 
     class Meta:
         db_table = 'tblLabtestprescription'
+        indexes = [
+            # Lab prescription lists are ordered by newest first (+ pk tiebreaker)
+            models.Index(fields=['created_date', 'lab_test_prescription_id'], name='labtestpres_created_idx'),
+        ]
 
 class Billing(models.Model):
     bill_id = models.CharField(max_length=10, primary_key=True)
@@ -210,6 +284,12 @@ class Billing(models.Model):
 
     class Meta:
         db_table = 'tblbilling'
+        indexes = [
+            # Outstanding bills: payment_status = ... AND due_date < ...
+            models.Index(fields=['payment_status', 'due_date'], name='billing_status_due_idx'),
+            # A patient's bills by date (patient timeline)
+            models.Index(fields=['patient', 'bill_date', 'bill_id'], name='billing_patient_date_idx'),
+        ]
 
 class LabTestReport(models.Model):
     report_id = models.CharField(max_length=10, primary_key=True)
@@ -222,4 +302,36 @@ class LabTestReport(models.Model):
     report_status = models.CharField(max_length=20, default='Pending')
 
     class Meta:
-        db_table = 'tblLabtestreport'
\ No newline at end of file
+        db_table = 'tblLabtestreport'
+        indexes = [
+            models.Index(fields=['report_status'], name='labtestreport_status_idx'),
+            # A patient's reports by date (patient timeline)
+            models.Index(fields=['patient', 'report_date', 'report_id'], name='labtestreport_patient_date_idx'),
+        ]
+
+
+class IdSequence(models.Model):
+    # One counter row per ID prefix (e.g. 'P', 'APP'). Rows are bumped by
+    # apibackendapp.utils.allocate_ids, which hands out IDs in blocks.
+    prefix = models.CharField(max_length=10, primary_key=True)
+    last_value = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'tblidsequence'
+
+    def __str__(self):
+        return f"{self.prefix}:{self.last_value}"
+
+class AppointmentTokenCounter(models.Model):
+    # Last token number handed out for a doctor on a given day.
+    # Bumped atomically by apibackendapp.utils.allocate_token_numbers.
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE)
+    token_date = models.DateField()
+    last_token = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'tblappointmenttoken'
+        unique_together = ('doctor', 'token_date')
+
+    def __str__(self):
+        return f"{self.doctor_id} {self.token_date}: {self.last_token}"
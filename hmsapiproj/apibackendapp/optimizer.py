@@ -0,0 +1,160 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+class QueryPlan:
+    """
+    What a serializer reads from its model instances:
+    - select: forward FKs / one-to-ones to join (select_related)
+    - prefetch: reverse and many-to-many relations, and anything below them (prefetch_related)
+    - only: the columns of the main query, or None when a field may read
+      anything (SerializerMethodField, properties, unknown sources)
+    """
+    def __init__(self):
+        self.select = []
+        self.prefetch = []
+        self.only = []
+
+    def add(self, kind, path):
+        paths = getattr(self, kind)
+        if paths is not None and path not in paths:
+            paths.append(path)
+
+
+def _join(prefix, name):
+    return f'{prefix}__{name}' if prefix else name
+
+
+def _is_forward(model_field):
+    return model_field.concrete and (model_field.many_to_one or model_field.one_to_one)
+
+
+def collect(serializer, model, plan, prefix='', prefetched=False):
+    """Adds what `serializer` reads from `model` (reached by `prefix`) to `plan`."""
+    for field in serializer._readable_fields:
+        child = field.child if isinstance(field, serializers.ListSerializer) else field
+        nested = isinstance(child, serializers.BaseSerializer)
+
+        if field.source == '*':
+            if nested:
+                collect(child, model, plan, prefix, prefetched)
+            elif not prefetched:
+                plan.only = None
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            if not prefetched:
+                plan.only = None
+            continue
+
+        current_model, path, under_prefetch = model, prefix, prefetched
+        for index, attr in enumerate(field.source_attrs):
+            last = index == len(field.source_attrs) - 1
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # A property or to_attr: whatever it reads is unknown
+                if not under_prefetch:
+                    plan.only = None
+                break
+            path_to_field = _join(path, attr)
+
+            if not model_field.is_relation:
+                if not under_prefetch:
+                    plan.add('only', path_to_field)
+                break
+            if last and not nested and not isinstance(field, ManyRelatedField):
+                # PK-only related field: the FK column itself
+                if isinstance(field, RelatedField) and field.use_pk_only_optimization() and _is_forward(model_field):
+                    if not under_prefetch:
+                        plan.add('only', path_to_field)
+                elif not under_prefetch:
+                    plan.only = None
+                break
+
+            if _is_forward(model_field) and not under_prefetch:
+                plan.add('select', path_to_field)
+                plan.add('only', path_to_field)
+            else:
+                under_prefetch = True
+                plan.add('prefetch', path_to_field)
+            current_model, path = model_field.related_model, path_to_field
+
+            if last and nested:
+                collect(child, current_model, plan, path, under_prefetch)
+
+
+_plans = {}
+
+
+def query_plan(serializer_class):
+    """The QueryPlan of a serializer class (worked out on first use)."""
+    plan = _plans.get(serializer_class)
+    if plan is None:
+        plan = QueryPlan()
+        collect(serializer_class(), serializer_class.Meta.model, plan)
+        _plans[serializer_class] = plan
+    return plan
+
+
+def _select_related_paths(selected, prefix=''):
+    paths = []
+    for name, nested in selected.items():
+        path = _join(prefix, name)
+        paths.append(path)
+        paths.extend(_select_related_paths(nested, path))
+    return paths
+
+
+def _ordering_fields(queryset):
+    """Field names of the queryset's ordering (keyset cursors read them from the rows)."""
+    names = []
+    for name in queryset.query.order_by or queryset.model._meta.ordering:
+        if not isinstance(name, str):
+            continue
+        try:
+            names.append(queryset.model._meta.get_field(name.lstrip('-')).name)
+        except FieldDoesNotExist:
+            pass
+    return names
+
+
+def optimize_queryset(queryset, serializer_class, defer=True):
+    """
+    `queryset` with the joins and prefetches `serializer_class` needs, and
+    with defer=True only the columns it reads (plus the ordering columns).
+    """
+    plan = query_plan(serializer_class)
+    existing = queryset.query.select_related
+    unknown_prefetch = any(lookup not in plan.prefetch for lookup in queryset._prefetch_related_lookups)
+    if plan.select:
+        queryset = queryset.select_related(*plan.select)
+    if plan.prefetch:
+        queryset = queryset.prefetch_related(*plan.prefetch)
+
+    # only() is skipped when the queryset already joins, prefetches or defers something the plan does not know
+    if existing is True or (existing and not set(_select_related_paths(existing)) <= set(plan.select)):
+        return queryset
+    if unknown_prefetch:
+        return queryset
+    if not defer or plan.only is None or queryset.query.deferred_loading != (frozenset(), True):
+        return queryset
+    return queryset.only(queryset.model._meta.pk.name, *plan.only, *_ordering_fields(queryset))
+
+
+class OptimizedQuerysetMixin:
+    """
+    get_queryset() with the select_related / prefetch_related the view's
+    serializer needs, so lists run a fixed number of queries whatever
+    their length. Reads (GET/HEAD/OPTIONS) also load only the columns the
+    serializer shows; writes load whole rows, as save() would skip
+    deferred fields that a pre_save receiver fills in.
+
+    The plan is worked out once per serializer class, from its default
+    fields; serializers that swap fields per request are planned as declared.
+    """
+    def get_queryset(self):
+        return optimize_queryset(
+            super().get_queryset(), self.get_serializer_class(), defer=self.request.method in SAFE_METHODS,
+        )
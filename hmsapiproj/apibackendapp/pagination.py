@@ -0,0 +1,251 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.db import connection
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework import pagination
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class LimitOffsetPagination(pagination.LimitOffsetPagination):
+    """
+    DRF's LimitOffsetPagination (the DEFAULT_PAGINATION_CLASS) with the
+    apaginate_queryset() / get_paginated_data() pair of KeysetPagination,
+    so an async view pages and renders a list exactly like its sync view.
+    """
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset() for async views (`request` is a DRF Request)."""
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [row async for row in queryset[self.offset:self.offset + self.limit]]
+
+    def get_paginated_data(self, data):
+        return self.get_paginated_response(data).data
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination for large lists.
+
+    Uses the queryset's own order_by() (e.g. 'patient_name' or '-appointment_date')
+    plus the primary key as a tiebreaker, so rows with equal names/dates are
+    never skipped or repeated. Each page is fetched with a WHERE on the last
+    row's values instead of an OFFSET, so page 1000 costs the same as page 1.
+
+    Cursors are opaque strings returned in `next` / `previous`.
+    COUNT(*) is skipped unless the client asks for it with ?count=true.
+    NULLs sort as the smallest value on every database.
+    values() querysets work too (see apibackendapp.projection); the ordering
+    columns are added to their projection for the cursors.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_query = self.page_query(queryset, request)
+        if page_query is None:
+            return None
+        self.count = queryset.count() if self.include_count(request) else None
+        return self.set_page(list(page_query))
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset() for async views (`request` is a DRF Request)."""
+        page_query = self.page_query(queryset, request)
+        if page_query is None:
+            return None
+        self.count = await queryset.acount() if self.include_count(request) else None
+        return self.set_page([row async for row in page_query])
+
+    def page_query(self, queryset, request):
+        """The query for the requested page (one row more than the page size)."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.ordering = self.get_ordering(queryset)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor['reverse'])
+        if self.cursor:
+            queryset = queryset.filter(self.seek_filter(self.cursor['values'], reverse))
+        if queryset.query.values_select:
+            missing = [field.attname for field, _ in self.ordering if field.attname not in queryset.query.values_select]
+            if missing:
+                queryset = queryset.values(*queryset.query.values_select, *missing)
+        return queryset.order_by(*self.order_expressions(reverse))[:self.page_size + 1]
+
+    def set_page(self, rows):
+        """Trims the rows page_query() returned to the page and works out next / previous."""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.cursor and self.cursor['reverse']:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_data(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return response
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # --- settings from the request ---
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def include_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    # --- ordering ---
+
+    def get_ordering(self, queryset):
+        """
+        [(model field, descending), ...] from the queryset ordering,
+        always ending with the primary key.
+        """
+        opts = queryset.model._meta
+        names = list(queryset.query.order_by or opts.ordering)
+
+        ordering = []
+        for name in names:
+            if not isinstance(name, str):
+                raise ImproperlyConfigured("KeysetPagination only supports ordering by field names.")
+            descending = name.startswith('-')
+            try:
+                field = opts.get_field(name.lstrip('-'))
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"KeysetPagination cannot order by '{name}': only fields of {opts.object_name} are supported."
+                )
+            ordering.append((field, descending))
+
+        if not any(field.primary_key for field, _ in ordering):
+            # Tiebreaker in the same direction as the last ordering field
+            ordering.append((opts.pk, ordering[-1][1] if ordering else False))
+        return ordering
+
+    def order_expressions(self, reverse):
+        # MySQL and SQLite already sort NULLs as the smallest value; asking for
+        # it explicitly there makes Django emulate it and the index goes unused.
+        explicit_nulls = connection.features.nulls_order_largest
+        expressions = []
+        for field, descending in self.ordering:
+            if descending ^ reverse:
+                expressions.append(F(field.attname).desc(nulls_last=explicit_nulls or None))
+            else:
+                expressions.append(F(field.attname).asc(nulls_first=explicit_nulls or None))
+        return expressions
+
+    def seek_filter(self, values, reverse):
+        """Rows strictly after (or before, when reverse) the given ordering values."""
+        conditions = []
+        equal = Q()
+        for (field, descending), value in zip(self.ordering, values):
+            beyond = self._beyond(field.attname, descending ^ reverse, value)
+            if beyond is not None:
+                conditions.append(equal & beyond)
+            equal &= Q(**{f'{field.attname}__isnull': True}) if value is None else Q(**{field.attname: value})
+        if not conditions:
+            return Q(pk__in=[])
+        return reduce(or_, conditions)
+
+    def _beyond(self, name, descending, value):
+        if descending:
+            if value is None:
+                return None  # nothing sorts below NULL
+            return Q(**{f'{name}__lt': value}) | Q(**{f'{name}__isnull': True})
+        if value is None:
+            return Q(**{f'{name}__isnull': False})
+        return Q(**{f'{name}__gt': value})
+
+    # --- cursors ---
+
+    def encode_cursor(self, obj, reverse):
+        if isinstance(obj, dict):
+            # A values() row: value_to_string() needs an instance
+            obj = self.ordering[0][0].model(**{field.attname: obj[field.attname] for field, _ in self.ordering})
+        values = []
+        for field, _ in self.ordering:
+            value = field.value_from_object(obj)
+            values.append(None if value is None else field.value_to_string(obj))
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            raw_values = payload['v']
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+            values = [
+                None if value is None else field.to_python(value)
+                for (field, _), value in zip(self.ordering, raw_values)
+            ]
+            return {'values': values, 'reverse': bool(payload.get('r'))}
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1], False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if not self.page:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[0], True))
@@ -0,0 +1,17 @@
+from rest_framework import permissions
+from .roles import ADMIN, STAFF, has_role
+
+
+class IsPharmacyStaff(permissions.BasePermission):
+    """
+    Medicine stock (dispensing, receipts, ledger, reorder report) is handled
+    by members of the 'Staff' or 'Admin' groups.
+    """
+    message = 'Access denied. You must be a member of the Staff or Admin group.'
+
+    def has_permission(self, request, view):
+        if not request.user.is_authenticated:
+            return False
+        if request.user.is_superuser:
+            return True
+        return has_role(request.user, STAFF, ADMIN)
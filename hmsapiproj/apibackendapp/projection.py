@@ -0,0 +1,139 @@
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import models
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject, RelatedField
+from rest_framework.response import Response
+
+# DRF fields whose to_representation() returns values of these model
+# fields unchanged (str(str), int(int), bool(bool)); they are copied as is.
+PASSTHROUGH = {
+    serializers.CharField: (models.CharField, models.TextField),
+    serializers.IntegerField: (models.IntegerField,),
+    serializers.BooleanField: (models.BooleanField,),
+}
+
+
+class Projection:
+    """
+    Read-only fast path for a ModelSerializer: the rows come from
+    queryset.values() and are turned into the same dicts the serializer
+    would produce, without model instances or DRF's per-field machinery.
+
+    The serializer is compiled once into a plan of (key, values() path,
+    converter) entries. Converters are the serializer fields' own
+    to_representation(), so dates, decimals and PKs are formatted
+    identically. Supported: model fields, pk-only related fields,
+    dotted sources (e.g. source="doctor.name") and nested read-only
+    serializers of forward relations. Anything else (SerializerMethodField,
+    many=True, source="*") raises ImproperlyConfigured at compile time.
+    """
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.paths = []
+        self.plan = self.compile(serializer_class(), self.model, '')
+
+    def compile(self, serializer, model, prefix):
+        plan = []
+        for field in serializer._readable_fields:
+            if field.source == '*' or isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+                raise self.unsupported(serializer, field)
+
+            path = prefix + '__'.join(field.source_attrs)
+            model_field, related_model = self.resolve(model, field.source_attrs, serializer, field)
+
+            if isinstance(field, serializers.BaseSerializer):
+                if related_model is None:
+                    raise self.unsupported(serializer, field)
+                # A null FK gives None instead of the nested object
+                guard = self.add_path(path) if model_field.null else None
+                plan.append((field.field_name, guard, None, self.compile(field, related_model, path + '__')))
+            elif isinstance(field, RelatedField):
+                if related_model is None or not field.use_pk_only_optimization():
+                    raise self.unsupported(serializer, field)
+                plan.append((field.field_name, self.add_path(path), self.pk_converter(field), None))
+            elif isinstance(field, serializers.SerializerMethodField) or model_field is None or related_model:
+                raise self.unsupported(serializer, field)
+            else:
+                passthrough = isinstance(model_field, PASSTHROUGH.get(type(field), ()))
+                plan.append((field.field_name, self.add_path(path), None if passthrough else field.to_representation, None))
+        return plan
+
+    def resolve(self, model, attrs, serializer, field):
+        """(model field, related model or None) at the end of a source like ['doctor', 'name']."""
+        model_field = related_model = None
+        for index, attr in enumerate(attrs):
+            if related_model is not None:
+                model = related_model
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise self.unsupported(serializer, field)
+            if not model_field.concrete:
+                raise self.unsupported(serializer, field)
+            related_model = model_field.related_model if model_field.many_to_one or model_field.one_to_one else None
+            if index < len(attrs) - 1 and related_model is None:
+                raise self.unsupported(serializer, field)
+        return model_field, related_model
+
+    def add_path(self, path):
+        if path not in self.paths:
+            self.paths.append(path)
+        return path
+
+    @staticmethod
+    def pk_converter(field):
+        return lambda value: field.to_representation(PKOnlyObject(value))
+
+    def unsupported(self, serializer, field):
+        return ImproperlyConfigured(
+            f"{self.serializer_class.__name__}: {type(serializer).__name__}.{field.field_name} "
+            f"({type(field).__name__}) cannot be built from queryset.values()."
+        )
+
+    def values(self, queryset):
+        """The queryset as the values() rows to_representation() expects."""
+        return queryset.prefetch_related(None).values(*self.paths)
+
+    def serialize(self, rows):
+        """[serializer(instance).data for each row], from values() rows."""
+        plan = self.plan
+        return [_build(plan, row) for row in rows]
+
+
+def _build(plan, row):
+    data = {}
+    for key, path, convert, nested in plan:
+        if nested is not None:
+            data[key] = None if path is not None and row[path] is None else _build(nested, row)
+            continue
+        value = row[path]
+        data[key] = value if convert is None or value is None else convert(value)
+    return data
+
+
+_projections = {}
+
+
+def get_projection(serializer_class):
+    """The compiled Projection of a serializer class (compiled on first use)."""
+    projection = _projections.get(serializer_class)
+    if projection is None:
+        projection = _projections[serializer_class] = Projection(serializer_class)
+    return projection
+
+
+class ProjectionListMixin:
+    """
+    list() served through the serializer's Projection: one values() query,
+    no model instances, the same JSON as the regular list(). Opt in per
+    view by adding the mixin; retrieve and writes are untouched.
+    """
+    def list(self, request, *args, **kwargs):
+        projection = get_projection(self.get_serializer_class())
+        rows = projection.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(projection.serialize(page))
+        return Response(projection.serialize(rows))
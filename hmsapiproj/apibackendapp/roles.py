@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+from .checks import is_database_cache, is_shared_cache
+
+# Group names used as roles across the admins, doctor, reception and labtec apps.
+ADMIN = 'Admin'
+DOCTOR = 'Doctor'
+STAFF = 'Staff'
+RECEPTION = 'Reception'
+
+
+def role_cache_timeout():
+    """
+    Seconds a user's group names stay in the shared cache (0 or None disables
+    it). Always 0 when the default cache is process-local: the invalidation
+    of a role change would only reach the worker that made it, and the
+    others would keep granting the removed role. Also 0 with DatabaseCache,
+    whose cache row read costs as much as the groups query it would save.
+    """
+    if not is_shared_cache() or is_database_cache():
+        return 0
+    return getattr(settings, 'ROLE_CACHE_TIMEOUT', 0)
+
+
+def _cache_key(user_id):
+    return f'user-roles:{user_id}'
+
+
+def _load_roles(user):
+    timeout = role_cache_timeout()
+    if timeout:
+        roles = cache.get(_cache_key(user.pk))
+        if roles is not None:
+            return roles
+
+    roles = frozenset(user.groups.values_list('name', flat=True))
+
+    if timeout:
+        cache.set(_cache_key(user.pk), roles, timeout)
+    return roles
+
+
+async def _aload_roles(user):
+    timeout = role_cache_timeout()
+    if timeout:
+        roles = await cache.aget(_cache_key(user.pk))
+        if roles is not None:
+            return roles
+
+    roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+
+    if timeout:
+        await cache.aset(_cache_key(user.pk), roles, timeout)
+    return roles
+
+
+def get_roles(user):
+    """
+    Returns the set of group names for `user`.
+    The groups are loaded at most once per request (stored on the user object,
+    which DRF reuses for every permission check) and optionally shared across
+    requests through the Django cache.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_role_names', None)
+    if roles is None:
+        roles = _load_roles(user)
+        user._role_names = roles
+    return roles
+
+
+async def aget_roles(user):
+    """get_roles() for async views."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_role_names', None)
+    if roles is None:
+        roles = await _aload_roles(user)
+        user._role_names = roles
+    return roles
+
+
+def has_role(user, *names):
+    """True if the user belongs to any of the given groups."""
+    return not get_roles(user).isdisjoint(names)
+
+
+async def ahas_role(user, *names):
+    """has_role() for async views."""
+    return not (await aget_roles(user)).isdisjoint(names)
+
+
+def is_admin(user):
+    """Superusers and members of the 'Admin' group."""
+    return bool(user and user.is_authenticated) and (user.is_superuser or has_role(user, ADMIN))
+
+
+def invalidate_roles(user_ids):
+    """Drops the cached group names of the given users."""
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def invalidate_group(group):
+    """Drops the cached group names of every member of `group`."""
+    if isinstance(group, Group):
+        invalidate_roles(group.user_set.values_list('pk', flat=True))
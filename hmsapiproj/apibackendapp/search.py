@@ -0,0 +1,136 @@
+import re
+import unicodedata
+from datetime import date
+
+from .models import Patient
+
+# Patient columns filled by patient_search_keys()
+SEARCH_KEY_FIELDS = ['name_key', 'name_phonetic', 'surname_key', 'surname_phonetic']
+
+# Soundex digit for each consonant; vowels, h, w and y have none.
+_SOUNDEX_CODES = {
+    letter: digit
+    for digit, letters in {
+        '1': 'bfpv', '2': 'cgjkqsxz', '3': 'dt', '4': 'l', '5': 'mn', '6': 'r',
+    }.items()
+    for letter in letters
+}
+
+
+def normalize_name(name):
+    """'  José  D'Souza ' -> 'jose dsouza' (accents, case and punctuation removed)."""
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch)).lower()
+    name = re.sub(r"[^a-z0-9\s]", '', name)
+    return ' '.join(name.split())
+
+
+def soundex(word):
+    """American Soundex code of a single word ('robert' -> 'R163')."""
+    letters = [ch for ch in word if ch.isalpha()]
+    if not letters:
+        return ''
+
+    code = letters[0].upper()
+    last = _SOUNDEX_CODES.get(letters[0], '')
+    for ch in letters[1:]:
+        digit = _SOUNDEX_CODES.get(ch, '')
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if ch not in 'hw':
+            last = digit
+    return code.ljust(4, '0')
+
+
+def phonetic_key(name):
+    """Soundex of every word of the name: 'Jon Smyth' -> 'J500 S530'."""
+    return ' '.join(filter(None, (soundex(word) for word in normalize_name(name).split())))
+
+
+def surname_first(name):
+    """'John Smith' -> 'smith john': the normalized name starting at its last word."""
+    words = normalize_name(name).split()
+    return ' '.join(words[-1:] + words[:-1])
+
+
+def patient_search_keys(patient_name):
+    """
+    The search columns stored on Patient, by field name: the normalized name
+    and its Soundex, and the same two starting at the surname, so a search
+    for 'smit' also finds 'John Smith'.
+    """
+    surname = surname_first(patient_name)
+    return {
+        'name_key': normalize_name(patient_name)[:255],
+        'name_phonetic': phonetic_key(patient_name)[:255],
+        'surname_key': surname[:255],
+        'surname_phonetic': phonetic_key(surname)[:255],
+    }
+
+
+def prefix_range(prefix):
+    """
+    {'gte': prefix, 'lt': next string} so a prefix match becomes an index
+    range scan on every database (LIKE 'x%' only uses the index on some).
+    """
+    return {'gte': prefix, 'lt': prefix[:-1] + chr(ord(prefix[-1]) + 1)}
+
+
+def _range_filter(field, prefix):
+    bounds = prefix_range(prefix)
+    return {f'{field}__gte': bounds['gte'], f'{field}__lt': bounds['lt']}
+
+
+def _top_up(results, field, prefix, limit):
+    """Adds patients whose `field` starts with `prefix` to `results`, up to `limit` in all."""
+    if not prefix or len(results) >= limit:
+        return
+    found = {patient.patient_id for patient in results}
+    results.extend(
+        Patient.objects.filter(**_range_filter(field, prefix))
+        .exclude(patient_id__in=found)
+        .order_by(field, 'patient_id')[:limit - len(results)]
+    )
+
+
+def search_patients(query, limit=20):
+    """
+    Top `limit` patients for a receptionist's search box.
+
+    - digits          -> contact_info starting with them
+    - YYYY-MM-DD      -> exact date_of_birth
+    - anything else   -> normalized name prefix, then surname prefix ('smit'
+                         finds 'John Smith'), topped up with patients whose
+                         name or surname sounds the same (Soundex prefix)
+
+    Every branch is an indexed range/equality lookup with LIMIT.
+    """
+    query = (query or '').strip()
+    if not query:
+        return []
+
+    if query.isdigit():
+        return list(
+            Patient.objects.filter(**_range_filter('contact_info', query))
+            .order_by('contact_info', 'patient_id')[:limit]
+        )
+
+    try:
+        date_of_birth = date.fromisoformat(query)
+    except ValueError:
+        date_of_birth = None
+    if date_of_birth:
+        return list(Patient.objects.filter(date_of_birth=date_of_birth).order_by('patient_id')[:limit])
+
+    name_key = normalize_name(query)
+    if not name_key:
+        return []
+
+    results = []
+    phonetic = phonetic_key(query)
+    for field, prefix in (('name_key', name_key), ('surname_key', name_key),
+                          ('name_phonetic', phonetic), ('surname_phonetic', phonetic)):
+        _top_up(results, field, prefix, limit)
+    return results
@@ -0,0 +1,457 @@
+import random
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import catalog
+from .models import (
+    Patient, Specialization, Doctor, Staff, Appointment, AppointmentTokenCounter, Consultation, MedicineCategory,
+    Medicine, MedicineStock, MedicinePrescription, LabTest, LabTestPrescription, LabTestReport, Billing,
+)
+from .search import patient_search_keys
+from .stock import reorder_flag
+from .utils import CONSULTATION_ID, MEDICINE_PRESCRIPTION_ID, allocate_ids
+
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Anjali', 'Arjun', 'Deepa', 'Divya', 'Gopal', 'Hari', 'Jon', 'John',
+    'Kavya', 'Kiran', 'Lakshmi', 'Manoj', 'Maria', 'Meera', 'Mohammed', 'Nisha', 'Priya', 'Rahul',
+    'Rajesh', 'Rekha', 'Sanjay', 'Sara', 'Sarah', 'Suresh', 'Thomas', 'Tomas', 'Vijay', 'Zara',
+]
+LAST_NAMES = [
+    'Menon', 'Nair', 'Pillai', 'Kumar', 'Sharma', 'Smith', 'Smyth', 'Joseph', 'Varghese', 'Thomas',
+    'Iyer', 'Reddy', 'Rao', 'Khan', 'George', 'Mathew', 'Abraham', 'Das', 'Gupta', 'Singh',
+]
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+SPECIALIZATIONS = [
+    'Cardiology', 'Dermatology', 'ENT', 'General Medicine', 'Gynaecology',
+    'Neurology', 'Orthopaedics', 'Paediatrics',
+]
+# (name, min_range, max_range, amount)
+LAB_TESTS = [
+    ('Haemoglobin', 12, 17, 150), ('Fasting Glucose', 70, 100, 100), ('Total Cholesterol', 125, 200, 300),
+    ('Platelet Count', 150, 450, 200), ('WBC Count', 4, 11, 120), ('Sodium', 135, 145, 180),
+    ('Potassium', 3, 5, 180), ('Urea', 7, 20, 200), ('Vitamin D', 20, 50, 900), ('ESR', 0, 20, 80),
+]
+MEDICINE_CATEGORIES = ['Analgesic', 'Antibiotic', 'Antihypertensive', 'Antidiabetic', 'Antihistamine', 'Supplement']
+# (name, category, price)
+MEDICINES = [
+    ('Paracetamol 500mg', 'Analgesic', 2), ('Ibuprofen 400mg', 'Analgesic', 4), ('Diclofenac 50mg', 'Analgesic', 5),
+    ('Amoxicillin 500mg', 'Antibiotic', 12), ('Azithromycin 500mg', 'Antibiotic', 25),
+    ('Ciprofloxacin 500mg', 'Antibiotic', 9), ('Amlodipine 5mg', 'Antihypertensive', 3),
+    ('Telmisartan 40mg', 'Antihypertensive', 8), ('Metformin 500mg', 'Antidiabetic', 3),
+    ('Glimepiride 2mg', 'Antidiabetic', 6), ('Cetirizine 10mg', 'Antihistamine', 2),
+    ('Levocetirizine 5mg', 'Antihistamine', 3), ('Vitamin D3 60000IU', 'Supplement', 30),
+    ('Calcium 500mg', 'Supplement', 5), ('Iron + Folic Acid', 'Supplement', 2),
+]
+COMPLAINTS = [
+    ('Fever and body ache', 'Viral fever'), ('Cough and sore throat', 'Upper respiratory tract infection'),
+    ('Headache', 'Tension headache'), ('High blood pressure on home check', 'Essential hypertension'),
+    ('Increased thirst and urination', 'Type 2 diabetes mellitus'), ('Knee pain', 'Osteoarthritis'),
+    ('Skin rash and itching', 'Allergic dermatitis'), ('Abdominal pain', 'Gastritis'),
+    ('Ear pain', 'Otitis media'), ('Fatigue', 'Iron deficiency anaemia'), ('Follow-up visit', 'Review'),
+]
+FREQUENCIES = ['1-0-1', '1-1-1', '1-0-0', '0-0-1', '0-1-0']
+
+
+def random_patient(rng, patient_id):
+    """An unsaved Patient with plausible random details and its search keys filled in."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    return Patient(
+        patient_id=patient_id,
+        patient_name=name,
+        **patient_search_keys(name),
+        date_of_birth=date(1940, 1, 1) + timedelta(days=rng.randrange(30000)),
+        gender=rng.choice(['Male', 'Female']),
+        contact_info=str(rng.randrange(6000000000, 9999999999)),
+        blood_group=rng.choice(BLOOD_GROUPS),
+    )
+
+
+def seed_patients(count, batch_size=10_000, seed=1, log=None):
+    """
+    Inserts `count` random patients with bulk_create (IDs reserved up front,
+    so the pre_save receivers are not needed) and returns their IDs.
+    `log` receives progress lines.
+    """
+    rng = random.Random(seed)
+    patient_ids = []
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        ids = allocate_ids(Patient, size)
+        with transaction.atomic():
+            Patient.objects.bulk_create([random_patient(rng, patient_id) for patient_id in ids])
+        patient_ids.extend(ids)
+        if log:
+            log(f"seeded {start + size}/{count} patients")
+    return patient_ids
+
+
+def _free_ids(model, prefix, count, width=3):
+    """`count` IDs like 'SP001' not used by `model` yet (for models without an ID sequence)."""
+    field = model._meta.pk.name
+    taken = set(model.objects.filter(**{f'{field}__startswith': prefix}).values_list(field, flat=True))
+    ids, number = [], 1
+    while len(ids) < count:
+        candidate = f'{prefix}{number:0{width}d}'
+        if candidate not in taken:
+            ids.append(candidate)
+        number += 1
+    return ids
+
+
+def seed_users(usernames):
+    """Users without a usable password for `usernames` (existing ones are kept); {username: User}."""
+    password = make_password(None)
+    User.objects.bulk_create([User(username=name, password=password) for name in usernames], ignore_conflicts=True)
+    return {user.username: user for user in User.objects.filter(username__in=usernames)}
+
+
+def seed_reference_data(doctors=20, staff=5, seed=1):
+    """
+    Specializations, lab tests, medicines with stock, doctors and lab staff
+    (each with a login). Returns {'doctors', 'staff', 'lab_tests', 'medicines'}: lists of IDs.
+    """
+    rng = random.Random(seed)
+    with transaction.atomic():
+        specialization_ids = _free_ids(Specialization, 'SP', len(SPECIALIZATIONS))
+        Specialization.objects.bulk_create([
+            Specialization(specialization_id=pk, specialization_name=name)
+            for pk, name in zip(specialization_ids, SPECIALIZATIONS)
+        ])
+
+        lab_test_ids = allocate_ids(LabTest, len(LAB_TESTS))
+        LabTest.objects.bulk_create([
+            LabTest(lab_test_id=pk, lab_test_name=name, min_range=low, max_range=high, amount=amount)
+            for pk, (name, low, high, amount) in zip(lab_test_ids, LAB_TESTS)
+        ])
+
+        category_ids = _free_ids(MedicineCategory, 'MC', len(MEDICINE_CATEGORIES))
+        MedicineCategory.objects.bulk_create([
+            MedicineCategory(medicine_category_id=pk, medicine_category_name=name)
+            for pk, name in zip(category_ids, MEDICINE_CATEGORIES)
+        ])
+        categories = dict(zip(MEDICINE_CATEGORIES, category_ids))
+        medicine_ids = _free_ids(Medicine, 'M', len(MEDICINES))
+        today = timezone.localdate()
+        Medicine.objects.bulk_create([
+            Medicine(
+                medicine_id=pk, medicine_name=name, price=price, medicine_category_id=categories[category],
+                manufacturing_date=today - timedelta(days=rng.randrange(30, 365)),
+                expiry_date=today + timedelta(days=rng.randrange(180, 900)),
+            )
+            for pk, (name, category, price) in zip(medicine_ids, MEDICINES)
+        ])
+        MedicineStock.objects.bulk_create([
+            MedicineStock(
+                medicine_stock_id=pk, medicine_id=medicine_id,
+                stock_in_hand=rng.randrange(0, 2000), re_order_level=rng.choice([50, 100, 200]),
+            )
+            for pk, medicine_id in zip(_free_ids(MedicineStock, 'MS', len(medicine_ids)), medicine_ids)
+        ])
+        # below_reorder is normally set by a pre_save receiver
+        MedicineStock.objects.filter(medicine_id__in=medicine_ids).update(below_reorder=reorder_flag())
+
+        doctor_ids = allocate_ids(Doctor, doctors)
+        users = seed_users([f'doctor-{pk.lower()}' for pk in doctor_ids])
+        Doctor.objects.bulk_create([
+            Doctor(
+                doctor_id=pk,
+                name=f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"[:25],
+                consultation_fee=rng.choice([300, 400, 500, 750, 1000]),
+                specialization_id=rng.choice(specialization_ids),
+                user=users[f'doctor-{pk.lower()}'],
+            )
+            for pk in doctor_ids
+        ])
+
+        staff_ids = _free_ids(Staff, 'ST', staff)
+        users = seed_users([f'staff-{pk.lower()}' for pk in staff_ids])
+        Staff.objects.bulk_create([
+            Staff(
+                staff_id=pk,
+                fullname=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                joining_date=date(2015, 1, 1) + timedelta(days=rng.randrange(3650)),
+                user=users[f'staff-{pk.lower()}'],
+            )
+            for pk in staff_ids
+        ])
+
+    # bulk_create sends no post_save, so drop the cached directory and catalog here
+    from reception.directory import bump_version
+    bump_version()
+    catalog.bump_version()
+    return {'doctors': doctor_ids, 'staff': staff_ids, 'lab_tests': lab_test_ids, 'medicines': medicine_ids}
+
+
+def random_lab_value(rng, low, high):
+    """A result around the reference range; about one in five falls outside it."""
+    spread = max(high - low, 1)
+    return str(round(rng.uniform(low - spread * 0.25, high + spread * 0.25), 1))
+
+
+# --- synthetic hospital dataset ---
+
+# Doctor load follows Zipf weights 1 / rank ** DOCTOR_SKEW
+DOCTOR_SKEW = 0.8
+# Patient k of n is picked as n * random() ** REPEAT_SKEW, so visits
+# concentrate on regulars (with 2, a quarter of the patients make half the visits)
+REPEAT_SKEW = 2.0
+# Share of a patient's visits that go to their usual doctor
+USUAL_DOCTOR_SHARE = 0.7
+# Share of past appointments that were seen, and of those that got medicines / lab tests
+CONSULTED_SHARE = 0.9
+PRESCRIPTION_SHARE = 0.7
+LAB_SHARE = 0.3
+# Relative number of appointments per weekday (Monday first)
+WEEKDAY_LOAD = (1.0, 1.0, 0.95, 0.95, 0.9, 0.7, 0.35)
+OPENING_MINUTE, CLOSING_MINUTE = 9 * 60, 17 * 60
+
+
+@contextmanager
+def keep_dates(*models):
+    """
+    Lets bulk_create store the given created dates: auto_now_add fields
+    would overwrite them with the current time. Only for seeding commands,
+    as it changes the fields for the whole process while active.
+    """
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def daily_counts(total, days, first_day, rng):
+    """Splits `total` appointments over `days` days from `first_day`, following WEEKDAY_LOAD."""
+    weights = [
+        WEEKDAY_LOAD[(first_day + timedelta(days=offset)).weekday()] * rng.uniform(0.85, 1.15)
+        for offset in range(days)
+    ]
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    # Hand the rounding remainder to the days with the largest fractions
+    by_fraction = sorted(range(days), key=lambda offset: weights[offset] * scale - counts[offset], reverse=True)
+    for offset in by_fraction[:total - sum(counts)]:
+        counts[offset] += 1
+    return counts
+
+
+class DatasetGenerator:
+    """
+    Deterministic synthetic hospital history: `appointments` appointments
+    over the `days` days up to today, with their consultations, medicine
+    prescriptions, lab results, lab reports and bills.
+
+    - a few doctors carry most of the load (DOCTOR_SKEW)
+    - regular patients come back, mostly to the same doctor (REPEAT_SKEW, USUAL_DOCTOR_SHARE)
+    - fewer visits at weekends, token numbers count up per doctor and day in time order
+
+    Rows are written with bulk_create, `batch_size` appointments (plus their
+    related rows) per transaction, with IDs reserved from tblidsequence up
+    front, so no per-row pre_save / post_save receiver runs. The same seed
+    and sizes give the same data, apart from the ID numbers.
+    """
+    def __init__(self, appointments, patients=None, doctors=50, days=365, seed=1, batch_size=10_000, log=None):
+        self.appointments = appointments
+        self.patients = patients or max(appointments // 4, 1)
+        self.doctors = doctors
+        self.days = days
+        self.seed = seed
+        self.batch_size = batch_size
+        self.log = log
+        self.rng = random.Random(seed)
+        self.counts = dict.fromkeys(
+            ['patients', 'appointments', 'consultations', 'medicine_prescriptions',
+             'lab_results', 'lab_reports', 'bills'], 0,
+        )
+
+    def run(self):
+        """Generates the dataset and returns the number of rows created per kind."""
+        reference = seed_reference_data(doctors=self.doctors, seed=self.seed)
+        self.patient_ids = seed_patients(self.patients, self.batch_size, seed=self.seed, log=self.log)
+        self.counts['patients'] = len(self.patient_ids)
+        self.prepare(reference)
+
+        today = timezone.localdate()
+        first_day = today - timedelta(days=self.days - 1)
+        self.token_offsets = self.existing_tokens(first_day)
+        self.now = timezone.localtime()
+
+        pending = []
+        with keep_dates(Consultation, LabTestPrescription, LabTestReport):
+            for offset, count in enumerate(daily_counts(self.appointments, self.days, first_day, self.rng)):
+                pending.extend(self.day_schedule(first_day + timedelta(days=offset), count))
+                if len(pending) >= self.batch_size:
+                    self.write(pending)
+                    pending = []
+            if pending:
+                self.write(pending)
+
+        self.update_token_counters(first_day)
+        self.invalidate_caches(first_day, today)
+        return self.counts
+
+    def prepare(self, reference):
+        rng = self.rng
+        self.doctor_ids = reference['doctors'][:]
+        rng.shuffle(self.doctor_ids)
+        self.doctor_weights = list(accumulate(1 / (rank + 1) ** DOCTOR_SKEW for rank in range(len(self.doctor_ids))))
+        # Each patient's usual doctor follows the same skew
+        self.usual_doctor = [self.pick_doctor() for _ in self.patient_ids]
+        rng.shuffle(self.patient_ids)
+
+        self.fees = dict(Doctor.objects.filter(pk__in=self.doctor_ids).values_list('pk', 'consultation_fee'))
+        self.lab_tests = list(
+            LabTest.objects.filter(pk__in=reference['lab_tests']).values_list('pk', 'min_range', 'max_range', 'amount')
+        )
+        self.medicines = list(Medicine.objects.filter(pk__in=reference['medicines']).values_list('pk', 'price'))
+        self.staff_ids = reference['staff']
+
+    def pick_doctor(self):
+        return self.doctor_ids[bisect(self.doctor_weights, self.rng.random() * self.doctor_weights[-1])]
+
+    def existing_tokens(self, first_day):
+        """Highest token already issued per (doctor, day) in the range, so new tokens follow on."""
+        start = timezone.make_aware(datetime.combine(first_day, time.min))
+        rows = (
+            Appointment.objects.filter(doctor_id__in=self.doctor_ids, appointment_date__gte=start)
+            .annotate(day=TruncDate('appointment_date')).values('doctor_id', 'day')
+            .annotate(last=Max('token_number')).values_list('doctor_id', 'day', 'last')
+        )
+        return {(doctor_id, day): last or 0 for doctor_id, day, last in rows}
+
+    def day_schedule(self, day, count):
+        """(datetime, doctor id, token, patient id) of one day's appointments."""
+        rng = self.rng
+        n_patients = len(self.patient_ids)
+        visits = []
+        for _ in range(count):
+            patient = int(n_patients * rng.random() ** REPEAT_SKEW)
+            doctor_id = self.usual_doctor[patient] if rng.random() < USUAL_DOCTOR_SHARE else self.pick_doctor()
+            visits.append((doctor_id, rng.randrange(OPENING_MINUTE, CLOSING_MINUTE), self.patient_ids[patient]))
+        visits.sort()
+
+        schedule = []
+        for doctor_id, minute, patient_id in visits:
+            key = (doctor_id, day)
+            self.token_offsets[key] = self.token_offsets.get(key, 0) + 1
+            moment = timezone.make_aware(datetime.combine(day, time(minute // 60, minute % 60)))
+            schedule.append((moment, doctor_id, self.token_offsets[key], patient_id))
+        return schedule
+
+    def write(self, schedule):
+        rng = self.rng
+        appointments, consultations, prescriptions, results, reports, bills = [], [], [], [], [], []
+        billed_results = []  # (result, bill) pairs, linked once the bills have IDs
+
+        for moment, doctor_id, token, patient_id in schedule:
+            appointment = Appointment(
+                appointment_date=moment, token_number=token, patient_id=patient_id, doctor_id=doctor_id,
+                consultation_status=moment < self.now and rng.random() < CONSULTED_SHARE,
+            )
+            appointments.append(appointment)
+            if not appointment.consultation_status:
+                continue
+
+            complaint, diagnosis = rng.choice(COMPLAINTS)
+            consultations.append(Consultation(
+                symptoms=complaint, diagnosis=diagnosis, appointment=appointment,
+                created_date=moment + timedelta(minutes=rng.randrange(5, 30)),
+            ))
+            amount = self.fees.get(doctor_id) or 0
+
+            if rng.random() < PRESCRIPTION_SHARE:
+                for medicine_id, price in rng.sample(self.medicines, rng.randint(1, 3)):
+                    dosage, duration = rng.choice([1, 1, 2]), rng.choice([3, 5, 7, 10, 14, 30])
+                    prescriptions.append(MedicinePrescription(
+                        medicine_id=medicine_id, dosage=dosage, duration=duration,
+                        frequency=rng.choice(FREQUENCIES), appointment=appointment,
+                    ))
+
+            bill = Billing(
+                patient_id=patient_id, bill_date=moment.date(), due_date=moment.date() + timedelta(days=15),
+                payment_status=self.payment_status(moment),
+            )
+            if rng.random() < LAB_SHARE:
+                for lab_test_id, low, high, price in rng.sample(self.lab_tests, rng.randint(1, 4)):
+                    result = LabTestPrescription(
+                        lab_test_id=lab_test_id, appointment=appointment,
+                        lab_test_value=random_lab_value(rng, low, high),
+                        created_date=moment + timedelta(hours=rng.randint(1, 6)),
+                    )
+                    results.append(result)
+                    billed_results.append((result, bill))
+                    amount += price or 0
+                reports.append(LabTestReport(
+                    appointment=appointment, patient_id=patient_id, doctor_id=doctor_id,
+                    staff_id=rng.choice(self.staff_ids),
+                    report_date=moment + timedelta(hours=rng.randint(6, 30)),
+                    report_status='Completed' if moment.date() < self.now.date() else 'Pending',
+                ))
+            bill.amount_due = Decimal(amount)
+            bills.append(bill)
+
+        for model, objects, id_format in ((Appointment, appointments, None),
+                                          (Consultation, consultations, CONSULTATION_ID),
+                                          (MedicinePrescription, prescriptions, MEDICINE_PRESCRIPTION_ID),
+                                          (LabTestPrescription, results, None), (LabTestReport, reports, None),
+                                          (Billing, bills, None)):
+            for obj, pk in zip(objects, allocate_ids(model, len(objects), id_format)):
+                obj.pk = pk
+        # Foreign keys were set from unsaved instances; copy the new IDs over
+        for obj in consultations + prescriptions + results + reports:
+            obj.appointment_id = obj.appointment.pk
+        for result, bill in billed_results:
+            result.bill_id = bill.pk
+
+        with transaction.atomic():
+            Appointment.objects.bulk_create(appointments)
+            Billing.objects.bulk_create(bills)
+            Consultation.objects.bulk_create(consultations)
+            MedicinePrescription.objects.bulk_create(prescriptions)
+            LabTestPrescription.objects.bulk_create(results)
+            LabTestReport.objects.bulk_create(reports)
+
+        for name, objects in (('appointments', appointments), ('consultations', consultations),
+                              ('medicine_prescriptions', prescriptions), ('lab_results', results),
+                              ('lab_reports', reports), ('bills', bills)):
+            self.counts[name] += len(objects)
+        if self.log:
+            self.log(f"seeded {self.counts['appointments']}/{self.appointments} appointments")
+
+    def payment_status(self, moment):
+        age = (self.now - moment).days
+        if age > 30:
+            return 'Paid' if self.rng.random() < 0.95 else 'Overdue'
+        return self.rng.choice(['Paid', 'Paid', 'Pending'])
+
+    def update_token_counters(self, first_day):
+        """Moves existing token counters past the generated tokens (days without one use MAX())."""
+        for counter in AppointmentTokenCounter.objects.filter(doctor_id__in=self.doctor_ids, token_date__gte=first_day):
+            last = self.token_offsets.get((counter.doctor_id, counter.token_date), 0)
+            if last > counter.last_token:
+                AppointmentTokenCounter.objects.filter(pk=counter.pk).update(last_token=last)
+
+    def invalidate_caches(self, first_day, last_day):
+        # bulk_create sends no post_save, so the cached lab analytics are dropped here
+        from labtec.analytics import invalidate_month, month_range
+        for month in month_range(first_day.replace(day=1), last_day.replace(day=1)):
+            invalidate_month(timezone.make_aware(datetime.combine(month, time.min)))
+
+
+def generate_dataset(appointments, **options):
+    """DatasetGenerator(appointments, **options).run()"""
+    return DatasetGenerator(appointments, **options).run()
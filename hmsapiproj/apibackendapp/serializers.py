@@ -0,0 +1,55 @@
+from rest_framework import serializers
+
+from .catalog import CatalogRelatedField
+from .models import Medicine, MedicineStock, StockLedgerEntry
+
+
+class StockMovementSerializer(serializers.Serializer):
+    """Input of the dispense / receive endpoints."""
+    medicine = CatalogRelatedField(Medicine)
+    quantity = serializers.IntegerField(min_value=1)
+    note = serializers.CharField(max_length=255, required=False, default='')
+
+
+class StockReceiptSerializer(StockMovementSerializer):
+    """A delivery; with an expiry date it is stored as a lot and issued first-expiry-first-out."""
+    lot_number = serializers.CharField(max_length=50, required=False, default='')
+    expiry_date = serializers.DateField(required=False, allow_null=True, default=None)
+
+
+class StockLedgerEntrySerializer(serializers.ModelSerializer):
+    medicine_id = serializers.CharField(source='medicine_stock.medicine_id', read_only=True)
+
+    class Meta:
+        model = StockLedgerEntry
+        fields = [
+            'id',
+            'medicine_stock',
+            'medicine_id',
+            'medicine_lot',
+            'change',
+            'balance_after',
+            'reason',
+            'medicine_prescription',
+            'note',
+            'created_date',
+        ]
+
+
+class ReorderItemSerializer(serializers.ModelSerializer):
+    medicine_name = serializers.CharField(source='medicine.medicine_name', read_only=True)
+    shortfall = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MedicineStock
+        fields = [
+            'medicine_stock_id',
+            'medicine',
+            'medicine_name',
+            'stock_in_hand',
+            're_order_level',
+            'shortfall',
+        ]
+
+    def get_shortfall(self, obj):
+        return obj.re_order_level - obj.stock_in_hand
@@ -1,74 +1,81 @@
 # apibackend/signals.py
 
-from django.db.models.signals import pre_save
+from django.contrib.auth.models import User, Group
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import Patient, Appointment, Doctor, Billing # Import all core models
-from django.db.models import Q
-
-def generate_id(prefix, model, field_name, length=3):
-    """Generates the next sequential ID (e.g., 'P001', 'A00001')."""
-    
-    # Retrieve the last record based on the field name and prefix using Q for robustness
-    last_record = model.objects.filter(
-        Q(**{f'{field_name}__startswith': prefix})
-    ).order_by(f'-{field_name}').first()
-    
-    if last_record:
-        last_id = getattr(last_record, field_name)
-        try:
-            # Extract the numeric part (e.g., '001')
-            current_num = int(last_id[len(prefix):])
-            next_num = current_num + 1
-        except ValueError:
-            next_num = 1
-    else:
-        next_num = 1
-    
-    # Format the new ID with zero-padding
-    return f'{prefix}{next_num:0{length}d}'
+from . import catalog
+from .models import Patient, Medicine, LabTest, MedicineStock
+from .roles import invalidate_roles, invalidate_group
+from .search import patient_search_keys
+from .utils import ID_SEQUENCES, next_id
 
 
 # --- SIGNAL RECEIVERS ---
 
+def auto_id(sender, instance, **kwargs):
+    """Auto-generates the primary key (P001, APP00001, LT001, ...) before saving."""
+    field_name = ID_SEQUENCES[sender].field_name
+    if not getattr(instance, field_name):
+        setattr(instance, field_name, next_id(sender))
+
+
+# One receiver for every model listed in utils.ID_SEQUENCES
+# (Patient, Appointment, Doctor, Billing, LabTest, LabTestPrescription, LabTestReport).
+for model in ID_SEQUENCES:
+    pre_save.connect(auto_id, sender=model, dispatch_uid=f'auto_id_{model._meta.model_name}')
+
+
 @receiver(pre_save, sender=Patient)
-def auto_id_patient(sender, instance, **kwargs):
-    """Auto-generates patient_id before saving."""
-    if not instance.patient_id:
-        instance.patient_id = generate_id(
-            prefix="P",
-            model=Patient,
-            field_name="patient_id",
-            length=3 # P001, P002, etc.
-        )
-
-@receiver(pre_save, sender=Appointment)
-def auto_id_appointment(sender, instance, **kwargs):
-    """Auto-generates appointment_id before saving."""
-    if not instance.appointment_id:
-        instance.appointment_id = generate_id(
-            prefix="APP",
-            model=Appointment,
-            field_name="appointment_id",
-            length=5 # A00001, A00002, etc.
-        )
-
-@receiver(pre_save, sender=Doctor)
-def auto_id_doctor(sender, instance, **kwargs):
-    """Auto-generates doctor_id before saving."""
-    if not instance.doctor_id:
-        instance.doctor_id = generate_id(
-            prefix="D",
-            model=Doctor,
-            field_name="doctor_id",
-            length=3
-        )
-@receiver(pre_save, sender=Billing )
-def auto_id_billing(sender, instance, **kwargs):
-    """Auto-generates billing_id before saving."""
-    if not instance.billing_id:
-        instance.billing_id = generate_id(
-            prefix="B",
-            model=Billing,
-            field_name="billing_id",
-            length=4 # B0001, B0002, etc.
-        )
\ No newline at end of file
+def patient_search_keys_on_save(sender, instance, **kwargs):
+    """Keeps the indexed search key columns in sync with patient_name."""
+    for field, value in patient_search_keys(instance.patient_name).items():
+        setattr(instance, field, value)
+
+
+# --- MEDICINE STOCK ---
+
+@receiver(pre_save, sender=MedicineStock)
+def stock_reorder_flag_on_save(sender, instance, **kwargs):
+    """Direct edits (admin, stock counts) keep the indexed below_reorder flag right."""
+    instance.below_reorder = instance.stock_in_hand <= instance.re_order_level
+
+
+# --- ROLE CACHE INVALIDATION ---
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Clears cached roles when users are added to / removed from groups (either side)."""
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+
+    if not reverse:
+        # user.groups.add(...) / remove(...) / clear()
+        instance.__dict__.pop('_role_names', None)
+        invalidate_roles([instance.pk])
+    elif action == 'pre_clear':
+        # group.user_set.clear(): pk_set is empty, so collect the members first
+        invalidate_group(instance)
+    elif pk_set:
+        # group.user_set.add(...) / remove(...)
+        invalidate_roles(pk_set)
+
+
+@receiver(post_save, sender=Group)
+def group_renamed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_group(instance)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_group(instance)
+
+
+# --- CATALOG SNAPSHOT INVALIDATION ---
+
+@receiver([post_save, post_delete], sender=Medicine)
+@receiver([post_save, post_delete], sender=LabTest)
+def catalog_changed(sender, instance, **kwargs):
+    # After commit, so no process can reload the old rows under the new version
+    transaction.on_commit(catalog.bump_version)
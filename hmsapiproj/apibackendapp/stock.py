@@ -0,0 +1,274 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import BooleanField, Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import MedicineStock, MedicineLot, StockLedgerEntry
+
+# Lots locked and read per query while allocating an issue
+FEFO_BATCH_SIZE = 10
+# Expired lots written off per transaction by expire_lots
+EXPIRY_BATCH_SIZE = 1000
+
+# Boolean columns are filtered with =Value(...): Django writes a plain flag=True
+# as "WHERE flag" / "WHERE NOT flag", which databases cannot seek an index with.
+
+
+def stock_id_for(medicine_id):
+    """The MedicineStock row a medicine is issued from / received into (its oldest)."""
+    stock_id = (
+        MedicineStock.objects.filter(medicine_id=medicine_id)
+        .order_by('pk').values_list('pk', flat=True).first()
+    )
+    if stock_id is None:
+        raise serializers.ValidationError({'medicine': [f'No stock is kept for medicine "{medicine_id}".']})
+    return stock_id
+
+
+def reorder_flag():
+    """below_reorder computed from the current row values."""
+    return Case(
+        When(stock_in_hand__lte=F('re_order_level'), then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
+
+
+def take_from_lots(stock_id, quantity, today=None):
+    """
+    First-expiry-first-out: takes up to `quantity` units from the unexpired
+    lots of a stock row, earliest expiry first, and returns [(lot id, units)].
+    Reads FEFO_BATCH_SIZE lots at a time through medicinelot_fefo_idx and
+    locks only those. Call inside the transaction that holds the stock row.
+    """
+    today = today or timezone.localdate()
+    candidates = (
+        MedicineLot.objects.select_for_update()
+        .filter(medicine_stock_id=stock_id, expiry_date__gte=today, quantity__gt=0, written_off=False)
+        .order_by('expiry_date', 'id')
+        .values_list('id', 'quantity')
+    )
+
+    taken = []
+    while quantity > 0:
+        # Lots emptied below drop out of the filter, so this reads the next ones
+        batch = list(candidates[:FEFO_BATCH_SIZE])
+        if not batch:
+            break
+        for lot_id, available in batch:
+            units = min(available, quantity)
+            MedicineLot.objects.filter(pk=lot_id).update(quantity=F('quantity') - units)
+            taken.append((lot_id, units))
+            quantity -= units
+            if not quantity:
+                break
+    return taken
+
+
+def tracked_quantity(stock_id):
+    """Units of a stock row held in lots that are not written off."""
+    return MedicineLot.objects.filter(
+        medicine_stock_id=stock_id, written_off=Value(False),
+    ).aggregate(total=Sum('quantity'))['total'] or 0
+
+
+def post_movement(medicine_id, change, reason, prescription=None, note='', lot_number='', expiry_date=None,
+                  today=None, allow_short=False):
+    """
+    Adds `change` (negative to issue) to the medicine's stock and writes the
+    ledger, in one transaction:
+
+    1. a single UPDATE ... SET stock_in_hand = stock_in_hand + change, which
+       also recomputes below_reorder; for issues it only matches while enough
+       stock is left, so concurrent issues can never take the stock below zero
+    2. issues are taken from lots, earliest expiry first (take_from_lots);
+       receipts with an `expiry_date` become a new lot
+    3. one StockLedgerEntry per lot touched (plus one for stock not kept in lots)
+
+    An issue larger than the stock raises ValidationError, unless
+    `allow_short`: then what is in stock is issued and the shortfall is
+    ledgered as a backorder entry that changes nothing.
+
+    Before an issue, the row's lots that expired before `today` are written
+    off (in their own transaction, as the nightly expire_lots would). Stock
+    not kept in lots can then only cover what the remaining lots do not
+    hold, so expired units are never issued under another name.
+
+    Returns the ledger entries.
+    """
+    today = today or timezone.localdate()
+    stock_id = stock_id_for(medicine_id)
+    if change < 0:
+        expire_lots(today, stock_id=stock_id)
+
+    with transaction.atomic():
+        stock = MedicineStock.objects.filter(pk=stock_id)
+        shortfall = 0
+        if change < 0 and allow_short:
+            in_stock = max(stock.select_for_update().values_list('stock_in_hand', flat=True).get(), 0)
+            shortfall = max(-change - in_stock, 0)
+            change += shortfall
+        target = stock.filter(stock_in_hand__gte=-change) if change < 0 else stock
+
+        updated = target.update(
+            # Listed first on purpose: MySQL applies SET assignments left to right,
+            # so this must be computed from the stock_in_hand before the change.
+            below_reorder=Case(
+                When(stock_in_hand__lte=F('re_order_level') - change, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+            stock_in_hand=F('stock_in_hand') + change,
+        )
+        if not updated:
+            available = stock.values_list('stock_in_hand', flat=True).get()
+            raise serializers.ValidationError(
+                {'quantity': [f'Only {available} in stock for medicine "{medicine_id}".']}
+            )
+        in_hand = stock.values_list('stock_in_hand', flat=True).get()
+
+        if change < 0:
+            # What the stock held before this issue beyond its lots
+            untracked_available = max(in_hand - change - tracked_quantity(stock_id), 0)
+            parts = take_from_lots(stock_id, -change, today)
+            taken = sum(units for _, units in parts)
+            untracked = -change - taken
+            if untracked > untracked_available:
+                raise serializers.ValidationError(
+                    {'quantity': [f'Only {taken + untracked_available} usable in stock for medicine "{medicine_id}".']}
+                )
+            parts = [(lot_id, -units) for lot_id, units in parts]
+            if untracked:
+                parts.append((None, -untracked))
+            if shortfall:
+                parts.append((None, 0))
+        elif expiry_date is not None:
+            lot = MedicineLot.objects.create(
+                medicine_stock_id=stock_id, lot_number=lot_number, expiry_date=expiry_date, quantity=change
+            )
+            parts = [(lot.pk, change)]
+        else:
+            parts = [(None, change)]
+
+        balance = in_hand - change
+        entries = []
+        for lot_id, units in parts:
+            balance += units
+            entries.append(StockLedgerEntry(
+                medicine_stock_id=stock_id,
+                medicine_lot_id=lot_id,
+                change=units,
+                balance_after=balance,
+                reason=reason,
+                medicine_prescription=prescription,
+                note=f'Backordered (short by {shortfall})' if lot_id is None and not units else note,
+            ))
+        return StockLedgerEntry.objects.bulk_create(entries)
+
+
+def dispense(medicine_id, quantity, note='', today=None):
+    return post_movement(medicine_id, -quantity, StockLedgerEntry.DISPENSE, note=note, today=today)
+
+
+def receive(medicine_id, quantity, note='', lot_number='', expiry_date=None):
+    return post_movement(
+        medicine_id, quantity, StockLedgerEntry.RECEIPT,
+        note=note, lot_number=lot_number, expiry_date=expiry_date,
+    )
+
+
+def prescribed_quantity(prescription):
+    """Units a prescription takes from stock: dosage per day x duration in days."""
+    return max(prescription.dosage or 1, 1) * max(prescription.duration or 1, 1)
+
+
+def post_prescription(prescription):
+    """
+    Issues a newly created MedicinePrescription from stock and ledgers it
+    against the prescription. Prescribing never depends on the pharmacy:
+    a medicine without a MedicineStock row is not ledgered at all, and a
+    short stock issues what it has and backorders the rest.
+    """
+    if not MedicineStock.objects.filter(medicine_id=prescription.medicine_id).exists():
+        return []
+    return post_movement(
+        prescription.medicine_id, -prescribed_quantity(prescription),
+        StockLedgerEntry.PRESCRIPTION, prescription=prescription, allow_short=True,
+    )
+
+
+def _expire_batch(today, batch_size, stock_id=None):
+    expired = MedicineLot.objects.filter(written_off=Value(False), expiry_date__lt=today)
+    if stock_id is not None:
+        expired = expired.filter(medicine_stock_id=stock_id)
+    lots = list(
+        expired.select_for_update()
+        .order_by('expiry_date', 'id')
+        .values_list('id', 'medicine_stock_id', 'quantity')[:batch_size]
+    )
+    if not lots:
+        return 0, 0
+
+    MedicineLot.objects.filter(pk__in=[lot_id for lot_id, _, _ in lots]).update(quantity=0, written_off=True)
+
+    totals = defaultdict(int)
+    for _, stock_id, quantity in lots:
+        if quantity > 0:
+            totals[stock_id] += quantity
+    if not totals:
+        return len(lots), 0
+
+    stocks = MedicineStock.objects.filter(pk__in=list(totals))
+    stocks.update(stock_in_hand=Case(
+        *[When(pk=stock_id, then=F('stock_in_hand') - total) for stock_id, total in totals.items()],
+        default=F('stock_in_hand'),
+        output_field=IntegerField(),
+    ))
+    stocks.update(below_reorder=reorder_flag())
+
+    # Ledger balances run backwards from the balance after the write-off
+    balances = {stock_id: balance + totals[stock_id] for stock_id, balance in stocks.values_list('pk', 'stock_in_hand')}
+    entries = []
+    for lot_id, stock_id, quantity in lots:
+        if quantity > 0:
+            balances[stock_id] -= quantity
+            entries.append(StockLedgerEntry(
+                medicine_stock_id=stock_id,
+                medicine_lot_id=lot_id,
+                change=-quantity,
+                balance_after=balances[stock_id],
+                reason=StockLedgerEntry.EXPIRY,
+                note='Expired lot written off',
+            ))
+    StockLedgerEntry.objects.bulk_create(entries)
+    return len(lots), sum(totals.values())
+
+
+def expire_lots(today=None, batch_size=EXPIRY_BATCH_SIZE, stock_id=None):
+    """
+    Writes off every lot that expired before `today` (only those of one
+    stock row with `stock_id`): the lots are emptied, their stock rows
+    reduced and one Expiry ledger entry written per lot, in bulk statements
+    of `batch_size` lots per transaction.
+    Returns (lots written off, units written off).
+    """
+    today = today or timezone.localdate()
+    lots = units = 0
+    while True:
+        with transaction.atomic():
+            batch_lots, batch_units = _expire_batch(today, batch_size, stock_id)
+        if not batch_lots:
+            return lots, units
+        lots += batch_lots
+        units += batch_units
+
+
+def reorder_report():
+    """Stock rows at or below their reorder level, from the below_reorder index."""
+    return (
+        MedicineStock.objects.filter(below_reorder=Value(True))
+        .select_related('medicine')
+        .order_by('medicine_stock_id')
+    )
@@ -1,3 +1,359 @@
-from django.test import TestCase
+import threading
+import tracemalloc
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+from rest_framework.test import APIClient
+from rest_framework import serializers
+
+from . import roles
+from .authentication import role_tokens_for_user
+
+from .checks import check_shared_cache
+from .exporting import export_response
+from .models import (
+    Doctor, IdSequence, Patient, Medicine, MedicineCategory, MedicineLot, MedicineStock, Specialization, Staff,
+    StockLedgerEntry,
+)
+from .roles import ADMIN, DOCTOR, RECEPTION, STAFF, get_roles, has_role, is_admin, role_cache_timeout
+from .search import search_patients
+from .stock import dispense, expire_lots, receive
+from . import utils
+from .utils import allocate_ids
+
+DAY_1 = date(2026, 1, 10)
+DAY_2 = DAY_1 + timedelta(days=1)
+
+
+class StockLotTests(TestCase):
+    def setUp(self):
+        category = MedicineCategory.objects.create(medicine_category_id='MC001', medicine_category_name='Tablets')
+        self.medicine = Medicine.objects.create(medicine_id='M001', medicine_name='Paracetamol', medicine_category=category)
+        self.stock = MedicineStock.objects.create(medicine_stock_id='MS001', medicine=self.medicine)
+
+    def in_hand(self):
+        self.stock.refresh_from_db()
+        return self.stock.stock_in_hand
+
+    def ledger(self):
+        return list(StockLedgerEntry.objects.order_by('id').values_list('reason', 'change', 'balance_after'))
+
+    def test_expired_lot_is_not_issued_as_untracked_stock(self):
+        receive(self.medicine.pk, 10, expiry_date=DAY_1)
+
+        # The lot expired overnight and the sweep has not run yet
+        with self.assertRaisesMessage(serializers.ValidationError, 'Only 0 in stock'):
+            dispense(self.medicine.pk, 5, today=DAY_2)
+        # The write-off before the issue is kept
+        self.assertEqual(self.in_hand(), 0)
+
+        self.assertEqual(expire_lots(DAY_2), (0, 0))
+        self.assertEqual(self.in_hand(), 0)
+        self.assertEqual(self.ledger(), [
+            (StockLedgerEntry.RECEIPT, 10, 10),
+            (StockLedgerEntry.EXPIRY, -10, 0),
+        ])
+
+    def test_untracked_stock_covers_only_what_lots_do_not_hold(self):
+        receive(self.medicine.pk, 5)
+        receive(self.medicine.pk, 10, expiry_date=DAY_1)
+
+        entries = dispense(self.medicine.pk, 12, today=DAY_1)
+        self.assertEqual([(entry.medicine_lot_id is None, entry.change) for entry in entries], [(False, -10), (True, -2)])
+
+        # The lot is empty; the 3 left are untracked and can be issued
+        dispense(self.medicine.pk, 3, today=DAY_1)
+        self.assertEqual(self.in_hand(), 0)
+
+    def test_issue_after_expiry_uses_only_untracked_stock(self):
+        receive(self.medicine.pk, 5)
+        receive(self.medicine.pk, 10, expiry_date=DAY_1)
+
+        dispense(self.medicine.pk, 5, today=DAY_2)
+        self.assertEqual(self.in_hand(), 0)
+        self.assertTrue(MedicineLot.objects.get().written_off)
+        self.assertEqual(self.ledger(), [
+            (StockLedgerEntry.RECEIPT, 5, 5),
+            (StockLedgerEntry.RECEIPT, 10, 15),
+            (StockLedgerEntry.EXPIRY, -10, 5),
+            (StockLedgerEntry.DISPENSE, -5, 0),
+        ])
+
+
+
+def group_queries(queries):
+    return [query for query in queries if 'auth_user_groups' in query['sql']]
+
+
+@override_settings(ROLE_CACHE_TIMEOUT=300)
+class RoleResolutionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('nurse')
+        self.user.groups.add(Group.objects.create(name=RECEPTION), Group.objects.create(name=DOCTOR))
+
+    def fresh_user(self):
+        """The user as a new request loads it."""
+        return User.objects.get(pk=self.user.pk)
+
+    def test_roles_are_loaded_once_per_request(self):
+        user = self.fresh_user()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(has_role(user, RECEPTION))
+            self.assertTrue(has_role(user, DOCTOR))
+            self.assertFalse(is_admin(user))
+            self.assertEqual(get_roles(user), {RECEPTION, DOCTOR})
+        self.assertEqual(len(group_queries(queries)), 1)
+
+    # An in-memory shared cache, as Redis or Memcached would be
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    @mock.patch('apibackendapp.roles.is_shared_cache', return_value=True)
+    def test_shared_cache_serves_later_requests(self, _):
+        get_roles(self.fresh_user())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_roles(self.fresh_user()), {RECEPTION, DOCTOR})
+        self.assertEqual(group_queries(queries), [])
+
+        # A role change is seen by the next request
+        self.user.groups.remove(Group.objects.get(name=DOCTOR))
+        self.assertEqual(get_roles(self.fresh_user()), {RECEPTION})
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_only_keeps_roles_per_request(self):
+        self.assertEqual(role_cache_timeout(), 0)
+        with CaptureQueriesContext(connection) as queries:
+            get_roles(self.fresh_user())
+            get_roles(self.fresh_user())
+        self.assertEqual(len(group_queries(queries)), 2)
+
+    def test_database_cache_does_not_cache_roles(self):
+        # A cache row read is a query just like the groups query
+        self.assertEqual(role_cache_timeout(), 0)
+
+
+class RoleLookupsPerRequestTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('everyone')
+        user.groups.add(*[Group.objects.create(name=name) for name in (ADMIN, DOCTOR, RECEPTION, STAFF)])
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        Doctor.objects.create(name='House', specialization=specialization, user=user)
+        Staff.objects.create(staff_id='ST001', fullname='Sara George', user=user)
+        self.client = APIClient()
+        # A bearer token, so every request loads its own user like in production
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {role_tokens_for_user(user).access_token}')
+
+    def protected_urls(self, patterns=None, prefix='/'):
+        """Every API URL without a path parameter (the SSE stream never ends, so it is left out)."""
+        for pattern in get_resolver().url_patterns if patterns is None else patterns:
+            route = str(pattern.pattern).lstrip('^').rstrip('$')
+            if '<' in route or '(?P' in route or route.startswith('admin/') or 'stream' in route:
+                continue
+            if isinstance(pattern, URLResolver):
+                yield from self.protected_urls(pattern.url_patterns, prefix + route)
+            elif getattr(pattern.callback, 'cls', None) is None or pattern.callback.cls.permission_classes:
+                yield prefix + route
+
+    def test_roles_are_loaded_at_most_once_per_request(self):
+        urls = list(self.protected_urls())
+        self.assertIn('/labtec/analytics/lab-results/', urls)
+        self.assertIn('/doctor/async/my-appointments/', urls)
+        for url in urls:
+            with self.subTest(url=url), \
+                    mock.patch.object(roles, '_load_roles', wraps=roles._load_roles) as load, \
+                    mock.patch.object(roles, '_aload_roles', wraps=roles._aload_roles) as aload:
+                self.client.get(url)
+                self.assertLessEqual(load.call_count + aload.call_count, 1)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_process_local_cache_is_an_error(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['apibackendapp.E001'])
+
+    def test_database_cache_passes(self):
+        database = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'hms_cache'}}
+        with override_settings(CACHES=database):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class MetricsPermissionTests(TestCase):
+    def get_metrics(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/metrics/')
+
+    def test_admins_only(self):
+        admin = User.objects.create_user('admin')
+        admin.groups.add(Group.objects.create(name=ADMIN))
+        self.assertEqual(self.get_metrics(admin).status_code, 200)
+        self.assertEqual(self.get_metrics(User.objects.create_user('nurse')).status_code, 403)
+
+
+class ServerTimingTests(TestCase):
+    def timing(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/metrics/').get('Server-Timing')
+
+    def test_only_admins_see_timings(self):
+        admin = User.objects.create_user('admin')
+        admin.groups.add(Group.objects.create(name=ADMIN))
+        self.assertIn('db;dur=', self.timing(admin))
+        self.assertIsNone(self.timing(User.objects.create_user('nurse')))
+        self.assertIsNone(self.timing(None))
+
+    async def test_async_views_show_admins_timings(self):
+        def make_admin():
+            admin = User.objects.create_user('admin')
+            admin.groups.add(Group.objects.create(name=ADMIN))
+            return str(role_tokens_for_user(admin).access_token)
+        token = await sync_to_async(make_admin)()
+        response = await AsyncClient().get('/reception/async/doctors/', headers={'Authorization': f'Bearer {token}'})
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+    @override_settings(DEBUG=True)
+    def test_everyone_sees_timings_in_debug(self):
+        self.assertIn('db;dur=', self.timing(None))
+
+
+class ExportMemoryTests(TestCase):
+    CHUNK_SIZE = 200
+
+    def export_peak(self, rows, file_format):
+        """(peak traced bytes while streaming an export of `rows` patients, lines received)"""
+        Patient.objects.all().delete()
+        Patient.objects.bulk_create(
+            Patient(patient_id=f'P{number:06d}', patient_name=f'Patient {number}', address='x' * 200)
+            for number in range(rows)
+        )
+        response = export_response(
+            Patient.objects.all(), ['patient_id', 'patient_name', 'address'], file_format, 'patients',
+            chunk_size=self.CHUNK_SIZE,
+        )
+        lines = 0
+        tracemalloc.start()
+        try:
+            for chunk in response.streaming_content:
+                lines += chunk.count(b'\n')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak, lines
+
+    def test_memory_does_not_grow_with_rows(self):
+        for file_format, header in (('csv', 1), ('ndjson', 0)):
+            with self.subTest(file_format=file_format):
+                small, small_lines = self.export_peak(1000, file_format)
+                large, large_lines = self.export_peak(10000, file_format)
+                self.assertEqual((small_lines, large_lines), (1000 + header, 10000 + header))
+                # Ten times the rows, about the same peak: only one chunk is held at a time
+                self.assertLess(large, small * 2)
+
+
+class PatientSearchTests(TestCase):
+    def setUp(self):
+        for name in ('John Smith', 'Jon Smyth', 'Smita Rao', 'Sara George'):
+            Patient.objects.create(patient_name=name)
+
+    def names(self, query):
+        return [patient.patient_name for patient in search_patients(query)]
+
+    def test_surname_prefix_finds_full_names(self):
+        # First names starting with the prefix come first, then surnames, then sound-alikes
+        self.assertEqual(self.names('smit'), ['Smita Rao', 'John Smith', 'Jon Smyth'])
+        self.assertEqual(self.names('smyth jon'), ['Jon Smyth', 'John Smith'])
+
+    def test_first_name_prefix_and_sound_alike(self):
+        self.assertEqual(self.names('jo'), ['John Smith', 'Jon Smyth'])
+        self.assertEqual(self.names('Sarra'), ['Sara George'])
+        self.assertEqual(self.names('george'), ['Sara George'])
+
+
+class ListQueryCountMixin:
+    """For TestCases checking that list endpoints run the same queries whatever the number of rows."""
+    def list_queries(self, client, url):
+        """(queries run, rows returned) for one GET of `url`."""
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, getattr(response, 'data', None))
+        return len(queries), len(response.data['results'])
+
+    def assertListQueriesFlat(self, client, urls, add_rows):
+        """Each URL runs as many queries after add_rows() as before, while returning more rows."""
+        for url in urls:
+            # Roles and other per-user lookups are resolved once and kept on the user
+            client.get(url)
+        before = {url: self.list_queries(client, url) for url in urls}
+        add_rows()
+        for url in urls:
+            with self.subTest(url=url):
+                (queries, rows), (more_queries, more_rows) = before[url], self.list_queries(client, url)
+                self.assertGreater(more_rows, rows)
+                self.assertEqual(more_queries, queries)
+
+
+def run_concurrently(target, workers):
+    """Runs target() in `workers` threads (each with its own connection) started together; returns their errors."""
+    barrier = threading.Barrier(workers)
+    errors = []
+
+    def run():
+        try:
+            barrier.wait()
+            target()
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+class IdAllocationConcurrencyTests(TransactionTestCase):
+    WORKERS = 8
+    CALLS = 10
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('an in-memory SQLite database refuses concurrent writers instead of waiting')
+        # Blocks this process kept from earlier tests point into a flushed table
+        utils._reserved.clear()
+
+    def allocate_concurrently(self, count):
+        ids = []
+
+        def allocate():
+            for _ in range(self.CALLS):
+                ids.extend(allocate_ids(Patient, count))
+
+        self.assertEqual(run_concurrently(allocate, self.WORKERS), [])
+        return ids
+
+    @override_settings(ID_BLOCK_SIZE=1)
+    def test_workers_racing_on_the_counter_get_disjoint_ids(self):
+        # No counter yet: the workers race to seed it from the existing IDs,
+        # then every call has to bump it
+        IdSequence.objects.filter(prefix='P').delete()
+        Patient.objects.create(patient_id='P040', patient_name='John Smith')
+        ids = self.allocate_concurrently(3)
+
+        total = self.WORKERS * self.CALLS * 3
+        self.assertEqual(len(set(ids)), total)
+        self.assertEqual(sorted(ids), [f'P{number:03d}' for number in range(41, 41 + total)])
+        self.assertEqual(IdSequence.objects.get(prefix='P').last_value, 40 + total)
+
+    @override_settings(ID_BLOCK_SIZE=25)
+    def test_threads_sharing_reserved_blocks_get_disjoint_ids(self):
+        ids = self.allocate_concurrently(2)
+        self.assertEqual(len(set(ids)), self.WORKERS * self.CALLS * 2)
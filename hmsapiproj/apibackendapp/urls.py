@@ -1,7 +1,10 @@
 from django.urls import path
+from . import views
 
-# Minimal urls module to satisfy project `include('apibackendapp.urls')`.
-# Add real API routes here as you implement views.
 urlpatterns = [
-    # e.g. path('patients/', views.PatientList.as_view()),
+    path('stock/dispense/', views.DispenseView.as_view(), name='stock-dispense'),
+    path('stock/receive/', views.ReceiveView.as_view(), name='stock-receive'),
+    path('stock/ledger/', views.StockLedgerView.as_view(), name='stock-ledger'),
+    path('stock/reorder/', views.ReorderReportView.as_view(), name='stock-reorder'),
+    path('metrics/', views.MetricsView.as_view(), name='request-metrics'),
 ]
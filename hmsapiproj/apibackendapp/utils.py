@@ -1,29 +1,211 @@
-def generate_id(prefix, model, field_name):
-    """
-    Generate a unique ID with the given prefix.
-    
-    Args:
-        prefix (str): The prefix for the ID (e.g., 'LT' for LabTest)
-        model: The Django model class
-        field_name (str): The name of the ID field in the model
-    
-    Returns:
-        str: A unique ID like 'LT001', 'LT002', etc.
-    """
-    # Get the last object ordered by the ID field, descending
-    last_obj = model.objects.all().order_by(f'-{field_name}').first()
-    
-    if last_obj:
-        # Extract the numeric part from the last ID
-        last_id = getattr(last_obj, field_name)
-        # Remove prefix and convert to int
-        try:
-            number = int(last_id[len(prefix):])
-        except (ValueError, IndexError):
-            number = 0
-    else:
-        number = 0
-    
-    # Increment and format with leading zeros
-    new_number = number + 1
-    return f"{prefix}{new_number:03d}"
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import (
+    IdSequence, AppointmentTokenCounter, Patient, Appointment, Doctor, Billing,
+    LabTest, LabTestPrescription, LabTestReport
+)
+
+IdFormat = namedtuple('IdFormat', ['field_name', 'prefix', 'width'])
+
+# Every model whose primary key is generated by the pre_save receivers in
+# signals.py. Prefixes and zero-padding match the IDs already in the database.
+ID_SEQUENCES = {
+    Patient: IdFormat('patient_id', 'P', 3),
+    Appointment: IdFormat('appointment_id', 'APP', 5),
+    Doctor: IdFormat('doctor_id', 'D', 3),
+    Billing: IdFormat('bill_id', 'BIL', 3),
+    LabTest: IdFormat('lab_test_id', 'LT', 3),
+    LabTestPrescription: IdFormat('lab_test_prescription_id', 'LTP', 3),
+    LabTestReport: IdFormat('report_id', 'RPT', 3),
+}
+
+# Consultations and medicine prescriptions get no ID on save(); the code that
+# creates them (the doctor app, seeding) passes these to allocate_ids.
+CONSULTATION_ID = IdFormat('consultation_id', 'CON', 3)
+MEDICINE_PRESCRIPTION_ID = IdFormat('medicine_prescription_id', 'MPR', 3)
+
+# Numbers reserved by this process but not handed out yet: prefix -> [(next, stop), ...]
+_reserved = {}
+_reserved_pid = None
+_lock = threading.Lock()
+
+
+def id_block_size():
+    """How many IDs a worker reserves from tblidsequence per round trip."""
+    return getattr(settings, 'ID_BLOCK_SIZE', 20)
+
+
+def highest_existing_number(model, field_name, prefix):
+    """
+    Returns the largest numeric suffix already used for `prefix`.
+    Compares numbers rather than strings, so 'P1000' beats 'P999'.
+    Only used to seed a counter row that does not exist yet.
+    """
+    highest = 0
+    ids = model.objects.filter(
+        **{f'{field_name}__startswith': prefix}
+    ).values_list(field_name, flat=True)
+
+    for value in ids.iterator():
+        suffix = value[len(prefix):]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return highest
+
+
+def _reserve(model, id_format, count):
+    """
+    Atomically bumps the counter row for the prefix by `count` and
+    returns the reserved range as (first, stop). The UPDATE holds a row lock
+    until commit, so concurrent workers always receive disjoint ranges.
+    """
+    counters = IdSequence.objects.filter(prefix=id_format.prefix)
+
+    with transaction.atomic():
+        if not counters.update(last_value=F('last_value') + count):
+            start = highest_existing_number(model, id_format.field_name, id_format.prefix)
+            try:
+                with transaction.atomic():
+                    IdSequence.objects.create(prefix=id_format.prefix, last_value=start + count)
+            except IntegrityError:
+                # Another worker seeded the counter first; take the next range from it.
+                counters.update(last_value=F('last_value') + count)
+        last_value = counters.values_list('last_value', flat=True).get()
+
+    return last_value - count + 1, last_value + 1
+
+
+def _take_reserved(prefix, count):
+    global _reserved_pid
+
+    numbers = []
+    with _lock:
+        # Blocks reserved before a fork (e.g. gunicorn --preload) belong to the parent.
+        if _reserved_pid != os.getpid():
+            _reserved.clear()
+            _reserved_pid = os.getpid()
+
+        ranges = _reserved.get(prefix, [])
+        while ranges and len(numbers) < count:
+            start, stop = ranges[0]
+            take = min(stop - start, count - len(numbers))
+            numbers.extend(range(start, start + take))
+            if start + take == stop:
+                ranges.pop(0)
+            else:
+                ranges[0] = (start + take, stop)
+    return numbers
+
+
+def _keep_reserved(prefix, start, stop):
+    with _lock:
+        if _reserved_pid == os.getpid():
+            _reserved.setdefault(prefix, []).append((start, stop))
+
+
+def format_id(id_format, number):
+    return f'{id_format.prefix}{number:0{id_format.width}d}'
+
+
+def allocate_ids(model, count, id_format=None):
+    """
+    Returns `count` new, unused primary keys for `model` (e.g. ['P041', 'P042']).
+    IDs come from the block this process already holds; when that runs out a
+    new block of at least ID_BLOCK_SIZE numbers is reserved from tblidsequence.
+    `id_format` defaults to the model's entry in ID_SEQUENCES.
+    """
+    id_format = id_format or ID_SEQUENCES[model]
+    prefix = id_format.prefix
+    numbers = _take_reserved(prefix, count)
+
+    missing = count - len(numbers)
+    if missing:
+        start, stop = _reserve(model, id_format, max(missing, id_block_size()))
+        numbers.extend(range(start, start + missing))
+        if start + missing < stop:
+            # Only keep the rest of the block once the reservation is committed;
+            # a rolled back reservation may be handed out again by another worker.
+            transaction.on_commit(partial(_keep_reserved, prefix, start + missing, stop))
+
+    return [format_id(id_format, number) for number in numbers]
+
+
+def next_id(model, id_format=None):
+    """Returns a single new primary key for `model`."""
+    return allocate_ids(model, 1, id_format)[0]
+
+
+# --- APPOINTMENT TOKENS ---
+
+def token_day(appointment_date):
+    """The calendar day (in TIME_ZONE) an appointment's token sequence belongs to."""
+    if timezone.is_aware(appointment_date):
+        return timezone.localdate(appointment_date)
+    return appointment_date.date()
+
+
+def day_bounds(day):
+    """
+    [start, end) datetimes of `day`. Filtering appointment_date on this range
+    can use the (doctor, appointment_date) index, unlike appointment_date__date.
+    """
+    start = datetime.combine(day, time.min)
+    if settings.USE_TZ:
+        start = timezone.make_aware(start)
+    return start, start + timedelta(days=1)
+
+
+def ensure_token_counter(doctor_id, day):
+    """
+    Creates the token counter of a doctor's day if it does not exist yet,
+    continuing after any tokens issued before it existed. Call it before
+    opening the booking transaction, so the row is committed on its own and
+    allocate_token_numbers() only has to lock and bump it. (Inserting it in
+    the booking transaction, after an UPDATE that matched nothing, makes two
+    first bookings of the day deadlock on InnoDB's gap lock.)
+    """
+    if AppointmentTokenCounter.objects.filter(doctor_id=doctor_id, token_date=day).exists():
+        return
+
+    day_start, day_end = day_bounds(day)
+    start = Appointment.objects.filter(
+        doctor_id=doctor_id,
+        appointment_date__gte=day_start,
+        appointment_date__lt=day_end,
+    ).aggregate(last=Max('token_number'))['last'] or 0
+    try:
+        with transaction.atomic():
+            AppointmentTokenCounter.objects.create(doctor_id=doctor_id, token_date=day, last_token=start)
+    except IntegrityError:
+        # A concurrent booking created the row first
+        pass
+
+
+def allocate_token_numbers(doctor_id, day, count=1):
+    """
+    Reserves `count` consecutive token numbers for a doctor on `day` and
+    returns them as a range. The counter row stays locked until the caller's
+    transaction commits, so call this inside the same transaction.atomic()
+    block that inserts the appointments: concurrent bookings then wait for
+    each other, and a rolled back booking gives its token back.
+    Call ensure_token_counter() before that block.
+    """
+    counters = AppointmentTokenCounter.objects.filter(doctor_id=doctor_id, token_date=day)
+
+    with transaction.atomic():
+        if not counters.update(last_token=F('last_token') + count):
+            # The caller did not create the counter beforehand
+            ensure_token_counter(doctor_id, day)
+            counters.update(last_token=F('last_token') + count)
+        last_token = counters.values_list('last_token', flat=True).get()
+
+    return range(last_token - count + 1, last_token + 1)
@@ -1,3 +1,92 @@
-from django.shortcuts import render
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from admins.permissions import AdminOnlyPermissions
+
+from .metrics import metrics_window, registry
+from .models import StockLedgerEntry
+from .pagination import KeysetPagination
+from .permissions import IsPharmacyStaff
+from .serializers import (
+    StockMovementSerializer, StockReceiptSerializer, StockLedgerEntrySerializer, ReorderItemSerializer,
+)
+from .stock import dispense, receive, reorder_report
+
+
+class DispenseView(APIView):
+    """
+    POST stock/dispense/ {"medicine", "quantity", "note"}
+    Issues medicine from stock, earliest-expiring lot first (not tied to a
+    prescription; prescriptions are issued when they are created).
+    Returns one ledger entry per lot used; 400 when there is not enough stock.
+    """
+    permission_classes = [IsAuthenticated, IsPharmacyStaff]
+
+    def post(self, request):
+        serializer = StockMovementSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        entries = dispense(data['medicine'].pk, data['quantity'], note=data['note'])
+        return Response(StockLedgerEntrySerializer(entries, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class ReceiveView(APIView):
+    """
+    POST stock/receive/ {"medicine", "quantity", "note", "lot_number", "expiry_date"}
+    Adds a delivery to stock, as a new lot when it has an expiry date.
+    """
+    permission_classes = [IsAuthenticated, IsPharmacyStaff]
+
+    def post(self, request):
+        serializer = StockReceiptSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        entries = receive(
+            data['medicine'].pk, data['quantity'], note=data['note'],
+            lot_number=data['lot_number'], expiry_date=data['expiry_date'],
+        )
+        return Response(StockLedgerEntrySerializer(entries, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class StockLedgerView(generics.ListAPIView):
+    """GET stock/ledger/?medicine=<id> - stock movements, newest first."""
+    serializer_class = StockLedgerEntrySerializer
+    permission_classes = [IsAuthenticated, IsPharmacyStaff]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        entries = StockLedgerEntry.objects.select_related('medicine_stock').order_by('-id')
+        medicine_id = self.request.query_params.get('medicine')
+        if medicine_id:
+            entries = entries.filter(medicine_stock__medicine_id=medicine_id)
+        return entries
+
+
+class ReorderReportView(APIView):
+    """
+    GET stock/reorder/ - medicines at or below their reorder level.
+    Reads only the flagged rows through an index, however large the catalog is.
+    """
+    permission_classes = [IsAuthenticated, IsPharmacyStaff]
+
+    def get(self, request):
+        return Response(ReorderItemSerializer(reorder_report(), many=True).data)
+
+
+class MetricsView(APIView):
+    """
+    GET metrics/ - per-endpoint request metrics of this server process over
+    the last QUERY_METRICS_WINDOW seconds (see apibackendapp/middleware.py):
+    wall and DB time histograms, queries per request, repeated queries and
+    requests over their query budget. DELETE clears them.
+    """
+    permission_classes = [IsAuthenticated, AdminOnlyPermissions]
+
+    def get(self, request):
+        return Response({'window_seconds': metrics_window(), 'endpoints': registry.snapshot()})
+
+    def delete(self, request):
+        registry.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
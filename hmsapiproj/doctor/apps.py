@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DoctorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'doctor'
+    # Loads signals.py (live queue updates) when the app starts.
+    def ready(self):
+        import doctor.signals
@@ -0,0 +1,51 @@
+from rest_framework.exceptions import PermissionDenied
+
+from apibackendapp.asyncapi import async_api_view, require_role
+from apibackendapp.authentication import aget_doctor_id
+from apibackendapp.models import Appointment
+from apibackendapp.optimizer import optimize_queryset
+from apibackendapp.pagination import KeysetPagination, LimitOffsetPagination
+from apibackendapp.roles import DOCTOR
+from labtec.reports import report_queryset
+from labtec.serializers import LabTestReportDetailSerializer
+from .serializers import AppointmentDetailSerializer
+
+# Async (ASGI) versions of the doctor's read-only lists.
+# See apibackendapp/asyncapi.py. Each uses the queryset, serializer and
+# pagination class of its sync view in views.py, so both return the same JSON.
+
+
+async def current_doctor_id(request):
+    """doctor_id of the logged-in doctor (IsDoctorUser + current_doctor_id of views.py)."""
+    await require_role(request.user, DOCTOR, superuser=False)
+    doctor_id = await aget_doctor_id(request.user)
+    if doctor_id is None:
+        raise PermissionDenied("No doctor profile is linked to this account.")
+    return doctor_id
+
+
+@async_api_view
+async def my_appointments(request):
+    """GET async/my-appointments/ - the doctor's appointments, newest first, keyset paginated."""
+    doctor_id = await current_doctor_id(request)
+    appointments = optimize_queryset(
+        Appointment.objects.filter(doctor_id=doctor_id).order_by('-appointment_date'), AppointmentDetailSerializer,
+    )
+    paginator = KeysetPagination()
+    page = await paginator.apaginate_queryset(appointments, request)
+    return paginator.get_paginated_data(AppointmentDetailSerializer(page, many=True).data)
+
+
+@async_api_view
+async def lab_reports(request):
+    """
+    GET async/lab-reports/ - complete lab reports (with flagged results) of
+    the patients who have an appointment with the doctor, newest first,
+    limit/offset paginated.
+    """
+    doctor_id = await current_doctor_id(request)
+    my_patient_ids = Appointment.objects.filter(doctor_id=doctor_id).values('patient_id')
+    reports = report_queryset().filter(patient_id__in=my_patient_ids).order_by('-report_date')
+    paginator = LimitOffsetPagination()
+    page = await paginator.apaginate_queryset(reports, request)
+    return paginator.get_paginated_data(LabTestReportDetailSerializer(page, many=True).data)
@@ -1,8 +1,9 @@
 from rest_framework import permissions
+from apibackendapp.roles import DOCTOR, has_role
 
 class IsDoctorUser(permissions.BasePermission):
     """
     Allows access only to authenticated users in the 'Doctor' group.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.groups.filter(name='Doctor').exists()
\ No newline at end of file
+        return request.user.is_authenticated and has_role(request.user, DOCTOR)
\ No newline at end of file
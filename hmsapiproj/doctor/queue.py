@@ -0,0 +1,67 @@
+from collections import defaultdict
+
+from apibackendapp.models import Appointment, Patient
+from apibackendapp.pubsub import get_broker
+from apibackendapp.utils import day_bounds, token_day
+
+ADDED, UPDATED, REMOVED = 'added', 'updated', 'removed'
+
+QUEUE_FIELDS = [
+    'appointment_id', 'token_number', 'consultation_status',
+    'appointment_date', 'patient_id', 'patient__patient_name',
+]
+
+
+def queue_channel(doctor_id, day):
+    return f'doctor-queue:{doctor_id}:{day.isoformat()}'
+
+
+def _entry(appointment_id, token_number, consultation_status, appointment_date, patient_id, patient_name):
+    return {
+        'appointment_id': appointment_id,
+        'token_number': token_number,
+        'consultation_status': consultation_status,
+        'appointment_date': appointment_date,
+        'patient_id': patient_id,
+        'patient_name': patient_name,
+    }
+
+
+def queue_entries(doctor_id, day):
+    """A doctor's appointments on `day` in token order (one indexed query)."""
+    start, end = day_bounds(day)
+    rows = (
+        Appointment.objects.filter(doctor_id=doctor_id, appointment_date__gte=start, appointment_date__lt=end)
+        .order_by('token_number', 'appointment_id')
+        .values_list(*QUEUE_FIELDS)
+    )
+    return [_entry(*row) for row in rows]
+
+
+def publish_appointments(appointments, change, patient_names=None):
+    """
+    Sends `change` (added / updated / removed) for each appointment to the
+    queue channel of its doctor and day. Channels nobody listens to are
+    skipped before anything is loaded; patient names come from one query.
+    """
+    broker = get_broker()
+    by_channel = defaultdict(list)
+    for appointment in appointments:
+        if appointment.appointment_date is None:
+            continue
+        channel = queue_channel(appointment.doctor_id, token_day(appointment.appointment_date))
+        if broker.has_subscribers(channel):
+            by_channel[channel].append(appointment)
+    if not by_channel:
+        return
+
+    if patient_names is None:
+        patient_ids = {appointment.patient_id for group in by_channel.values() for appointment in group}
+        patient_names = dict(Patient.objects.filter(pk__in=patient_ids).values_list('pk', 'patient_name'))
+
+    for channel, group in by_channel.items():
+        for appointment in group:
+            broker.publish(channel, {'type': change, 'appointment': _entry(
+                appointment.appointment_id, appointment.token_number, appointment.consultation_status,
+                appointment.appointment_date, appointment.patient_id, patient_names.get(appointment.patient_id),
+            )})
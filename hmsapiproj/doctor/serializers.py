@@ -1,15 +1,19 @@
+from django.db import transaction
 from rest_framework import serializers
+from apibackendapp.catalog import CatalogRelatedField
 from apibackendapp.models import (
-    Appointment, Consultation, Medicine, LabTest, LabReport, 
-    Prescription, LabPrescription, Patient, Doctor
+    Appointment, Consultation, Medicine, LabTest, MedicinePrescription,
+    LabTestPrescription, Patient, Doctor
 )
+from apibackendapp.stock import post_prescription
+from apibackendapp.utils import CONSULTATION_ID, MEDICINE_PRESCRIPTION_ID, next_id
 
 # --- Helper Serializers (for Read-Only nested data) ---
 
 class SimplePatientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Patient
-        fields = ['patient_id', 'fullname', 'mobileno', 'gender']
+        fields = ['patient_id', 'patient_name', 'contact_info', 'gender']
 
 class SimpleDoctorSerializer(serializers.ModelSerializer):
     class Meta:
@@ -19,12 +23,33 @@ class SimpleDoctorSerializer(serializers.ModelSerializer):
 class SimpleMedicineSerializer(serializers.ModelSerializer):
     class Meta:
         model = Medicine
-        fields = ['medicine_id', 'name', 'manufacturer', 'description']
+        fields = ['medicine_id', 'medicine_name', 'manufacturing_date', 'expiry_date', 'price', 'medicine_category']
 
 class SimpleLabTestSerializer(serializers.ModelSerializer):
     class Meta:
         model = LabTest
-        fields = ['test_id', 'name', 'description']
+        fields = ['lab_test_id', 'lab_test_name', 'amount', 'min_range', 'max_range', 'sample_collected']
+
+class OwnAppointmentMixin:
+    """
+    Only lets a doctor write records for their own appointments
+    (the view puts the doctor's ID in the serializer context as 'doctor_id').
+    """
+    def validate_appointment(self, appointment):
+        if appointment.doctor_id != self.context.get('doctor_id'):
+            raise serializers.ValidationError('This appointment is not assigned to you.')
+        return appointment
+
+class AllocatedIdMixin:
+    """
+    Gives a new row the next ID of `id_format`
+    (these models get no ID on save(), see apibackendapp.utils).
+    """
+    id_format = None
+
+    def create(self, validated_data):
+        validated_data[self.id_format.field_name] = next_id(self.Meta.model, self.id_format)
+        return super().create(validated_data)
 
 # --- Main Serializers ---
 
@@ -34,77 +59,65 @@ class AppointmentDetailSerializer(serializers.ModelSerializer):
     """
     patient = SimplePatientSerializer(read_only=True)
     doctor = SimpleDoctorSerializer(read_only=True)
-    
+
     class Meta:
         model = Appointment
-        fields = ['appointment_id', 'patient', 'doctor', 'appointment_date', 'status', 'reason']
+        fields = ['appointment_id', 'patient', 'doctor', 'appointment_date', 'token_number', 'consultation_status']
 
-class ConsultationSerializer(serializers.ModelSerializer):
+class ConsultationSerializer(AllocatedIdMixin, OwnAppointmentMixin, serializers.ModelSerializer):
     """
     CRUD serializer for Consultations.
-    Doctor field is set automatically from the view.
+    Written against an appointment ID; the patient is shown from the appointment.
     """
+    id_format = CONSULTATION_ID
+    patient = SimplePatientSerializer(source='appointment.patient', read_only=True)
+
     class Meta:
         model = Consultation
-        fields = ['consultation_id', 'patient', 'appointment', 'notes', 'diagnosis', 'created_at']
-        # 'doctor' is read-only because it's set in the view
-        read_only_fields = ['consultation_id', 'created_at']
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Make patient/appointment writable on create/update
-        # but use nested serializer on read
-        if self.context.get('request') and self.context['request'].method in ['GET']:
-            self.fields['patient'] = SimplePatientSerializer(read_only=True)
-        else:
-            self.fields['patient'] = serializers.PrimaryKeyRelatedField(queryset=Patient.objects.all())
-            self.fields['appointment'] = serializers.PrimaryKeyRelatedField(queryset=Appointment.objects.all())
-
-class LabReportDetailSerializer(serializers.ModelSerializer):
-    """
-    Read-only serializer for a Doctor to VIEW patient lab reports.
-    """
-    patient = SimplePatientSerializer(read_only=True)
-    test = SimpleLabTestSerializer(read_only=True)
-    
-    class Meta:
-        model = LabReport
-        fields = ['report_id', 'patient', 'test', 'report_file', 'report_date', 'notes']
+        fields = ['consultation_id', 'appointment', 'patient', 'symptoms', 'diagnosis', 'notes', 'created_date']
+        read_only_fields = ['consultation_id', 'created_date']
 
-class PrescriptionSerializer(serializers.ModelSerializer):
+class PrescriptionSerializer(AllocatedIdMixin, OwnAppointmentMixin, serializers.ModelSerializer):
     """
     CRUD serializer for Medicine Prescriptions.
-    Doctor field is set automatically from the view.
+    Creating one issues dosage x duration units of the medicine from stock
+    (as far as it is stocked, see apibackendapp.stock.post_prescription).
     """
+    id_format = MEDICINE_PRESCRIPTION_ID
+    patient = SimplePatientSerializer(source='appointment.patient', read_only=True)
+    # Checked against the catalog snapshot, no query per item
+    medicine = CatalogRelatedField(Medicine)
+    medicine_details = SimpleMedicineSerializer(source='medicine', read_only=True)
+
     class Meta:
-        model = Prescription
-        fields = ['prescription_id', 'patient', 'medicine', 'dosage', 'frequency', 'duration', 'notes', 'created_at']
-        read_only_fields = ['prescription_id', 'created_at']
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if self.context.get('request') and self.context['request'].method in ['GET']:
-            self.fields['patient'] = SimplePatientSerializer(read_only=True)
-            self.fields['medicine'] = SimpleMedicineSerializer(read_only=True)
-        else:
-            self.fields['patient'] = serializers.PrimaryKeyRelatedField(queryset=Patient.objects.all())
-            self.fields['medicine'] = serializers.PrimaryKeyRelatedField(queryset=Medicine.objects.all())
-
-class LabPrescriptionSerializer(serializers.ModelSerializer):
+        model = MedicinePrescription
+        fields = [
+            'medicine_prescription_id', 'appointment', 'patient', 'medicine', 'medicine_details',
+            'dosage', 'frequency', 'duration',
+        ]
+        read_only_fields = ['medicine_prescription_id']
+
+    def create(self, validated_data):
+        # The prescription and its stock movement are saved together
+        with transaction.atomic():
+            prescription = super().create(validated_data)
+            post_prescription(prescription)
+        return prescription
+
+class LabPrescriptionSerializer(OwnAppointmentMixin, serializers.ModelSerializer):
     """
     CRUD serializer for Lab Test Prescriptions.
-    Doctor field is set automatically from the view.
+    The result value is entered by the lab (labtec app), so it is read-only here.
     """
+    patient = SimplePatientSerializer(source='appointment.patient', read_only=True)
+    # Checked against the catalog snapshot, no query per item
+    lab_test = CatalogRelatedField(LabTest)
+    lab_test_details = SimpleLabTestSerializer(source='lab_test', read_only=True)
+
     class Meta:
-        model = LabPrescription
-        fields = ['lab_prescription_id', 'patient', 'lab_test', 'notes', 'created_at']
-        read_only_fields = ['lab_prescription_id', 'created_at']
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if self.context.get('request') and self.context['request'].method in ['GET']:
-            self.fields['patient'] = SimplePatientSerializer(read_only=True)
-            self.fields['lab_test'] = SimpleLabTestSerializer(read_only=True)
-        else:
-            self.fields['patient'] = serializers.PrimaryKeyRelatedField(queryset=Patient.objects.all())
-            self.fields['lab_test'] = serializers.PrimaryKeyRelatedField(queryset=LabTest.objects.all())
\ No newline at end of file
+        model = LabTestPrescription
+        fields = [
+            'lab_test_prescription_id', 'appointment', 'patient', 'lab_test', 'lab_test_details',
+            'lab_test_value', 'remarks', 'created_date',
+        ]
+        read_only_fields = ['lab_test_prescription_id', 'lab_test_value', 'created_date']
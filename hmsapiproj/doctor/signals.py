@@ -0,0 +1,54 @@
+# doctor/signals.py
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from apibackendapp.models import Appointment
+from .queue import publish_appointments, ADDED, UPDATED, REMOVED
+
+
+# --- LIVE DOCTOR QUEUE ---
+
+# Fields that decide which queue an appointment is shown in
+SLOT_FIELDS = {'doctor', 'doctor_id', 'appointment_date'}
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_queue_slot(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Stored doctor and time of an appointment about to be updated, to notice
+    it moving to another queue. One primary key lookup, skipped for new rows
+    and for saves whose update_fields leave the doctor and time alone.
+    """
+    instance._queue_slot = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not SLOT_FIELDS.intersection(update_fields):
+        return
+    instance._queue_slot = (
+        Appointment.objects.filter(pk=instance.pk).values_list('doctor_id', 'appointment_date').first()
+    )
+
+
+def _publish_saved(instance, created, old_slot):
+    if old_slot is not None and old_slot[1] is not None and old_slot != (instance.doctor_id, instance.appointment_date):
+        moved_from = Appointment(
+            appointment_id=instance.appointment_id, doctor_id=old_slot[0], appointment_date=old_slot[1],
+            patient_id=instance.patient_id, token_number=instance.token_number,
+        )
+        publish_appointments([moved_from], REMOVED)
+    publish_appointments([instance], ADDED if created else UPDATED)
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, created, raw=False, **kwargs):
+    """Pushes new appointments and status changes to the doctor's live queue after commit."""
+    if not raw:
+        transaction.on_commit(partial(_publish_saved, instance, created, getattr(instance, '_queue_slot', None)))
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(publish_appointments, [instance], REMOVED))
@@ -0,0 +1,89 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from apibackendapp.authentication import authenticate_request, get_doctor_id
+from apibackendapp.pubsub import get_broker
+from apibackendapp.roles import DOCTOR, has_role
+from .queue import queue_channel, queue_entries
+
+# Seconds between keep-alive comments when the queue is quiet
+HEARTBEAT_SECONDS = 15
+# Milliseconds the browser waits before reconnecting
+RECONNECT_MS = 3000
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _doctor_for_request(request):
+    """(doctor_id, None) for a doctor's token, otherwise (None, error response)."""
+    try:
+        user = authenticate_request(request, query_param='access_token')
+    except (InvalidToken, AuthenticationFailed):
+        user = None
+    if user is None:
+        return None, JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+    if not has_role(user, DOCTOR):
+        return None, JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
+    doctor_id = get_doctor_id(user)
+    if doctor_id is None:
+        return None, JsonResponse({'detail': 'No doctor profile is linked to this account.'}, status=403)
+    return doctor_id, None
+
+
+async def queue_events(doctor_id):
+    """
+    Server-sent events for a doctor's queue today: a `snapshot` of the queue
+    in token order, then `added` / `updated` / `removed` deltas as appointments
+    change. Ends at midnight; the browser reconnects and gets the new day.
+    """
+    day = timezone.localdate()
+    # Subscribe before reading the snapshot so no change falls in between
+    subscription = get_broker().subscribe(queue_channel(doctor_id, day))
+    try:
+        snapshot = await sync_to_async(queue_entries)(doctor_id, day)
+        yield f"retry: {RECONNECT_MS}\n" + _event('snapshot', {'doctor_id': doctor_id, 'date': day, 'queue': snapshot})
+
+        while timezone.localdate() == day:
+            message = await subscription.get(timeout=HEARTBEAT_SECONDS)
+            if subscription.overflowed:
+                # Too far behind: send the whole queue again
+                subscription.overflowed = False
+                snapshot = await sync_to_async(queue_entries)(doctor_id, day)
+                yield _event('snapshot', {'doctor_id': doctor_id, 'date': day, 'queue': snapshot})
+            elif message is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield _event(message['type'], message['appointment'])
+    finally:
+        subscription.close()
+
+
+async def doctor_queue_stream(request):
+    """
+    GET queue/stream/ (text/event-stream) - live queue of the logged-in doctor,
+    replacing polling of my-appointments. Needs the ASGI server (hmsapiproj/asgi.py).
+    Token in the Authorization header, or ?access_token= for EventSource.
+    Under WSGI the stream would hold a worker for as long as the browser
+    stays connected, so it answers 501 there instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'The live queue is only served by the ASGI server.'}, status=501)
+
+    doctor_id, error = await sync_to_async(_doctor_for_request)(request)
+    if error is not None:
+        return error
+
+    response = StreamingHttpResponse(queue_events(doctor_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
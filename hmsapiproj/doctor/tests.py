@@ -1,3 +1,226 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.test import AsyncClient, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apibackendapp import catalog
+from apibackendapp.authentication import role_tokens_for_user
+from apibackendapp.models import (
+    Appointment, Consultation, Doctor, LabTest, LabTestPrescription, LabTestReport, Medicine, MedicineCategory,
+    MedicinePrescription, MedicineStock, Patient, Specialization, Staff, StockLedgerEntry,
+)
+from apibackendapp.roles import DOCTOR
+from .queue import ADDED, REMOVED, UPDATED
+
+
+class DoctorRecordsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        group = Group.objects.create(name=DOCTOR)
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        cls.doctors = []
+        for name in ('House', 'Wilson'):
+            user = User.objects.create_user(name.lower(), password='x')
+            user.groups.add(group)
+            cls.doctors.append(Doctor.objects.create(name=name, specialization=specialization, user=user))
+        patient = Patient.objects.create(patient_name='John Smith')
+        start = timezone.now()
+        cls.appointments = {
+            doctor.pk: [
+                Appointment.objects.create(
+                    patient=patient, doctor=doctor, appointment_date=start + timedelta(hours=hour),
+                )
+                for hour in range(5)
+            ]
+            for doctor in cls.doctors
+        }
+        for appointments in cls.appointments.values():
+            for appointment in appointments:
+                Consultation.objects.create(
+                    consultation_id=f'C{appointment.pk}', appointment=appointment, symptoms='Cough',
+                )
+
+    def client_for(self, doctor):
+        client = APIClient()
+        client.force_authenticate(doctor.user)
+        return client
+
+    def test_lists_only_own_records_in_fixed_queries(self):
+        doctor = self.doctors[0]
+        client = self.client_for(doctor)
+        own = {appointment.pk for appointment in self.appointments[doctor.pk]}
+
+        # Roles and the doctor profile are resolved once and kept on the user
+        client.get('/doctor/my-appointments/')
+
+        # One keyset page query, with the patient and doctor joined in
+        with self.assertNumQueries(1):
+            response = client.get('/doctor/my-appointments/')
+        self.assertEqual({row['appointment_id'] for row in response.data['results']}, own)
+
+        # COUNT + page, the appointment and its patient joined in
+        with self.assertNumQueries(2):
+            response = client.get('/doctor/consultations/')
+        self.assertEqual({row['appointment'] for row in response.data['results']}, own)
+        self.assertEqual(response.data['results'][0]['patient']['patient_name'], 'John Smith')
+
+    def test_new_consultations_get_their_own_ids(self):
+        client = self.client_for(self.doctors[0])
+        own = self.appointments[self.doctors[0].pk][0]
+        ids = [
+            client.post('/doctor/consultations/', {'appointment': own.pk, 'symptoms': 'Fever'}, format='json')
+            .data['consultation_id']
+            for _ in range(2)
+        ]
+        self.assertEqual(ids[0], 'CON001')
+        self.assertRegex(ids[1], r'^CON\d{3}$')
+        self.assertNotEqual(*ids)
+
+    def test_cannot_write_for_another_doctors_appointment(self):
+        client = self.client_for(self.doctors[0])
+        other = self.appointments[self.doctors[1].pk][0]
+        response = client.post('/doctor/consultations/', {'appointment': other.pk, 'symptoms': 'Fever'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('appointment', response.data)
+
+    def test_requires_doctor_role(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('reception', password='x'))
+        self.assertEqual(client.get('/doctor/my-appointments/').status_code, 403)
+
+
+
+class AsyncViewParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('house')
+        user.groups.add(Group.objects.create(name=DOCTOR))
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        doctor = Doctor.objects.create(name='House', specialization=specialization, user=user)
+        staff = Staff.objects.create(staff_id='ST001', fullname='Sara George', user=User.objects.create_user('sara'))
+        lab_test = LabTest.objects.create(lab_test_name='Haemoglobin', min_range=12, max_range=17)
+        start = timezone.now()
+        for number in range(5):
+            patient = Patient.objects.create(patient_name=f'Patient {number}', contact_info='9876543210')
+            appointment = Appointment.objects.create(
+                patient=patient, doctor=doctor, appointment_date=start + timedelta(hours=number),
+            )
+            LabTestPrescription.objects.create(lab_test=lab_test, appointment=appointment, lab_test_value='18')
+            LabTestReport.objects.create(appointment=appointment, patient=patient, doctor=doctor, staff=staff)
+        cls.token = str(role_tokens_for_user(user).access_token)
+
+    def get_json(self, url):
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assertSameJson(self, sync_url, async_url):
+        """Every page of the async list equals the sync one (links compared without their path)."""
+        while sync_url:
+            sync_page = self.get_json(sync_url)
+            async_page = self.get_json(async_url)
+            self.assertEqual(
+                {key: value.replace('/async/', '/') if key in ('next', 'previous') and value else value
+                 for key, value in async_page.items()},
+                sync_page,
+            )
+            sync_url, async_url = sync_page['next'], async_page['next']
+
+    def test_my_appointments_match_the_sync_view(self):
+        self.assertSameJson('/doctor/my-appointments/?page_size=2', '/doctor/async/my-appointments/?page_size=2')
+
+    def test_lab_reports_match_the_sync_view(self):
+        self.assertSameJson('/doctor/lab-reports/?limit=2', '/doctor/async/lab-reports/?limit=2')
+
+
+class QueueStreamServerTests(TestCase):
+    def test_wsgi_requests_are_not_served(self):
+        self.assertEqual(self.client.get('/doctor/queue/stream/').status_code, 501)
+
+    async def test_asgi_requests_are_served(self):
+        # Reaches authentication: no token
+        self.assertEqual((await AsyncClient().get('/doctor/queue/stream/')).status_code, 401)
+
+
+class QueueSignalTests(TestCase):
+    def setUp(self):
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        self.house, self.wilson = [
+            Doctor.objects.create(name=name, specialization=specialization, user=User.objects.create_user(name))
+            for name in ('House', 'Wilson')
+        ]
+        self.patient = Patient.objects.create(patient_name='John Smith')
+
+    def saved(self, appointment, **kwargs):
+        """(change, doctor_id) of each publish_appointments() call the save makes after commit."""
+        with mock.patch('doctor.signals.publish_appointments') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                appointment.save(**kwargs)
+        return [(args[1], args[0][0].doctor_id) for args, _ in publish.call_args_list]
+
+    def test_moving_an_appointment_removes_it_from_the_old_queue(self):
+        appointment = Appointment(patient=self.patient, doctor=self.house, appointment_date=timezone.now())
+        self.assertEqual(self.saved(appointment), [(ADDED, self.house.pk)])
+
+        appointment = Appointment.objects.get(pk=appointment.pk)
+        appointment.doctor = self.wilson
+        self.assertEqual(self.saved(appointment), [(REMOVED, self.house.pk), (UPDATED, self.wilson.pk)])
+
+    def test_update_fields_outside_the_slot_skip_the_lookup(self):
+        appointment = Appointment.objects.create(patient=self.patient, doctor=self.house, appointment_date=timezone.now())
+        appointment.consultation_status = True
+        # Only the UPDATE: the stored doctor and time are not read
+        with self.assertNumQueries(1):
+            self.assertEqual(self.saved(appointment, update_fields=['consultation_status']), [(UPDATED, self.house.pk)])
+
+
+class PrescriptionStockTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('house')
+        user.groups.add(Group.objects.create(name=DOCTOR))
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        doctor = Doctor.objects.create(name='House', specialization=specialization, user=user)
+        self.appointment = Appointment.objects.create(
+            patient=Patient.objects.create(patient_name='John Smith'), doctor=doctor, appointment_date=timezone.now(),
+        )
+        category = MedicineCategory.objects.create(medicine_category_id='MC001', medicine_category_name='Tablets')
+        self.medicine = Medicine.objects.create(medicine_id='M001', medicine_name='Paracetamol', medicine_category=category)
+        self.stock = MedicineStock.objects.create(medicine_stock_id='MS001', medicine=self.medicine, stock_in_hand=5)
+        # The catalog bump of Medicine.save() waits for a commit that TestCase never makes
+        catalog.bump_version()
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def prescribe(self, dosage, duration):
+        return self.client.post('/doctor/prescriptions/', {
+            'appointment': self.appointment.pk, 'medicine': self.medicine.pk, 'dosage': dosage, 'duration': duration,
+        }, format='json')
+
+    def test_prescription_issues_its_stock(self):
+        response = self.prescribe(dosage=1, duration=5)
+        self.assertEqual(response.status_code, 201)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.stock_in_hand, 0)
+        self.assertEqual(response.data['medicine_prescription_id'], 'MPR001')
+        entry = StockLedgerEntry.objects.get()
+        self.assertEqual((entry.change, entry.medicine_prescription_id), (-5, response.data['medicine_prescription_id']))
+
+    def test_short_stock_issues_what_it_has_and_backorders_the_rest(self):
+        response = self.prescribe(dosage=2, duration=3)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.stock_in_hand, 0)
+        self.assertEqual(
+            list(StockLedgerEntry.objects.order_by('pk').values_list('change', 'balance_after', 'note')),
+            [(-5, 0, ''), (0, 0, 'Backordered (short by 1)')],
+        )
+
+    def test_unstocked_medicine_is_prescribed_without_a_movement(self):
+        self.stock.delete()
+        response = self.prescribe(dosage=1, duration=5)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(MedicinePrescription.objects.exists())
+        self.assertFalse(StockLedgerEntry.objects.exists())
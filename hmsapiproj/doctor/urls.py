@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import views, streams, async_views
 
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
@@ -19,4 +19,9 @@ router.register(r'lab-prescriptions', views.LabPrescriptionViewSet, basename='do
 # The API URLs are now determined automatically by the router.
 urlpatterns = [
     path('', include(router.urls)),
+    # Live queue (server-sent events, ASGI only)
+    path('queue/stream/', streams.doctor_queue_stream, name='doctor-queue-stream'),
+    # Async versions of the read-only lists (ASGI server)
+    path('async/my-appointments/', async_views.my_appointments, name='async-doctor-appointments'),
+    path('async/lab-reports/', async_views.lab_reports, name='async-doctor-lab-reports'),
 ]
\ No newline at end of file
@@ -1,56 +1,79 @@
 from rest_framework import viewsets, mixins
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import PermissionDenied
+from apibackendapp.authentication import get_doctor_id
+from apibackendapp.catalog import CatalogListMixin
+from apibackendapp.optimizer import OptimizedQuerysetMixin
+from apibackendapp.pagination import KeysetPagination
+from labtec.reports import report_queryset
+from labtec.serializers import LabTestReportDetailSerializer
 from .permissions import IsDoctorUser
 from .serializers import (
-    AppointmentDetailSerializer, ConsultationSerializer, LabReportDetailSerializer,
-    PrescriptionSerializer, LabPrescriptionSerializer, SimpleMedicineSerializer, SimpleLabTestSerializer
+    AppointmentDetailSerializer, ConsultationSerializer, PrescriptionSerializer,
+    LabPrescriptionSerializer, SimpleMedicineSerializer, SimpleLabTestSerializer
 )
 from apibackendapp.models import (
-    Appointment, Consultation, Medicine, LabTest, LabReport, 
-    Prescription, LabPrescription, Doctor
+    Appointment, Consultation, Medicine, LabTest, MedicinePrescription, LabTestPrescription
 )
 
-class DoctorAppointmentViewSet(viewsets.ReadOnlyModelViewSet):
+def current_doctor_id(request):
+    """
+    doctor_id of the logged-in doctor. Comes from the token claim in stateless
+    JWT mode, so no Doctor query is needed.
+    """
+    doctor_id = get_doctor_id(request.user)
+    if doctor_id is None:
+        raise PermissionDenied("No doctor profile is linked to this account.")
+    return doctor_id
+
+class DoctorRecordMixin:
+    """Passes the doctor's ID to the serializer, which checks the appointment is theirs."""
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['doctor_id'] = current_doctor_id(self.request)
+        return context
+
+class DoctorAppointmentViewSet(OptimizedQuerysetMixin, viewsets.ReadOnlyModelViewSet):
     """
     (Read-Only) Viewset for a Doctor to see THEIR appointments.
     """
+    queryset = Appointment.objects.order_by('-appointment_date')
     serializer_class = AppointmentDetailSerializer
     permission_classes = [IsAuthenticated, IsDoctorUser]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        # Get the Doctor profile linked to the logged-in user
-        doctor = Doctor.objects.get(user=self.request.user)
+        # Get the doctor_id linked to the logged-in user
+        doctor_id = current_doctor_id(self.request)
         # Return only appointments assigned to this doctor
-        return Appointment.objects.filter(doctor=doctor)
+        return super().get_queryset().filter(doctor_id=doctor_id)
 
-class ConsultationViewSet(viewsets.ModelViewSet):
+class ConsultationViewSet(DoctorRecordMixin, OptimizedQuerysetMixin, viewsets.ModelViewSet):
     """
     (CRUD) Viewset for a Doctor to manage Consultations.
     """
+    queryset = Consultation.objects.order_by('-created_date')
     serializer_class = ConsultationSerializer
     permission_classes = [IsAuthenticated, IsDoctorUser]
 
     def get_queryset(self):
-        # A Doctor can only see consultations they created
-        doctor = Doctor.objects.get(user=self.request.user)
-        return Consultation.objects.filter(doctor=doctor)
-
-    def perform_create(self, serializer):
-        # Automatically assign the logged-in doctor when creating
-        doctor = Doctor.objects.get(user=self.request.user)
-        serializer.save(doctor=doctor)
+        # A Doctor can only see consultations of their own appointments
+        doctor_id = current_doctor_id(self.request)
+        return super().get_queryset().filter(appointment__doctor_id=doctor_id)
 
-class MedicineListViewSet(viewsets.ReadOnlyModelViewSet):
+class MedicineListViewSet(CatalogListMixin, viewsets.ReadOnlyModelViewSet):
     """
     (Read-Only) Viewset for Doctors to see all available Medicines.
+    The list is served from the in-memory catalog snapshot.
     """
     queryset = Medicine.objects.all()
     serializer_class = SimpleMedicineSerializer
     permission_classes = [IsAuthenticated, IsDoctorUser]
 
-class LabTestListViewSet(viewsets.ReadOnlyModelViewSet):
+class LabTestListViewSet(CatalogListMixin, viewsets.ReadOnlyModelViewSet):
     """
     (Read-Only) Viewset for Doctors to see all available Lab Tests.
+    The list is served from the in-memory catalog snapshot.
     """
     queryset = LabTest.objects.all()
     serializer_class = SimpleLabTestSerializer
@@ -58,51 +81,45 @@ class LabTestListViewSet(viewsets.ReadOnlyModelViewSet):
 
 class LabReportViewSet(viewsets.ReadOnlyModelViewSet):
     """
-    (Read-Only) Viewset for a Doctor to see Lab Reports for THEIR patients.
+    (Read-Only) Viewset for a Doctor to see Lab Reports for THEIR patients,
+    with their range-flagged results (same as async/lab-reports/).
     """
-    serializer_class = LabReportDetailSerializer
+    serializer_class = LabTestReportDetailSerializer
     permission_classes = [IsAuthenticated, IsDoctorUser]
 
     def get_queryset(self):
-        # Get the Doctor profile
-        doctor = Doctor.objects.get(user=self.request.user)
+        # Get the doctor_id of the logged-in doctor
+        doctor_id = current_doctor_id(self.request)
         
         # Get IDs of all patients who have an appointment with this doctor
-        my_patient_ids = Appointment.objects.filter(doctor=doctor).values_list('patient_id', flat=True).distinct()
-        
-        # Return reports for those patients
-        return LabReport.objects.filter(patient_id__in=my_patient_ids)
+        my_patient_ids = Appointment.objects.filter(doctor_id=doctor_id).values('patient_id')
+
+        # Return reports for those patients (results in two queries, see labtec/reports.py)
+        return report_queryset().filter(patient_id__in=my_patient_ids).order_by('-report_date')
 
-class PrescriptionViewSet(viewsets.ModelViewSet):
+class PrescriptionViewSet(DoctorRecordMixin, OptimizedQuerysetMixin, viewsets.ModelViewSet):
     """
     (CRUD) Viewset for a Doctor to manage Medicine Prescriptions.
     """
+    queryset = MedicinePrescription.objects.order_by('medicine_prescription_id')
     serializer_class = PrescriptionSerializer
     permission_classes = [IsAuthenticated, IsDoctorUser]
 
     def get_queryset(self):
-        # A Doctor can only see prescriptions they created
-        doctor = Doctor.objects.get(user=self.request.user)
-        return Prescription.objects.filter(doctor=doctor)
+        # A Doctor can only see prescriptions of their own appointments
+        doctor_id = current_doctor_id(self.request)
+        return super().get_queryset().filter(appointment__doctor_id=doctor_id)
 
-    def perform_create(self, serializer):
-        # Automatically assign the logged-in doctor
-        doctor = Doctor.objects.get(user=self.request.user)
-        serializer.save(doctor=doctor)
-
-class LabPrescriptionViewSet(viewsets.ModelViewSet):
+class LabPrescriptionViewSet(DoctorRecordMixin, OptimizedQuerysetMixin, viewsets.ModelViewSet):
     """
     (CRUD) Viewset for a Doctor to manage Lab Test Prescriptions.
     """
+    queryset = LabTestPrescription.objects.order_by('-created_date')
     serializer_class = LabPrescriptionSerializer
     permission_classes = [IsAuthenticated, IsDoctorUser]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        # A Doctor can only see lab prescriptions they created
-        doctor = Doctor.objects.get(user=self.request.user)
-        return LabPrescription.objects.filter(doctor=doctor)
-
-    def perform_create(self, serializer):
-        # Automatically assign the logged-in doctor
-        doctor = Doctor.objects.get(user=self.request.user)
-        serializer.save(doctor=doctor)
\ No newline at end of file
+        # A Doctor can only see lab prescriptions of their own appointments
+        doctor_id = current_doctor_id(self.request)
+        return super().get_queryset().filter(appointment__doctor_id=doctor_id)
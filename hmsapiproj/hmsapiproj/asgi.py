@@ -3,6 +3,10 @@ ASGI config for hmsapiproj project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (e.g. ``uvicorn hmsapiproj.asgi:application``)
+for the live queue stream and the async read endpoints (doctor/async_views.py,
+reception/async_views.py); the DRF viewsets run here as well.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -42,14 +42,15 @@ INSTALLED_APPS = [
     'apibackendapp',
     'rest_framework.authtoken',
     'rest_framework_simplejwt',
-    'doctor'
+    'doctor',
     'admins',
-    'reception'
-    'rest_framework.authtoken',
+    'reception',
     'labtec'
 ]
 
 MIDDLEWARE = [
+    # First, so the times include every other middleware
+    'apibackendapp.middleware.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -137,7 +138,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # simplejwt's JWTAuthentication, plus the optional stateless mode below
+        'apibackendapp.authentication.StatelessJWTAuthentication',
     ),
     # Require authentication by default for all endpoints
     # (You will override this in views if you have a public/login endpoint)
@@ -146,7 +148,7 @@ REST_FRAMEWORK = {
     ),
     
     # Optional: Enable pagination for large lists (like patients)
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apibackendapp.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 100
 }
 
@@ -157,5 +159,61 @@ SIMPLE_JWT = {
     
     # Authentication header settings
     'AUTH_HEADER_TYPES': ('Bearer',), # API requests will use 'Authorization: Bearer <token>'
-    'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION'
-}
\ No newline at end of file
+    'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
+
+    # /api/token/ issues the same role claims as /login/
+    'TOKEN_OBTAIN_SERIALIZER': 'admins.serializers.RoleTokenObtainPairSerializer',
+}
+
+# Cache shared by every server process. It holds the version stamps of the
+# in-memory catalog (apibackendapp/catalog.py) and of the doctor directory
+# (reception/directory.py), so a process-local backend
+# (LocMemCache, DummyCache) fails the system checks (apibackendapp/checks.py).
+# The hms_cache table is created by migrate (apibackendapp migration 0012);
+# after changing LOCATION, run: python manage.py createcachetable
+# A Redis or Memcached backend can be used instead (and is needed for
+# ROLE_CACHE_TIMEOUT below to have an effect).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'hms_cache',
+    }
+}
+
+# Stateless JWT mode: when True, request.user is built from the token claims
+# (roles, doctor_id, staff_id) instead of loading the User row and its groups.
+# Role changes only take effect once the user gets a new token from /login/
+# (refreshed access tokens copy the claims of the refresh token).
+STATELESS_JWT = False
+
+# Number of IDs (P001, APP00001, ...) each worker process reserves from
+# tblidsequence at a time. See apibackendapp/utils.py allocate_ids.
+ID_BLOCK_SIZE = 20
+
+# Seconds a user's group names (roles) are cached between requests, in the
+# shared cache above. Entries are dropped when User.groups changes
+# (apibackendapp/signals.py). Ignored (roles are then only kept for the
+# duration of a request) when the default cache is LocMemCache/DummyCache,
+# or DatabaseCache, where a cache hit is a query like the one it replaces.
+# Set to 0 to only cache roles for the duration of a request.
+ROLE_CACHE_TIMEOUT = 300
+
+# Seconds a serialized doctor directory snapshot (reception doctors list) stays
+# in the cache. Snapshots are replaced as soon as a Doctor or Specialization
+# is saved or deleted, so this only bounds memory use.
+DOCTOR_DIRECTORY_CACHE_TIMEOUT = 3600
+
+# Publish/subscribe backend for live updates (doctor/queue/stream/).
+# LocalBroker only reaches clients connected to the same server process;
+# with several ASGI workers point this at a class with the same interface
+# backed by a real broker. See apibackendapp/pubsub.py.
+PUBSUB_BROKER = 'apibackendapp.pubsub.LocalBroker'
+
+# Request metrics (apibackendapp/middleware.py, GET metrics/).
+# A warning is logged for requests running more queries than QUERY_BUDGET;
+# QUERY_BUDGETS overrides it per endpoint ('GET patient-list': 5, or None
+# for no limit). The metrics endpoint covers the last QUERY_METRICS_WINDOW
+# seconds of the process serving it.
+QUERY_BUDGET = 25
+QUERY_BUDGETS = {}
+QUERY_METRICS_WINDOW = 900
@@ -0,0 +1,19 @@
+"""
+Settings for running the benchmark suite against SQLite instead of MySQL:
+
+    python manage.py benchmark_api --settings=hmsapiproj.settings_benchmark
+
+benchmark_api creates its own test database (benchmark.sqlite3 here,
+test_<NAME> on MySQL), so the regular database is never touched.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than the in-memory default, so the client threads share it
+        'TEST': {'NAME': BASE_DIR / 'benchmark.sqlite3'},
+    }
+}
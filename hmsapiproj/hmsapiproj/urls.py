@@ -5,4 +5,9 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('admins/', include('admins.urls')),
+    path('doctor/', include('doctor.urls')),
+    path('reception/', include('reception.urls')),
+    path('labtec/', include('labtec.urls')),
+    path('api/', include('apibackendapp.urls')),
 ]
@@ -0,0 +1,259 @@
+from datetime import date
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from apibackendapp.catalog import get_catalog, get_version
+from apibackendapp.exporting import iterate_rows
+from apibackendapp.models import LabTest, LabTestPrescription
+from apibackendapp.utils import day_bounds
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency: pip install numpy
+    np = None
+
+ANALYTICS_CHUNK_SIZE = 50_000
+PERCENTILES = (5, 25, 50, 75, 95)
+# Keyed by the catalog version: the flags depend on the lab tests' min/max
+# ranges, so editing a LabTest starts a new set of keys
+CACHE_KEY = 'lab-analytics:{version}:{month}'
+# Seconds a closed month's aggregates are kept; bounds how long entries of
+# an old catalog version stay in the cache
+ANALYTICS_CACHE_TIMEOUT = 7 * 24 * 3600
+
+FIELDS = ['lab_test_prescription_id', 'lab_test_value', 'lab_test_id', 'appointment__doctor_id']
+
+
+def require_numpy():
+    if np is None:
+        raise ImproperlyConfigured("Lab result analytics needs NumPy (pip install numpy).")
+
+
+# --- months ---
+
+def parse_month(value):
+    """'2026-09' -> date(2026, 9, 1)."""
+    year, month = value.split('-')
+    return date(int(year), int(month), 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def month_range(first, last):
+    month = first
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def is_closed(month):
+    return next_month(month) <= timezone.localdate().replace(day=1)
+
+
+def month_key(month, version=None):
+    return CACHE_KEY.format(version=version or get_version(), month=month.strftime('%Y-%m'))
+
+
+def invalidate_month(moment):
+    """Drops the cached aggregates of the month containing `moment` (a datetime)."""
+    if moment is not None:
+        day = timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+        cache.delete(month_key(day.replace(day=1)))
+
+
+# --- loading ---
+
+def parse_values(raw_values):
+    """
+    float64 array of the stored result strings; NaN where the value is
+    empty or not a number, and 'inf' / 'nan' results as parsed (load_month
+    drops every non-finite value). Clean chunks are converted in one NumPy call.
+    """
+    try:
+        return np.array(raw_values, dtype=np.float64)
+    except ValueError:
+        pass
+
+    def to_float(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return np.nan
+
+    return np.fromiter((to_float(value) for value in raw_values), dtype=np.float64, count=len(raw_values))
+
+
+def encode(labels, index):
+    """Integer codes for `labels`, extending `index` (label -> code) with new labels."""
+    uniques, inverse = np.unique(np.array(labels, dtype=object), return_inverse=True)
+    lookup = np.array([index.setdefault(label, len(index)) for label in uniques], dtype=np.int64)
+    return lookup[inverse]
+
+
+def load_month(month, chunk_size=ANALYTICS_CHUNK_SIZE):
+    """
+    (values, doctor codes, test codes, doctor ids, test ids, non-numeric count)
+    for the results created in `month`, read `chunk_size` rows at a time.
+    """
+    start, _ = day_bounds(month)
+    end, _ = day_bounds(next_month(month))
+    queryset = LabTestPrescription.objects.filter(created_date__gte=start, created_date__lt=end)
+    rows = iterate_rows(queryset, FIELDS, chunk_size)
+
+    doctor_index, test_index = {}, {}
+    values, doctor_codes, test_codes = [], [], []
+    non_numeric = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        _, raw_values, test_ids, doctor_ids = zip(*chunk)
+        parsed = parse_values(raw_values)
+        # Like labtec/reports.py range_flag: 'nan' and 'inf' are not results
+        numeric = np.isfinite(parsed)
+        non_numeric += int(len(parsed) - numeric.sum())
+        values.append(parsed[numeric])
+        doctor_codes.append(encode(doctor_ids, doctor_index)[numeric])
+        test_codes.append(encode(test_ids, test_index)[numeric])
+
+    if not values:
+        empty = np.empty(0, dtype=np.int64)
+        return np.empty(0), empty, empty, [], [], non_numeric
+    return (
+        np.concatenate(values), np.concatenate(doctor_codes), np.concatenate(test_codes),
+        list(doctor_index), list(test_index), non_numeric,
+    )
+
+
+# --- aggregation ---
+
+def reference_ranges(test_ids):
+    """(min_range, max_range) float arrays aligned with `test_ids`; NaN = no limit."""
+    catalog = get_catalog()
+    ranges = np.full((2, len(test_ids)), np.nan)
+    for code, test_id in enumerate(test_ids):
+        record = catalog.get(LabTest, test_id)
+        if record is not None:
+            ranges[0, code] = np.nan if record.min_range is None else record.min_range
+            ranges[1, code] = np.nan if record.max_range is None else record.max_range
+    return ranges[0], ranges[1]
+
+
+def group_stats(keys, values, low, high):
+    """
+    Per distinct key: count, low, high, mean, min, max and PERCENTILES of the
+    values, which must already be sorted ascending. Every statistic is
+    computed for all groups at once.
+    """
+    if not len(keys):
+        return []
+    # A stable sort by key keeps each group's values ascending; small
+    # unsigned keys let NumPy use its radix sort.
+    order = np.argsort(keys.astype(np.min_scalar_type(keys.max())), kind='stable')
+    keys, values = keys[order], values[order]
+    uniques, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+
+    stats = {
+        'count': counts,
+        'low': np.add.reduceat(low[order].astype(np.int64), starts),
+        'high': np.add.reduceat(high[order].astype(np.int64), starts),
+        'mean': np.add.reduceat(values, starts) / counts,
+        'min': values[starts],
+        'max': values[starts + counts - 1],
+    }
+    # Linear interpolation between the closest ranks, like np.percentile
+    percentiles = {}
+    for q in PERCENTILES:
+        position = starts + (counts - 1) * (q / 100)
+        below = np.floor(position).astype(np.int64)
+        above = np.ceil(position).astype(np.int64)
+        percentiles[f'p{q}'] = values[below] + (values[above] - values[below]) * (position - below)
+
+    groups = []
+    for i, key in enumerate(uniques):
+        group = {name: column[i].item() for name, column in stats.items()}
+        group['out_of_range'] = group['low'] + group['high']
+        group['percentiles'] = {name: round(column[i].item(), 4) for name, column in percentiles.items()}
+        group['mean'] = round(group['mean'], 4)
+        groups.append((key.item(), group))
+    return groups
+
+
+def summarize(values, doctor_codes, test_codes, min_ranges, max_ranges):
+    """
+    (per-test groups, per-(doctor, test) groups) from group_stats(); the
+    doctor/test key is doctor_code * len(min_ranges) + test_code.
+    """
+    # Sort once; both groupings reuse the order
+    order = np.argsort(values)
+    values, doctor_codes, test_codes = values[order], doctor_codes[order], test_codes[order]
+    # Comparisons with NaN are False, so a missing limit never flags a value
+    low = values < min_ranges[test_codes]
+    high = values > max_ranges[test_codes]
+
+    n_tests = max(len(min_ranges), 1)
+    return (
+        group_stats(test_codes, values, low, high),
+        group_stats(doctor_codes * n_tests + test_codes, values, low, high),
+    )
+
+
+def aggregate(values, doctor_codes, test_codes, doctor_ids, test_ids):
+    """Aggregates for one month of numeric results (see load_month)."""
+    min_ranges, max_ranges = reference_ranges(test_ids)
+    per_test, per_doctor_test = summarize(values, doctor_codes, test_codes, min_ranges, max_ranges)
+
+    catalog = get_catalog()
+    by_test = []
+    for code, group in per_test:
+        record = catalog.get(LabTest, test_ids[code])
+        by_test.append({
+            'lab_test_id': test_ids[code],
+            'lab_test_name': record.lab_test_name if record else None,
+            'min_range': None if np.isnan(min_ranges[code]) else min_ranges[code].item(),
+            'max_range': None if np.isnan(max_ranges[code]) else max_ranges[code].item(),
+            **group,
+        })
+
+    n_tests = max(len(test_ids), 1)
+    by_doctor_test = []
+    for key, group in per_doctor_test:
+        by_doctor_test.append({
+            'doctor_id': doctor_ids[key // n_tests],
+            'lab_test_id': test_ids[key % n_tests],
+            **group,
+        })
+
+    return {'results': len(values), 'by_test': by_test, 'by_doctor_test': by_doctor_test}
+
+
+def compute_month(month, chunk_size=ANALYTICS_CHUNK_SIZE):
+    values, doctor_codes, test_codes, doctor_ids, test_ids, non_numeric = load_month(month, chunk_size)
+    summary = aggregate(values, doctor_codes, test_codes, doctor_ids, test_ids)
+    return {'month': month.strftime('%Y-%m'), 'non_numeric': non_numeric, **summary}
+
+
+def month_summary(month, refresh=False, chunk_size=ANALYTICS_CHUNK_SIZE):
+    """
+    Out-of-range counts and value distributions per lab test and per
+    (doctor, lab test) for `month`. Months that are over are cached in the
+    shared cache until one of their results changes (see labtec/signals.py)
+    or a lab test is edited (new catalog version).
+    """
+    require_numpy()
+    closed = is_closed(month)
+    key = month_key(month, get_catalog().version)
+    if closed and not refresh:
+        summary = cache.get(key)
+        if summary is not None:
+            return summary
+
+    summary = {**compute_month(month, chunk_size), 'closed': closed}
+    if closed:
+        cache.set(key, summary, ANALYTICS_CACHE_TIMEOUT)
+    return summary
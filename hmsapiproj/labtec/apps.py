@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LabtecConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'labtec'
+    # Loads signals.py (lab analytics cache invalidation) when the app starts.
+    def ready(self):
+        import labtec.signals
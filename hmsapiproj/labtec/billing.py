@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+
+from apibackendapp.models import Billing, LabTestPrescription
+from apibackendapp.utils import allocate_ids
+
+# Patients billed per transaction by create_bills_for_patients
+BILLING_BATCH_SIZE = 500
+
+
+def unbilled_prescriptions():
+    """Lab test prescriptions that are not on any bill yet."""
+    return LabTestPrescription.objects.filter(bill__isnull=True)
+
+
+def create_bill(patient, **bill_fields):
+    """
+    Creates a Billing for `patient` covering every lab test that has not
+    been billed yet, in one transaction:
+
+    1. insert the bill
+    2. claim the patient's unbilled prescriptions with a single UPDATE
+       (row locks stop a concurrent bill from claiming them too)
+    3. SUM(lab_test.amount) over the claimed prescriptions
+    4. store the total on the bill
+    """
+    with transaction.atomic():
+        bill = Billing.objects.create(patient=patient, amount_due=0, **bill_fields)
+
+        unbilled_prescriptions().filter(appointment__patient=patient).update(bill=bill)
+
+        bill.amount_due = LabTestPrescription.objects.filter(bill=bill).aggregate(
+            total=Sum('lab_test__amount')
+        )['total'] or 0
+        Billing.objects.filter(pk=bill.pk).update(amount_due=bill.amount_due)
+
+    return bill
+
+
+def _bill_patients(patient_ids, bill_fields):
+    """Bills one chunk of patients. Returns the bills that have at least one line."""
+    bill_ids = allocate_ids(Billing, len(patient_ids))
+    bill_for_patient = dict(zip(patient_ids, bill_ids))
+
+    with transaction.atomic():
+        bills = Billing.objects.bulk_create([
+            Billing(bill_id=bill_id, patient_id=patient_id, amount_due=0, **bill_fields)
+            for patient_id, bill_id in bill_for_patient.items()
+        ])
+
+        # Claim every unbilled prescription of the chunk in one UPDATE: each
+        # row takes the new bill of its appointment's patient from a subquery,
+        # so the statement has the same size whatever the number of appointments
+        new_bill = Billing.objects.filter(
+            bill_id__in=bill_ids, patient__appointment=OuterRef('appointment_id'),
+        ).values('bill_id')[:1]
+        unbilled_prescriptions().filter(
+            appointment__patient_id__in=patient_ids
+        ).update(bill_id=Subquery(new_bill))
+
+        # Totals per bill with one grouped SUM
+        totals = dict(
+            LabTestPrescription.objects.filter(bill_id__in=bill_ids)
+            .values('bill_id')
+            .annotate(total=Sum('lab_test__amount'))
+            .values_list('bill_id', 'total')
+        )
+
+        billed = [bill for bill in bills if bill.bill_id in totals]
+        for bill in billed:
+            bill.amount_due = totals[bill.bill_id] or 0
+        Billing.objects.bulk_update(billed, ['amount_due'], batch_size=BILLING_BATCH_SIZE)
+
+        # Lines claimed by a concurrent create_bill() in the meantime leave an empty bill
+        empty = [bill.bill_id for bill in bills if bill.bill_id not in totals]
+        if empty:
+            Billing.objects.filter(bill_id__in=empty).delete()
+
+    return billed
+
+
+def create_bills_for_patients(patient_ids=None, batch_size=BILLING_BATCH_SIZE, **bill_fields):
+    """
+    Batch billing: one bill per patient with unbilled lab tests.
+    Patients are found with a single grouped query and billed in chunks of
+    `batch_size`, each chunk in its own transaction. `patient_ids` limits the
+    run to those patients. Returns the created bills.
+    """
+    pending = unbilled_prescriptions()
+    if patient_ids is not None:
+        pending = pending.filter(appointment__patient_id__in=patient_ids)
+
+    to_bill = list(
+        pending.values_list('appointment__patient_id', flat=True)
+        .order_by('appointment__patient_id')
+        .distinct()
+    )
+
+    bills = []
+    for start in range(0, len(to_bill), batch_size):
+        bills.extend(_bill_patients(to_bill[start:start + batch_size], bill_fields))
+    return bills
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from labtec.billing import create_bills_for_patients, BILLING_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Creates one bill per patient for all lab tests that have not been billed yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patient', action='append', dest='patients',
+                            help="Only bill this patient ID (can be repeated).")
+        parser.add_argument('--due-days', type=int, default=7,
+                            help="Days from today until the bill is due (default 7).")
+        parser.add_argument('--batch-size', type=int, default=BILLING_BATCH_SIZE,
+                            help="Patients billed per transaction.")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        bills = create_bills_for_patients(
+            patient_ids=options['patients'],
+            batch_size=options['batch_size'],
+            bill_date=today,
+            due_date=today + timedelta(days=options['due_days']),
+            payment_status='Pending',
+        )
+        total = sum(bill.amount_due for bill in bills)
+        self.stdout.write(self.style.SUCCESS(f"Created {len(bills)} bills, {total} due in total."))
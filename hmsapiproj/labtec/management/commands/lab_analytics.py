@@ -0,0 +1,74 @@
+import json
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from labtec.analytics import (
+    month_summary, month_range, parse_month, summarize, require_numpy, ANALYTICS_CHUNK_SIZE,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Computes (and caches, for months that are over) abnormal lab result "
+        "analytics per lab test and per doctor. Needs NumPy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='first', help="First month, YYYY-MM (default: this month).")
+        parser.add_argument('--to', dest='last', help="Last month, YYYY-MM (default: --from).")
+        parser.add_argument('--refresh', action='store_true',
+                            help="Recompute months that are already cached.")
+        parser.add_argument('--chunk-size', type=int, default=ANALYTICS_CHUNK_SIZE,
+                            help="Results read from the database per chunk.")
+        parser.add_argument('--json', action='store_true', help="Print the aggregates as JSON.")
+        parser.add_argument('--benchmark', type=int, metavar='N',
+                            help="Only time the aggregation of N random results (no database).")
+
+    def handle(self, *args, **options):
+        try:
+            require_numpy()
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+
+        if options['benchmark']:
+            return self.benchmark(options['benchmark'])
+
+        try:
+            first = parse_month(options['first']) if options['first'] else timezone.localdate().replace(day=1)
+            last = parse_month(options['last']) if options['last'] else first
+        except ValueError:
+            raise CommandError("--from/--to must be YYYY-MM.")
+
+        summaries = []
+        for month in month_range(first, last):
+            started = time.perf_counter()
+            summary = month_summary(month, refresh=options['refresh'], chunk_size=options['chunk_size'])
+            summaries.append(summary)
+            out_of_range = sum(row['out_of_range'] for row in summary['by_test'])
+            self.stderr.write(
+                f"{summary['month']}: {summary['results']} numeric results, {out_of_range} out of range, "
+                f"{summary['non_numeric']} non-numeric ({time.perf_counter() - started:.2f}s)"
+            )
+
+        if options['json']:
+            self.stdout.write(json.dumps(summaries, indent=2))
+
+    def benchmark(self, count):
+        import numpy as np
+
+        rng = np.random.default_rng(1)
+        values = rng.normal(14, 3, count)
+        doctors = rng.integers(0, 50, count)
+        tests = rng.integers(0, 40, count)
+        min_ranges, max_ranges = np.full(40, 11.0), np.full(40, 17.0)
+
+        started = time.perf_counter()
+        by_test, by_doctor_test = summarize(values, doctors, tests, min_ranges, max_ranges)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Aggregated {count} results into {len(by_test)} tests and "
+            f"{len(by_doctor_test)} doctor/test groups in {elapsed:.2f}s."
+        ))
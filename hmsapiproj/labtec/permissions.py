@@ -0,0 +1,20 @@
+from rest_framework import permissions
+from apibackendapp.roles import DOCTOR, STAFF, has_role, is_admin
+
+
+class IsLabStaffOrAdmin(permissions.BasePermission):
+    """
+    Allows access only to users in the 'Staff' group (the lab technicians
+    who write the lab reports) and admins.
+    """
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (is_admin(request.user) or has_role(request.user, STAFF))
+
+
+class IsDoctorOrAdmin(permissions.BasePermission):
+    """
+    Allows access only to users in the 'Doctor' group and admins
+    (the same audience as the doctor app's lab report views).
+    """
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (is_admin(request.user) or has_role(request.user, DOCTOR))
@@ -0,0 +1,48 @@
+import math
+
+from django.db.models import Prefetch
+
+from apibackendapp.models import LabTestReport, LabTestPrescription
+
+LOW, NORMAL, HIGH = 'low', 'normal', 'high'
+
+# Largest number of reports the batch endpoint returns at once
+MAX_BATCH_REPORTS = 100
+
+
+def range_flag(value, min_range, max_range):
+    """
+    'low' / 'normal' / 'high' for a result against the test's reference range,
+    or None when the value is not a finite number or the test has no range.
+    """
+    if min_range is None and max_range is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    # float() also accepts 'nan' and 'inf', which are not results
+    if not math.isfinite(number):
+        return None
+    if min_range is not None and number < min_range:
+        return LOW
+    if max_range is not None and number > max_range:
+        return HIGH
+    return NORMAL
+
+
+def report_queryset():
+    """
+    Reports with everything the detail serializer reads: patient, doctor,
+    staff and appointment joined in, and the appointment's results (with
+    their lab tests) in `appointment.lab_results`. Two queries for any
+    number of reports.
+    """
+    results = (
+        LabTestPrescription.objects.select_related('lab_test')
+        .order_by('created_date', 'lab_test_prescription_id')
+    )
+    return (
+        LabTestReport.objects.select_related('patient', 'doctor', 'staff', 'appointment')
+        .prefetch_related(Prefetch('appointment__labtestprescription_set', queryset=results, to_attr='lab_results'))
+    )
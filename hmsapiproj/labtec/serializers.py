@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from apibackendapp.catalog import CatalogRelatedField
 from apibackendapp.models import (
     LabTest,
     LabTestPrescription,
@@ -9,6 +10,8 @@ from apibackendapp.models import (
     Doctor,
     Consultation
 )
+from .billing import create_bill
+from .reports import range_flag
 
 # -------------------------
 # PATIENT SERIALIZER
@@ -61,6 +64,8 @@ class LabTestSerializer(serializers.ModelSerializer):
 # -------------------------
 
 class LabTestPrescriptionSerializer(serializers.ModelSerializer):
+    # Validated against the catalog snapshot instead of a query per prescription
+    lab_test = CatalogRelatedField(LabTest)
     lab_test_details = LabTestSerializer(source="lab_test", read_only=True)
 
     class Meta:
@@ -123,6 +128,42 @@ class LabTestReportSerializer(serializers.ModelSerializer):
         return data
 
 
+class LabResultSerializer(serializers.ModelSerializer):
+    """One prescribed test of a report with its value flagged against the reference range."""
+    lab_test_name = serializers.CharField(source="lab_test.lab_test_name", read_only=True)
+    min_range = serializers.IntegerField(source="lab_test.min_range", read_only=True)
+    max_range = serializers.IntegerField(source="lab_test.max_range", read_only=True)
+    flag = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LabTestPrescription
+        fields = [
+            "lab_test_prescription_id",
+            "lab_test",
+            "lab_test_name",
+            "lab_test_value",
+            "min_range",
+            "max_range",
+            "flag",
+            "remarks",
+            "created_date",
+        ]
+
+    def get_flag(self, obj):
+        return range_flag(obj.lab_test_value, obj.lab_test.min_range, obj.lab_test.max_range)
+
+
+class LabTestReportDetailSerializer(LabTestReportSerializer):
+    """
+    Complete report: header plus every result of its appointment.
+    Expects a queryset from labtec.reports.report_queryset().
+    """
+    results = LabResultSerializer(source="appointment.lab_results", many=True, read_only=True)
+
+    class Meta(LabTestReportSerializer.Meta):
+        fields = LabTestReportSerializer.Meta.fields + ["results"]
+
+
 # -------------------------
 # BILLING SERIALIZER
 # -------------------------
@@ -141,6 +182,8 @@ class BillingSerializer(serializers.ModelSerializer):
             "due_date",
             "payment_status",
         ]
+        # Calculated from the patient's lab tests in labtec/billing.py
+        read_only_fields = ["amount_due"]
 
     def validate(self, data):
         if not data.get("patient"):
@@ -148,17 +191,5 @@ class BillingSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        """Auto calculate total amount due based on patient’s lab tests."""
-        billing = super().create(validated_data)
-
-        total = 0
-        appointments = Appointment.objects.filter(patient=billing.patient)
-
-        for app in appointments:
-            prescriptions = LabTestPrescription.objects.filter(appointment=app)
-            for pres in prescriptions:
-                total += pres.lab_test.amount or 0
-        
-        billing.amount_due = total
-        billing.save()
-        return billing
+        """Auto calculate total amount due based on patient’s unbilled lab tests."""
+        return create_bill(**validated_data)
\ No newline at end of file
@@ -0,0 +1,17 @@
+# labtec/signals.py
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apibackendapp.models import LabTestPrescription
+from .analytics import invalidate_month
+
+
+# --- LAB ANALYTICS CACHE ---
+
+@receiver([post_save, post_delete], sender=LabTestPrescription)
+def lab_result_changed(sender, instance, **kwargs):
+    """A late or corrected result invalidates the cached analytics of its month."""
+    transaction.on_commit(partial(invalidate_month, instance.created_date))
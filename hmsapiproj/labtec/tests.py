@@ -1,3 +1,245 @@
-from django.test import TestCase
+from datetime import date, datetime, timezone as dt_timezone
 
-# Create your tests here.
+from decimal import Decimal
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apibackendapp.models import (
+    Appointment, Billing, Doctor, LabTest, LabTestPrescription, LabTestReport, Patient, Specialization, Staff,
+)
+from apibackendapp.roles import ADMIN, DOCTOR, RECEPTION, STAFF
+from apibackendapp.tests import ListQueryCountMixin
+from .analytics import month_summary
+from .billing import create_bills_for_patients
+from .reports import HIGH, LOW, NORMAL, range_flag
+
+CLOSED_MONTH = date(2025, 3, 1)
+
+
+class MonthSummaryCacheTests(TestCase):
+    def setUp(self):
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        doctor = Doctor.objects.create(name='House', specialization=specialization, user=User.objects.create_user('house'))
+        appointment = Appointment.objects.create(patient=Patient.objects.create(patient_name='John Smith'), doctor=doctor)
+        self.lab_test = LabTest.objects.create(lab_test_name='Haemoglobin', min_range=12, max_range=17)
+        result = LabTestPrescription.objects.create(lab_test=self.lab_test, appointment=appointment, lab_test_value='18')
+        LabTestPrescription.objects.filter(pk=result.pk).update(
+            created_date=datetime(2025, 3, 15, 10, tzinfo=dt_timezone.utc),
+        )
+
+    def high(self):
+        return month_summary(CLOSED_MONTH)['by_test'][0]['high']
+
+    def test_editing_a_lab_test_range_recomputes_closed_months(self):
+        self.assertEqual(self.high(), 1)
+        # Served from the cache: the catalog version and the summary, one read each
+        with self.assertNumQueries(2):
+            self.assertEqual(self.high(), 1)
+
+        self.lab_test.max_range = 20
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lab_test.save()
+        self.assertEqual(self.high(), 0)
+
+    def test_non_finite_values_count_as_non_numeric(self):
+        result = LabTestPrescription.objects.get()
+        for value in ('inf', 'nan'):
+            LabTestPrescription.objects.create(
+                lab_test=self.lab_test, appointment=result.appointment, lab_test_value=value,
+            )
+        LabTestPrescription.objects.update(created_date=result.created_date)
+
+        summary = month_summary(CLOSED_MONTH)
+        self.assertEqual((summary['results'], summary['non_numeric']), (1, 2))
+        self.assertEqual(summary['by_test'][0]['max'], 18)
+
+
+class RangeFlagTests(SimpleTestCase):
+    def test_flags(self):
+        self.assertEqual(range_flag('11.5', 12, 17), LOW)
+        self.assertEqual(range_flag('14', 12, 17), NORMAL)
+        self.assertEqual(range_flag(' 17.2 ', 12, 17), HIGH)
+        self.assertEqual(range_flag('30', 12, None), NORMAL)
+
+    def test_unparseable_values_are_not_flagged(self):
+        for value in (None, '', 'positive', 'nan', 'NaN', 'inf', '-Infinity', '1e999'):
+            with self.subTest(value=value):
+                self.assertIsNone(range_flag(value, 12, 17))
+        self.assertIsNone(range_flag('14', None, None))
+
+
+class BillingExportPermissionTests(TestCase):
+    def export_status(self, group_name):
+        user = User.objects.create_user(group_name)
+        user.groups.add(Group.objects.create(name=group_name))
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/labtec/bills/export/')
+        if response.status_code == 200:
+            b''.join(response.streaming_content)
+        return response.status_code
+
+    def test_reception_only(self):
+        Billing.objects.create(patient=Patient.objects.create(patient_name='John Smith'), payment_status='Paid')
+        self.assertEqual(self.export_status(RECEPTION), 200)
+        self.assertEqual(self.export_status(STAFF), 403)
+
+
+class AnalyticsPermissionTests(TestCase):
+    def analytics_status(self, group_name):
+        user = User.objects.create_user(group_name)
+        user.groups.add(Group.objects.create(name=group_name))
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/labtec/analytics/lab-results/').status_code
+
+    def test_doctors_and_admins_only(self):
+        self.assertEqual(self.analytics_status(DOCTOR), 200)
+        self.assertEqual(self.analytics_status(ADMIN), 200)
+        self.assertEqual(self.analytics_status(STAFF), 403)
+        self.assertEqual(self.analytics_status(RECEPTION), 403)
+
+
+class LabReportPermissionTests(TestCase):
+    def report_statuses(self, group_name):
+        user = User.objects.create_user(group_name)
+        user.groups.add(Group.objects.create(name=group_name))
+        client = APIClient()
+        client.force_authenticate(user)
+        return (
+            client.get('/labtec/report/RPT001/').status_code,
+            client.get('/labtec/reports/?ids=RPT001').status_code,
+        )
+
+    def test_lab_staff_and_admins_only(self):
+        self.assertEqual(self.report_statuses(STAFF), (404, 200))
+        self.assertEqual(self.report_statuses(ADMIN), (404, 200))
+        self.assertEqual(self.report_statuses(DOCTOR), (403, 403))
+        self.assertEqual(self.report_statuses(RECEPTION), (403, 403))
+
+
+class BatchBillingTests(TestCase):
+    def setUp(self):
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        self.doctor = Doctor.objects.create(name='House', specialization=specialization, user=User.objects.create_user('house'))
+        self.lab_tests = [
+            LabTest.objects.create(lab_test_name=name, amount=amount)
+            for name, amount in (('Haemoglobin', 150), ('Lipid Profile', 300))
+        ]
+
+    def patient_with_tests(self, name, visits, tests_per_visit):
+        patient = Patient.objects.create(patient_name=name)
+        for _ in range(visits):
+            appointment = Appointment.objects.create(patient=patient, doctor=self.doctor)
+            for lab_test in self.lab_tests[:tests_per_visit]:
+                LabTestPrescription.objects.create(lab_test=lab_test, appointment=appointment)
+        return patient
+
+    def test_one_bill_per_patient_with_unbilled_tests(self):
+        smith = self.patient_with_tests('John Smith', visits=3, tests_per_visit=2)
+        smyth = self.patient_with_tests('Jon Smyth', visits=1, tests_per_visit=1)
+        # Visits without lab tests are not billed
+        no_tests = self.patient_with_tests('Sara George', visits=2, tests_per_visit=0)
+
+        bills = create_bills_for_patients([smith.pk, smyth.pk, no_tests.pk])
+        self.assertEqual(
+            {bill.patient_id: bill.amount_due for bill in bills},
+            {smith.pk: Decimal(1350), smyth.pk: Decimal(150)},
+        )
+        self.assertFalse(LabTestPrescription.objects.filter(bill__isnull=True).exists())
+        self.assertEqual(create_bills_for_patients(), [])
+
+    def test_claiming_statement_does_not_grow_with_appointments(self):
+        def claim_statement(patient):
+            """The UPDATE that attaches the patient's lab tests to the new bill."""
+            with CaptureQueriesContext(connection) as queries:
+                create_bills_for_patients([patient.pk])
+            table = LabTestPrescription._meta.db_table
+            updates = [
+                query['sql'] for query in queries
+                if query['sql'].startswith('UPDATE') and table in query['sql'].split(' SET ')[0]
+            ]
+            self.assertEqual(len(updates), 1)
+            return updates[0]
+
+        few = claim_statement(self.patient_with_tests('John Smith', visits=2, tests_per_visit=2))
+        many = claim_statement(self.patient_with_tests('Jon Smyth', visits=50, tests_per_visit=2))
+        self.assertEqual(len(few), len(many))
+
+
+class BilledPrescriptionBackfillTests(TestCase):
+    def test_only_tests_prescribed_by_the_bill_date_are_linked(self):
+        link_billed_prescriptions = import_module(
+            'apibackendapp.migrations.0005_labtestprescription_bill'
+        ).link_billed_prescriptions
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        doctor = Doctor.objects.create(name='House', specialization=specialization, user=User.objects.create_user('house'))
+        patient = Patient.objects.create(patient_name='John Smith')
+        appointment = Appointment.objects.create(patient=patient, doctor=doctor)
+        lab_test = LabTest.objects.create(lab_test_name='Haemoglobin', amount=150)
+        results = {}
+        for day in (1, 10, 20):
+            result = LabTestPrescription.objects.create(lab_test=lab_test, appointment=appointment)
+            LabTestPrescription.objects.filter(pk=result.pk).update(
+                created_date=datetime(2025, 3, day, 10, tzinfo=dt_timezone.utc),
+            )
+            results[day] = result.pk
+        Billing.objects.create(patient=patient, bill_date=date(2025, 3, 5))
+        latest = Billing.objects.create(patient=patient, bill_date=date(2025, 3, 10))
+
+        link_billed_prescriptions(apps, None)
+        self.assertEqual(
+            dict(LabTestPrescription.objects.values_list('pk', 'bill_id')),
+            {results[1]: latest.pk, results[10]: latest.pk, results[20]: None},
+        )
+
+
+class ListQueryCountTests(ListQueryCountMixin, TestCase):
+    def setUp(self):
+        lab = User.objects.create_user('lab')
+        lab.groups.add(Group.objects.create(name=STAFF))
+        self.client = APIClient()
+        self.client.force_authenticate(lab)
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        self.doctor = Doctor.objects.create(name='House', specialization=specialization, user=User.objects.create_user('house'))
+        self.staff = Staff.objects.create(staff_id='ST001', fullname='Sara George', user=User.objects.create_user('sara'))
+        self.lab_tests = [
+            LabTest.objects.create(lab_test_name=name, min_range=low, max_range=high)
+            for name, low, high in (('Haemoglobin', 12, 17), ('Fasting Glucose', 70, 100))
+        ]
+        self.reports = []
+        self.add_reports(2)
+
+    def add_reports(self, count):
+        """`count` appointments, each with a result of every lab test and a report."""
+        for _ in range(count):
+            patient = Patient.objects.create(patient_name='John Smith')
+            appointment = Appointment.objects.create(patient=patient, doctor=self.doctor)
+            for lab_test in self.lab_tests:
+                LabTestPrescription.objects.create(lab_test=lab_test, appointment=appointment, lab_test_value='15')
+            self.reports.append(LabTestReport.objects.create(
+                appointment=appointment, patient=patient, doctor=self.doctor, staff=self.staff,
+            ))
+
+    def test_prescription_list_runs_fixed_queries(self):
+        self.assertListQueriesFlat(self.client, ['/labtec/prescriptions/'], lambda: self.add_reports(20))
+
+    def test_report_batch_runs_fixed_queries(self):
+        def batch_queries():
+            url = '/labtec/reports/?ids=' + ','.join(report.pk for report in self.reports)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(len(response.data['results']), len(self.reports))
+            self.assertEqual(response.data['results'][0]['patient']['patient_name'], 'John Smith')
+            return len(queries)
+
+        self.client.get('/labtec/reports/?ids=' + self.reports[0].pk)
+        few = batch_queries()
+        self.add_reports(20)
+        self.assertEqual(batch_queries(), few)
@@ -5,6 +5,9 @@ from .views import (
     LabTestPrescriptionView,
     LabTestPrescriptionDetailView,
     LabReportView,
+    LabReportBatchView,
+    BillingExportView,
+    LabResultAnalyticsView,
 )
 
 urlpatterns = [
@@ -15,4 +18,9 @@ urlpatterns = [
     path('prescriptions/<str:pk>/', LabTestPrescriptionDetailView.as_view(), name="labtest-prescription-detail"),
 
     path('report/<str:pk>/', LabReportView.as_view(), name="labtest-report"),
+    path('reports/', LabReportBatchView.as_view(), name="labtest-report-batch"),
+
+    path('bills/export/', BillingExportView.as_view(), name="billing-export"),
+
+    path('analytics/lab-results/', LabResultAnalyticsView.as_view(), name="lab-result-analytics"),
 ]
@@ -1,29 +1,43 @@
 from django.shortcuts import render
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
 
 # Create your views here.
 from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from apibackendapp.models import (
-    LabTest, LabTestPrescription, LabTestReport,
+    LabTest, LabTestPrescription, LabTestReport, Billing,
 )
+from apibackendapp.catalog import CatalogListMixin
+from apibackendapp.exporting import export_response, export_format, date_range_filter
+from apibackendapp.optimizer import OptimizedQuerysetMixin
+from apibackendapp.pagination import KeysetPagination
+from apibackendapp.projection import ProjectionListMixin
+from reception.permissions import IsReceptionStaff
+from .permissions import IsDoctorOrAdmin, IsLabStaffOrAdmin
 from .serializers import (
     LabTestSerializer,
     LabTestPrescriptionSerializer,
     LabTestReportSerializer,
+    LabTestReportDetailSerializer,
 )
+from .reports import report_queryset, MAX_BATCH_REPORTS
+from .analytics import month_summary, month_range, parse_month, require_numpy
 
 # -----------------------
 # LAB TEST CRUD
 # -----------------------
 
-class LabTestListCreateView(generics.ListCreateAPIView):
+class LabTestListCreateView(CatalogListMixin, generics.ListCreateAPIView):
+    # GET is served from the in-memory catalog snapshot
     queryset = LabTest.objects.all()
     serializer_class = LabTestSerializer
 
 
-class LabTestDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LabTestDetailView(OptimizedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = LabTest.objects.all()
     serializer_class = LabTestSerializer
 
@@ -34,17 +48,19 @@ class LabTestDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 from rest_framework.exceptions import PermissionDenied
 
-class LabTestPrescriptionView(generics.ListAPIView):
+class LabTestPrescriptionView(ProjectionListMixin, OptimizedQuerysetMixin, generics.ListAPIView):
     """
     Doctor creates prescriptions (only via backend)
     Lab Technician can only view, not create.
+    Listed from a values() projection (lab test details joined in, one query).
     """
-    queryset = LabTestPrescription.objects.all()
+    queryset = LabTestPrescription.objects.all().order_by('-created_date')
     serializer_class = LabTestPrescriptionSerializer
+    pagination_class = KeysetPagination
 
 
 
-class LabTestPrescriptionDetailView(generics.RetrieveAPIView):
+class LabTestPrescriptionDetailView(OptimizedQuerysetMixin, generics.RetrieveAPIView):
     """
     Lab Technician can only view individual prescription.
     No edits allowed.
@@ -59,10 +75,109 @@ class LabTestPrescriptionDetailView(generics.RetrieveAPIView):
 # -----------------------
 
 class LabReportView(APIView):
+    """
+    Report with its patient, doctor, staff and all test results,
+    each flagged low/normal/high. Two queries.
+    For the lab staff who write reports and admins; doctors read their
+    patients' reports from the doctor app.
+    """
+    permission_classes = [IsAuthenticated, IsLabStaffOrAdmin]
+
     def get(self, request, pk):
         try:
-            report = LabTestReport.objects.get(report_id=pk)
-            serializer = LabTestReportSerializer(report)
+            report = report_queryset().get(report_id=pk)
+            serializer = LabTestReportDetailSerializer(report)
             return Response(serializer.data)
         except LabTestReport.DoesNotExist:
             return Response({"error": "Report not found"}, status=404)
+
+
+class LabReportBatchView(APIView):
+    """
+    GET reports/?ids=RPT001,RPT002
+    Several complete reports at once, in the requested order; unknown IDs
+    are listed under "missing". Same two queries as a single report.
+    Same roles as a single report (LabReportView).
+    """
+    permission_classes = [IsAuthenticated, IsLabStaffOrAdmin]
+
+    def get(self, request):
+        ids = list(dict.fromkeys(filter(None, request.query_params.get('ids', '').split(','))))
+        if not ids:
+            return Response({"error": "ids is required"}, status=400)
+        if len(ids) > MAX_BATCH_REPORTS:
+            return Response({"error": f"At most {MAX_BATCH_REPORTS} reports per request"}, status=400)
+
+        reports = {report.report_id: report for report in report_queryset().filter(report_id__in=ids)}
+        found = [reports[report_id] for report_id in ids if report_id in reports]
+        return Response({
+            "results": LabTestReportDetailSerializer(found, many=True).data,
+            "missing": [report_id for report_id in ids if report_id not in reports],
+        })
+
+
+# -----------------------
+# BILLING EXPORT
+# -----------------------
+
+class BillingExportView(APIView):
+    """
+    GET bills/export/?output=csv|ndjson&from=YYYY-MM-DD&to=YYYY-MM-DD
+    Streams the billing history (filtered on bill_date) for the reporting team.
+    Billing is handled by reception, like the patient and appointment exports.
+    """
+    permission_classes = [IsAuthenticated, IsReceptionStaff]
+    export_fields = [
+        'bill_id', 'patient_id', 'patient__patient_name', 'bill_date',
+        'amount_due', 'due_date', 'payment_status',
+    ]
+
+    def get(self, request):
+        file_format = export_format(request.query_params)
+        bills = Billing.objects.filter(**date_range_filter(request.query_params, 'bill_date'))
+        return export_response(bills, self.export_fields, file_format, 'bills')
+
+
+# -----------------------
+# LAB RESULT ANALYTICS
+# -----------------------
+
+class LabResultAnalyticsView(APIView):
+    """
+    GET analytics/lab-results/?from=YYYY-MM&to=YYYY-MM&doctor=<id>&lab_test=<id>
+    Per month: out-of-range counts and value percentiles per lab test and
+    per (doctor, lab test). Defaults to the current month.
+    Results of every doctor's patients, so doctors and admins only.
+    """
+    permission_classes = [IsAuthenticated, IsDoctorOrAdmin]
+    max_months = 24
+
+    def get(self, request):
+        this_month = timezone.localdate().replace(day=1)
+        try:
+            first = parse_month(request.query_params['from']) if 'from' in request.query_params else this_month
+            last = parse_month(request.query_params['to']) if 'to' in request.query_params else max(first, this_month)
+        except ValueError:
+            return Response({"error": "from/to must be YYYY-MM"}, status=400)
+        months = list(month_range(first, last))
+        if not months or len(months) > self.max_months:
+            return Response({"error": f"Ask for 1 to {self.max_months} months"}, status=400)
+
+        try:
+            require_numpy()
+        except ImproperlyConfigured as exc:
+            return Response({"error": str(exc)}, status=503)
+
+        doctor_id = request.query_params.get('doctor')
+        lab_test_id = request.query_params.get('lab_test')
+        results = []
+        for month in months:
+            summary = month_summary(month)
+            by_test = [row for row in summary['by_test'] if not lab_test_id or row['lab_test_id'] == lab_test_id]
+            by_doctor_test = [
+                row for row in summary['by_doctor_test']
+                if (not lab_test_id or row['lab_test_id'] == lab_test_id)
+                and (not doctor_id or row['doctor_id'] == doctor_id)
+            ]
+            results.append({**summary, 'by_test': by_test, 'by_doctor_test': by_doctor_test})
+        return Response({"results": results})
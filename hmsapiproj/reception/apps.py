@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ReceptionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reception'
+    # Loads signals.py (doctor directory cache invalidation) when the app starts.
+    def ready(self):
+        import reception.signals
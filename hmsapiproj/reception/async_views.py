@@ -0,0 +1,43 @@
+from django.http import HttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.settings import api_settings
+
+from apibackendapp.asyncapi import async_api_view, render, require_role
+from apibackendapp.models import Patient
+from apibackendapp.roles import RECEPTION
+from .directory import aget_directory, filter_by_specialization, make_etag
+from .permissions import IsReceptionStaff
+from .serializers import PatientSerializer
+
+# Async (ASGI) versions of the busiest read endpoints of views.py.
+# Same permissions and response bodies; see apibackendapp/asyncapi.py.
+
+
+@async_api_view
+async def patient_detail(request, pk):
+    """GET async/patients/<pk>/ - PatientViewSet retrieve."""
+    await require_role(request.user, RECEPTION, message=IsReceptionStaff.message)
+    try:
+        patient = await Patient.objects.aget(pk=pk)
+    except Patient.DoesNotExist:
+        raise NotFound('No Patient matches the given query.')
+    return PatientSerializer(patient).data
+
+
+@async_api_view
+async def doctor_directory(request):
+    """GET async/doctors/ - DoctorViewSet list, from the cached doctor directory."""
+    version, entries = await aget_directory()
+
+    etag = make_etag(version, request.META.get('QUERY_STRING', ''))
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponse(status=304, headers={'ETag': etag})
+
+    entries = filter_by_specialization(entries, request.query_params.get('specialization'))
+    doctors = [entry['data'] for entry in entries]
+
+    # The list is already in memory, so the default paginator needs no query
+    paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+    page = paginator.paginate_queryset(doctors, request)
+    data = paginator.get_paginated_response(page).data if page is not None else doctors
+    return render(data, headers={'ETag': etag})
@@ -0,0 +1,97 @@
+from collections import defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from apibackendapp.models import Patient, Doctor, Appointment
+from apibackendapp.utils import allocate_ids, allocate_token_numbers, ensure_token_counter, token_day
+from doctor.queue import publish_appointments, ADDED
+
+# Largest booking list accepted in one request
+MAX_BULK_APPOINTMENTS = 1000
+
+
+class BulkAppointmentItemSerializer(serializers.Serializer):
+    """
+    One entry of a bulk booking. Patient and doctor are plain IDs here;
+    book_appointments() checks them for the whole list with one query per model.
+    """
+    patient = serializers.CharField(max_length=20)
+    doctor = serializers.CharField(max_length=20)
+    appointment_date = serializers.DateTimeField(required=False, allow_null=True)
+
+
+def _existing_ids(model, ids):
+    return set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+
+def book_appointments(items):
+    """
+    Books a list of {'patient', 'doctor', 'appointment_date'} dicts.
+
+    Returns one result per item, in input order: the created Appointment, or
+    a dict of validation errors. Valid items are saved together in a single
+    transaction; invalid ones are skipped. Each (doctor, day) group gets its
+    token numbers from one counter update, in input order.
+    """
+    validator = BulkAppointmentItemSerializer()
+    results = [None] * len(items)
+    valid = {}
+
+    for index, item in enumerate(items):
+        try:
+            valid[index] = validator.run_validation(item)
+        except serializers.ValidationError as exc:
+            results[index] = exc.detail
+
+    patient_ids = _existing_ids(Patient, {data['patient'] for data in valid.values()})
+    doctor_ids = _existing_ids(Doctor, {data['doctor'] for data in valid.values()})
+
+    now = timezone.now()
+    groups = defaultdict(list)
+    for index, data in list(valid.items()):
+        errors = {}
+        if data['patient'] not in patient_ids:
+            errors['patient'] = [f'Invalid pk "{data["patient"]}" - object does not exist.']
+        if data['doctor'] not in doctor_ids:
+            errors['doctor'] = [f'Invalid pk "{data["doctor"]}" - object does not exist.']
+        if errors:
+            results[index] = errors
+            del valid[index]
+            continue
+        data['appointment_date'] = data.get('appointment_date') or now
+        groups[data['doctor'], token_day(data['appointment_date'])].append(index)
+
+    if not valid:
+        return results
+
+    # IDs are reserved (and the tblidsequence row released) before any token
+    # counter is locked, as in AppointmentViewSet.perform_create: a booking
+    # never holds one of those locks while waiting for the other
+    appointment_ids = dict(zip(valid, allocate_ids(Appointment, len(valid))))
+    for doctor_id, day in groups:
+        ensure_token_counter(doctor_id, day)
+
+    with transaction.atomic():
+        appointments = {}
+        # Lock the counters in a fixed order so two bulk bookings cannot deadlock
+        for (doctor_id, day), indexes in sorted(groups.items()):
+            tokens = allocate_token_numbers(doctor_id, day, len(indexes))
+            for index, token_number in zip(indexes, tokens):
+                data = valid[index]
+                appointments[index] = Appointment(
+                    appointment_id=appointment_ids[index],
+                    appointment_date=data['appointment_date'],
+                    token_number=token_number,
+                    patient_id=data['patient'],
+                    doctor_id=doctor_id,
+                )
+        Appointment.objects.bulk_create(appointments.values())
+        # bulk_create sends no post_save, so tell the doctors' live queues here
+        transaction.on_commit(partial(publish_appointments, list(appointments.values()), ADDED))
+
+    for index, appointment in appointments.items():
+        results[index] = appointment
+    return results
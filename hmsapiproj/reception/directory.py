@@ -0,0 +1,106 @@
+import hashlib
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from apibackendapp.models import Doctor
+
+# Kept in the shared default cache (see apibackendapp/checks.py), so a bump
+# from any process is seen by every other one
+VERSION_KEY = 'doctor-directory:version'
+
+# Snapshot decoded by this process: {'version': ..., 'entries': [...]}
+_local_snapshot = {}
+
+
+def directory_cache_timeout():
+    """Seconds a directory snapshot is kept in the shared cache."""
+    return getattr(settings, 'DOCTOR_DIRECTORY_CACHE_TIMEOUT', 3600)
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def aget_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, uuid.uuid4().hex, None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Called when a Doctor or Specialization changes; older snapshots are never read again."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def build_entries():
+    """[{'specialization_id': ..., 'data': <DoctorListSerializer data>}, ...] ordered by name."""
+    from .serializers import DoctorListSerializer
+
+    doctors = Doctor.objects.select_related('specialization').order_by('name')
+    return [
+        {'specialization_id': doctor.specialization_id, 'data': data}
+        for doctor, data in zip(doctors, DoctorListSerializer(doctors, many=True).data)
+    ]
+
+
+def get_directory():
+    """
+    Returns (version, entries) for the current doctor directory.
+    Served from this process's memory or the shared cache; the database is
+    only queried once per version.
+    """
+    version = get_version()
+    if _local_snapshot.get('version') == version:
+        return version, _local_snapshot['entries']
+
+    key = f'doctor-directory:{version}'
+    entries = cache.get(key)
+    if entries is None:
+        entries = build_entries()
+        cache.set(key, entries, directory_cache_timeout())
+
+    _local_snapshot.update(version=version, entries=entries)
+    return version, entries
+
+
+async def aget_directory():
+    """get_directory() for async views; only a rebuild leaves the event loop."""
+    version = await aget_version()
+    if _local_snapshot.get('version') == version:
+        return version, _local_snapshot['entries']
+
+    key = f'doctor-directory:{version}'
+    entries = await cache.aget(key)
+    if entries is None:
+        entries = await sync_to_async(build_entries)()
+        await cache.aset(key, entries, directory_cache_timeout())
+
+    _local_snapshot.update(version=version, entries=entries)
+    return version, entries
+
+
+def filter_by_specialization(entries, specialization):
+    """Matches a specialization ID ('S001') or name (case-insensitive)."""
+    if not specialization:
+        return entries
+    wanted = specialization.lower()
+    return [
+        entry for entry in entries
+        if (entry['specialization_id'] or '').lower() == wanted
+        or ((entry['data'].get('specialization') or {}).get('specialization_name') or '').lower() == wanted
+    ]
+
+
+def make_etag(version, query_string):
+    """ETag for one view of the directory (version + filters/pagination params)."""
+    digest = hashlib.md5(f'{version}?{query_string}'.encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
@@ -0,0 +1,171 @@
+import codecs
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import transaction, DatabaseError
+from rest_framework import serializers
+
+from apibackendapp.models import Patient
+from apibackendapp.search import patient_search_keys
+from apibackendapp.utils import allocate_ids
+from .serializers import PatientSerializer
+
+IMPORT_CHUNK_SIZE = 1000
+# Per-row errors kept in the result; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = ('csv', 'ndjson')
+
+ENCODING = 'utf-8-sig'
+ENCODING_CHECK_BLOCK_SIZE = 64 * 1024
+
+
+class ImportFileError(ValueError):
+    """The file as a whole cannot be read; nothing was imported."""
+
+
+def guess_format(filename):
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+
+def check_encoding(binary_file, block_size=ENCODING_CHECK_BLOCK_SIZE):
+    """
+    Decodes the whole binary file once and rewinds it, raising ImportFileError
+    if it is not UTF-8. Run it before import_patients(): a bad byte found
+    while importing would stop the file after earlier chunks were saved.
+    """
+    decoder = codecs.getincrementaldecoder(ENCODING)()
+    line = 1
+    for block in iter(lambda: binary_file.read(block_size), b''):
+        try:
+            line += decoder.decode(block).count('\n')
+        except UnicodeDecodeError as exc:
+            line += block[:max(exc.start, 0)].count(b'\n')
+            raise ImportFileError(f'The file is not UTF-8 encoded (invalid byte on line {line}).')
+    try:
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        raise ImportFileError(f'The file is not UTF-8 encoded (truncated character on line {line}).')
+    binary_file.seek(0)
+
+
+def read_rows(stream, file_format):
+    """
+    Yields (line number, row dict) from a text stream without loading it all.
+    Empty CSV cells become None so optional fields validate like a missing value.
+    Unparseable rows are yielded as (line, reason string) and reading goes on.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        while True:
+            line = reader.line_num + 1
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as exc:
+                yield line, f'Row is not valid CSV: {exc}.'
+                continue
+            yield reader.line_num, {key: (value if value != '' else None) for key, value in row.items() if key}
+    elif file_format == 'ndjson':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else 'Row is not a JSON object.'
+    else:
+        raise ValueError(f"Unknown import format '{file_format}', expected one of {FORMATS}.")
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def _import_chunk(validator, chunk, result):
+    valid = []
+    for line, row in chunk:
+        if isinstance(row, str):
+            result.add_error(line, {'non_field_errors': [row]})
+            continue
+        try:
+            valid.append((line, validator.run_validation(row)))
+        except serializers.ValidationError as exc:
+            result.add_error(line, exc.detail)
+
+    if not valid:
+        return
+
+    patients = []
+    for patient_id, (line, data) in zip(allocate_ids(Patient, len(valid)), valid):
+        # bulk_create skips the pre_save receivers, so fill the search keys here
+        data.update(patient_search_keys(data['patient_name']))
+        patients.append(Patient(patient_id=patient_id, **data))
+
+    try:
+        with transaction.atomic():
+            Patient.objects.bulk_create(patients)
+    except DatabaseError as exc:
+        for line, _ in valid:
+            result.add_error(line, {'non_field_errors': [f'Chunk rejected by the database: {exc}']})
+        return
+    result.imported += len(patients)
+
+
+def import_patients(stream, file_format='csv', chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Streams patient rows from `stream` (CSV with PatientSerializer column names,
+    or one JSON object per line), validates them with PatientSerializer rules
+    and inserts each chunk with bulk_create in its own transaction.
+    Invalid rows are reported and skipped; they never abort the file.
+    `progress(result)` is called after every chunk.
+    """
+    validator = PatientSerializer()
+    result = ImportResult()
+    rows = read_rows(stream, file_format)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        _import_chunk(validator, chunk, result)
+        if progress:
+            progress(result)
+    return result
+
+
+def import_uploaded_file(uploaded_file, file_format=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    import_patients() for a Django UploadedFile (read in chunks from its temp file).
+    Raises ImportFileError, before anything is saved, if the file is not UTF-8.
+    """
+    file_format = file_format or guess_format(uploaded_file.name)
+    check_encoding(uploaded_file.file)
+    stream = io.TextIOWrapper(uploaded_file.file, encoding=ENCODING, newline='')
+    try:
+        return import_patients(stream, file_format, chunk_size)
+    finally:
+        stream.detach()
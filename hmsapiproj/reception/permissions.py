@@ -1,4 +1,5 @@
 from rest_framework import permissions
+from apibackendapp.roles import RECEPTION, has_role
 
 class IsReceptionStaff(permissions.BasePermission):
     """
@@ -18,7 +19,7 @@ class IsReceptionStaff(permissions.BasePermission):
 
         # 3. Check if the user belongs to the 'Reception' group
         #    (You must ensure a Group named 'Reception' is created in the Django Admin)
-        return request.user.groups.filter(name='Reception').exists()
+        return has_role(request.user, RECEPTION)
 
 
 class IsDoctorReadOnly(permissions.BasePermission):
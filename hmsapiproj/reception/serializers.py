@@ -4,8 +4,12 @@ from apibackendapp.models import (
     Doctor,
     Specialization,
     Appointment,
-    Billing
-    # You might also need: Billing, Staff, etc.
+    Billing,
+    # Patient timeline events
+    Consultation,
+    MedicinePrescription,
+    LabTestPrescription,
+    LabTestReport,
 )
 
 
@@ -76,8 +80,9 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
             'patient', # Expects Patient PK (e.g., 'P001')
             'doctor',  # Expects Doctor PK (e.g., 'D001')
         ]
-        # Make consultation_status read-only for creation
-        read_only_fields = ['consultation_status','appointment_id']
+        # Make consultation_status read-only for creation.
+        # token_number is assigned by AppointmentViewSet.perform_create.
+        read_only_fields = ['consultation_status','appointment_id','token_number']
 
 
 class AppointmentDetailSerializer(serializers.ModelSerializer):
@@ -115,4 +120,52 @@ class BillingSerializer(serializers.ModelSerializer):
             'billing_date',
             'payment_status',
         ]
-    read_only_fields = ['amount', 'billing_date']
\ No newline at end of file
+    read_only_fields = ['amount', 'billing_date']
+
+
+# --- Patient Timeline Serializers (reception/timeline.py) ---
+# Read-only; built from values() projections (apibackendapp/projection.py).
+
+class TimelineAppointmentSerializer(serializers.ModelSerializer):
+    doctor_name = serializers.CharField(source='doctor.name', read_only=True)
+
+    class Meta:
+        model = Appointment
+        fields = ['appointment_id', 'appointment_date', 'token_number', 'consultation_status', 'doctor', 'doctor_name']
+
+
+class TimelineConsultationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Consultation
+        fields = ['consultation_id', 'appointment', 'symptoms', 'diagnosis', 'notes', 'created_date']
+
+
+class TimelineMedicinePrescriptionSerializer(serializers.ModelSerializer):
+    medicine_name = serializers.CharField(source='medicine.medicine_name', read_only=True)
+
+    class Meta:
+        model = MedicinePrescription
+        fields = ['medicine_prescription_id', 'appointment', 'medicine', 'medicine_name', 'dosage', 'frequency', 'duration']
+
+
+class TimelineLabResultSerializer(serializers.ModelSerializer):
+    lab_test_name = serializers.CharField(source='lab_test.lab_test_name', read_only=True)
+
+    class Meta:
+        model = LabTestPrescription
+        fields = [
+            'lab_test_prescription_id', 'appointment', 'lab_test', 'lab_test_name',
+            'lab_test_value', 'remarks', 'created_date',
+        ]
+
+
+class TimelineLabReportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LabTestReport
+        fields = ['report_id', 'appointment', 'doctor', 'staff', 'report_date', 'overall_remarks', 'report_status']
+
+
+class TimelineBillSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Billing
+        fields = ['bill_id', 'bill_date', 'amount_due', 'due_date', 'payment_status']
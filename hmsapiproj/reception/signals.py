@@ -0,0 +1,17 @@
+# reception/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apibackendapp.models import Doctor, Specialization
+from .directory import bump_version
+
+
+# --- DOCTOR DIRECTORY CACHE ---
+
+@receiver([post_save, post_delete], sender=Doctor)
+@receiver([post_save, post_delete], sender=Specialization)
+def doctor_directory_changed(sender, instance, **kwargs):
+    """Any doctor or specialization change invalidates the cached directory."""
+    # After commit, so the directory is never rebuilt from the old rows under the new version
+    transaction.on_commit(bump_version)
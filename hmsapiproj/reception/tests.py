@@ -1,3 +1,320 @@
-from django.test import TestCase
+import csv
+from collections import defaultdict
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apibackendapp import utils
+from apibackendapp.checks import is_shared_cache
+from apibackendapp.models import (
+    Appointment, Billing, Consultation, Doctor, LabTest, LabTestPrescription, LabTestReport, Medicine,
+    MedicineCategory, MedicinePrescription, Patient, Specialization, Staff,
+)
+from apibackendapp.roles import RECEPTION
+from apibackendapp.tests import ListQueryCountMixin, run_concurrently
+from . import directory
+from .importer import IMPORT_CHUNK_SIZE
+
+
+class DoctorDirectoryVersionTests(TestCase):
+    def setUp(self):
+        self.specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        self.add_doctor('House')
+
+    def add_doctor(self, name):
+        Doctor.objects.create(name=name, specialization=self.specialization, user=User.objects.create_user(name))
+
+    def names(self):
+        return [entry['data']['name'] for entry in directory.get_directory()[1]]
+
+    def test_configured_cache_is_shared(self):
+        self.assertTrue(is_shared_cache())
+
+    def test_bump_from_another_process_is_seen(self):
+        self.assertEqual(self.names(), ['House'])
+
+        # Another worker saves a doctor: its bump only reaches this process through the cache
+        self.add_doctor('Wilson')
+        cache.set(directory.VERSION_KEY, 'bumped-elsewhere', None)
+
+        self.assertEqual(self.names(), ['House', 'Wilson'])
+
+
+class ListQueryCountTests(ListQueryCountMixin, TestCase):
+    def setUp(self):
+        user = User.objects.create_user('reception')
+        user.groups.add(Group.objects.create(name=RECEPTION))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        self.doctor = Doctor.objects.create(name='House', specialization=specialization, user=User.objects.create_user('house'))
+        self.add_appointments(2)
+
+    def add_appointments(self, count):
+        for _ in range(count):
+            patient = Patient.objects.create(patient_name='John Smith')
+            Appointment.objects.create(patient=patient, doctor=self.doctor, appointment_date=timezone.now())
+
+    def test_lists_run_fixed_queries(self):
+        self.assertListQueriesFlat(
+            self.client, ['/reception/patients/', '/reception/appointments/'], lambda: self.add_appointments(20),
+        )
+
+
+class PatientTimelineTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('reception')
+        user.groups.add(Group.objects.create(name=RECEPTION))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        self.doctor = Doctor.objects.create(name='House', specialization=specialization, user=User.objects.create_user('house'))
+        self.staff = Staff.objects.create(staff_id='ST001', fullname='Sara George', user=User.objects.create_user('sara'))
+        category = MedicineCategory.objects.create(medicine_category_id='MC001', medicine_category_name='Tablets')
+        self.medicine = Medicine.objects.create(medicine_id='M001', medicine_name='Paracetamol', medicine_category=category)
+        self.lab_test = LabTest.objects.create(lab_test_name='Haemoglobin', min_range=12, max_range=17)
+        self.patient = Patient.objects.create(patient_name='John Smith')
+        self.start = timezone.localtime().replace(hour=10, minute=0, second=0, microsecond=0) - timedelta(days=100)
+        self.visits = 0
+
+    def add_visits(self, patient, count):
+        """`count` daily visits, each with a consultation, medicine, lab result, lab report and bill."""
+        for _ in range(count):
+            self.visits += 1
+            moment = self.start + timedelta(days=self.visits)
+            appointment = Appointment.objects.create(patient=patient, doctor=self.doctor, appointment_date=moment)
+            Consultation.objects.create(consultation_id=f'CON{self.visits:03d}', appointment=appointment)
+            MedicinePrescription.objects.create(
+                medicine_prescription_id=f'MPR{self.visits:03d}', appointment=appointment, medicine=self.medicine,
+            )
+            LabTestPrescription.objects.create(appointment=appointment, lab_test=self.lab_test, lab_test_value='14')
+            report = LabTestReport.objects.create(
+                appointment=appointment, patient=patient, doctor=self.doctor, staff=self.staff,
+            )
+            LabTestReport.objects.filter(pk=report.pk).update(report_date=moment + timedelta(hours=6))
+            Billing.objects.create(patient=patient, bill_date=moment.date() + timedelta(days=1))
+
+    def pages(self, page_size):
+        """Every page of the patient's timeline, following the next links."""
+        pages = []
+        url = f'/reception/patients/{self.patient.pk}/timeline/?page_size={page_size}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data['results'])
+            url = response.data['next']
+        return pages
+
+    def test_events_newest_first_across_pages(self):
+        self.add_visits(self.patient, 3)
+        events = [event for page in self.pages(page_size=4) for event in page]
+        self.assertEqual(events, self.pages(page_size=100)[0])
+        self.assertEqual(len(events), 3 * 6)
+        # The latest visit: its bill (next day), report (6 hours later), then the visit's own records
+        self.assertEqual(
+            [event['type'] for event in events[:6]],
+            ['bill', 'lab_report', 'lab_result', 'medicine_prescription', 'consultation', 'appointment'],
+        )
+
+    def test_page_queries_do_not_grow_with_history(self):
+        self.add_visits(self.patient, 2)
+        url = f'/reception/patients/{self.patient.pk}/timeline/?page_size=5'
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as short_history:
+            self.client.get(url)
+        self.add_visits(self.patient, 30)
+        with CaptureQueriesContext(connection) as long_history:
+            self.client.get(url)
+        self.assertEqual(len(long_history), len(short_history))
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(f'/reception/patients/{self.patient.pk}/timeline/?cursor=nonsense')
+        self.assertEqual(response.status_code, 404)
+
+
+class PatientImportTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('reception')
+        user.groups.add(Group.objects.create(name=RECEPTION))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def upload(self, content):
+        return self.client.post('/reception/patients/import/', {
+            'file': SimpleUploadedFile('patients.csv', content, content_type='text/csv'),
+        }, format='multipart')
+
+    def test_file_that_is_not_utf8_is_rejected_before_any_chunk_is_saved(self):
+        rows = ''.join(f'Patient {number},1990-01-01\n' for number in range(IMPORT_CHUNK_SIZE + 10))
+        content = ('patient_name,date_of_birth\n' + rows).encode() + 'Jos\u00e9,1990-01-01\n'.encode('latin-1')
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f'line {IMPORT_CHUNK_SIZE + 12}', response.data['file'][0])
+        self.assertFalse(Patient.objects.exists())
+
+    def test_malformed_and_invalid_rows_are_reported_and_valid_rows_imported(self):
+        self.addCleanup(csv.field_size_limit, csv.field_size_limit(100))
+        content = (
+            'patient_name,date_of_birth\n'
+            'John Smith,1990-01-01\n'
+            f'"{"x" * 200}",1990-01-01\n'
+            'Jane Doe,not a date\n'
+            'Jos\u00e9 Garc\u00eda,\n'
+        ).encode()
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['imported'], response.data['failed']), (2, 2))
+        self.assertEqual([error['line'] for error in response.data['errors']], [3, 4])
+        self.assertIn('not valid CSV', response.data['errors'][0]['errors']['non_field_errors'][0])
+        self.assertIn('date_of_birth', response.data['errors'][1]['errors'])
+        self.assertEqual(sorted(Patient.objects.values_list('patient_name', flat=True)),
+                         ['John Smith', 'Jos\u00e9 Garc\u00eda'])
+
+
+class TokenAllocationTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('reception')
+        user.groups.add(Group.objects.create(name=RECEPTION))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        self.house, self.wilson = [
+            Doctor.objects.create(name=name, specialization=specialization, user=User.objects.create_user(name))
+            for name in ('House', 'Wilson')
+        ]
+        self.patient = Patient.objects.create(patient_name='John Smith')
+        self.day = timezone.localtime().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    def book(self, doctor, moment):
+        response = self.client.post('/reception/appointments/', {
+            'patient': self.patient.pk, 'doctor': doctor.pk, 'appointment_date': moment.isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def move(self, appointment, **changes):
+        response = self.client.patch(f"/reception/appointments/{appointment['appointment_id']}/", {
+            key: value.pk if isinstance(value, Doctor) else value.isoformat() for key, value in changes.items()
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['token_number']
+
+    def test_first_booking_continues_after_tokens_issued_without_a_counter(self):
+        Appointment.objects.create(patient=self.patient, doctor=self.house, appointment_date=self.day, token_number=7)
+        self.assertEqual(self.book(self.house, self.day)['token_number'], 8)
+        self.assertEqual(utils.allocate_token_numbers(self.house.pk, timezone.localdate(self.day), 2), range(9, 11))
+
+    def test_counter_created_by_a_concurrent_booking_is_used(self):
+        # Both bookings see no counter, as when two first bookings race
+        with mock.patch.object(QuerySet, 'exists', return_value=False):
+            self.book(self.house, self.day)
+            # The second first-booking finds the counter already inserted and bumps it
+            self.assertEqual(self.book(self.house, self.day)['token_number'], 2)
+
+    def test_moving_an_appointment_takes_a_token_in_the_new_slot(self):
+        first = self.book(self.house, self.day)
+        second = self.book(self.house, self.day)
+        self.book(self.wilson, self.day)
+
+        # Same doctor and day: the token stays
+        self.assertEqual(self.move(second, appointment_date=self.day + timedelta(hours=2)), 2)
+        self.assertEqual(self.move(first, doctor=self.wilson), 2)
+        self.assertEqual(self.move(second, appointment_date=self.day + timedelta(days=1)), 1)
+
+
+class BookingLockOrderTests(TransactionTestCase):
+    def setUp(self):
+        utils._reserved.clear()
+        self.user = User.objects.create_user('reception')
+        self.user.groups.add(Group.objects.create(name=RECEPTION))
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        self.doctor = Doctor.objects.create(name='House', specialization=specialization, user=User.objects.create_user('house'))
+        self.patient = Patient.objects.create(patient_name='John Smith')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def locks_taken(self, url, data):
+        """('ids' | 'tokens', inside a transaction?) for each counter the booking locks, in order."""
+        locks = []
+        reserve, allocate_tokens = utils._reserve, utils.allocate_token_numbers
+
+        def spy_reserve(*args):
+            locks.append(('ids', connection.in_atomic_block))
+            return reserve(*args)
+
+        def spy_tokens(*args):
+            locks.append(('tokens', connection.in_atomic_block))
+            return allocate_tokens(*args)
+
+        with mock.patch('apibackendapp.utils._reserve', spy_reserve), \
+                mock.patch('reception.views.allocate_token_numbers', spy_tokens), \
+                mock.patch('reception.booking.allocate_token_numbers', spy_tokens):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return locks
+
+    @override_settings(ID_BLOCK_SIZE=1)
+    def test_single_and_bulk_bookings_lock_in_the_same_order(self):
+        # The ID row is locked and released before the token transaction starts
+        booking = {'patient': self.patient.pk, 'doctor': self.doctor.pk}
+        expected = [('ids', False), ('tokens', True)]
+        self.assertEqual(self.locks_taken('/reception/appointments/', booking), expected)
+        self.assertEqual(self.locks_taken('/reception/appointments/bulk/', [booking, booking]), expected)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    CLERKS = 20
+    BOOKINGS = 15
+    BULK = 5
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('an in-memory SQLite database refuses concurrent writers instead of waiting')
+        # Blocks this process kept from earlier tests point into a flushed table
+        utils._reserved.clear()
+        self.user = User.objects.create_user('reception')
+        self.user.groups.add(Group.objects.create(name=RECEPTION))
+        specialization = Specialization.objects.create(specialization_id='S001', specialization_name='General')
+        self.doctors = [
+            Doctor.objects.create(name=name, specialization=specialization, user=User.objects.create_user(name))
+            for name in ('House', 'Wilson')
+        ]
+        self.patient = Patient.objects.create(patient_name='John Smith')
+        self.moment = timezone.now().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    def test_hundreds_of_concurrent_bookings_get_unique_tokens(self):
+        def book():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            for number in range(self.BOOKINGS):
+                response = client.post('/reception/appointments/', {
+                    'patient': self.patient.pk, 'doctor': self.doctors[number % 2].pk,
+                    'appointment_date': self.moment.isoformat(),
+                }, format='json')
+                self.assertEqual(response.status_code, 201, response.data)
+            # Bulk bookings take their tokens from the same counters
+            response = client.post('/reception/appointments/bulk/', [
+                {'patient': self.patient.pk, 'doctor': self.doctors[number % 2].pk,
+                 'appointment_date': self.moment.isoformat()}
+                for number in range(self.BULK)
+            ], format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+
+        self.assertEqual(run_concurrently(book, self.CLERKS), [])
+
+        tokens = defaultdict(list)
+        for doctor_id, token_number in Appointment.objects.values_list('doctor_id', 'token_number'):
+            tokens[doctor_id].append(token_number)
+        self.assertEqual(sum(map(len, tokens.values())), self.CLERKS * (self.BOOKINGS + self.BULK))
+        # Every doctor's day counts up from 1 with no token given twice or skipped
+        for doctor_tokens in tokens.values():
+            self.assertEqual(sorted(doctor_tokens), list(range(1, len(doctor_tokens) + 1)))
@@ -0,0 +1,174 @@
+import base64
+import binascii
+import heapq
+import json
+from collections import namedtuple
+from datetime import datetime, time
+from itertools import islice
+from operator import itemgetter
+
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+
+from apibackendapp.models import (
+    Appointment, Billing, Consultation, LabTestPrescription, LabTestReport, MedicinePrescription,
+)
+from apibackendapp.projection import get_projection
+from .serializers import (
+    TimelineAppointmentSerializer, TimelineBillSerializer, TimelineConsultationSerializer,
+    TimelineLabReportSerializer, TimelineLabResultSerializer, TimelineMedicinePrescriptionSerializer,
+)
+
+TIMELINE_PAGE_SIZE = 50
+MAX_TIMELINE_PAGE_SIZE = 200
+
+APPOINTMENT, CONSULTATION, MEDICINE, LAB_RESULT, LAB_REPORT, BILL = (
+    'appointment', 'consultation', 'medicine_prescription', 'lab_result', 'lab_report', 'bill',
+)
+# Order of events at the same moment, oldest first: a visit's appointment,
+# then its consultation, medicines and lab results
+RANKS = {APPOINTMENT: 0, CONSULTATION: 1, MEDICINE: 2, LAB_RESULT: 3, LAB_REPORT: 4, BILL: 5}
+SERIALIZERS = {
+    APPOINTMENT: TimelineAppointmentSerializer,
+    CONSULTATION: TimelineConsultationSerializer,
+    MEDICINE: TimelineMedicinePrescriptionSerializer,
+    LAB_RESULT: TimelineLabResultSerializer,
+    LAB_REPORT: TimelineLabReportSerializer,
+    BILL: TimelineBillSerializer,
+}
+# Records without a patient or date of their own, placed at their appointment
+VISIT_SOURCES = ((CONSULTATION, Consultation), (MEDICINE, MedicinePrescription), (LAB_RESULT, LabTestPrescription))
+
+# Sort key of an event; timelines are ordered by it, newest first
+TimelineKey = namedtuple('TimelineKey', ['moment', 'rank', 'pk'])
+
+_date_field = serializers.DateTimeField()
+
+
+def encode_cursor(key):
+    payload = json.dumps({'d': key.moment.isoformat(), 'r': key.rank, 'i': key.pk}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(encoded):
+    """TimelineKey of the last event already shown, or None for the first page."""
+    if not encoded:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+        moment = datetime.fromisoformat(payload['d'])
+        rank, pk = payload['r'], payload['i']
+        if timezone.is_naive(moment) or rank not in RANKS.values() or not isinstance(pk, str):
+            raise ValueError
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise NotFound('Invalid cursor')
+    return TimelineKey(moment, rank, pk)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _seek(column, pk_name, rank, value, cursor):
+    """Rows whose (column, rank, pk) sorts below the cursor; `value` is the cursor moment as a column value."""
+    before = Q(**{f'{column}__lt': value})
+    if rank < cursor.rank:
+        return before | Q(**{column: value})
+    if rank == cursor.rank:
+        return before | Q(**{column: value, f'{pk_name}__lt': cursor.pk})
+    return before
+
+
+def _datetime_seek(column, pk_name, rank, cursor):
+    if cursor is None:
+        return Q()
+    return _seek(column, pk_name, rank, cursor.moment, cursor)
+
+
+def _date_seek(column, pk_name, rank, cursor):
+    # A date sorts as the start of that day
+    if cursor is None:
+        return Q()
+    day = timezone.localdate(cursor.moment)
+    if _day_start(day) != cursor.moment:
+        return Q(**{f'{column}__lte': day})
+    return _seek(column, pk_name, rank, day, cursor)
+
+
+def _dated_source(queryset, event_type, column, cursor, limit, to_moment=None):
+    """
+    The first `limit` events of a source with its own date column, from one
+    range query on (patient, date, pk). `to_moment` turns a DateField value
+    into the datetime it sorts as.
+    """
+    pk_name = queryset.model._meta.pk.attname
+    rank = RANKS[event_type]
+    seek = (_date_seek if to_moment else _datetime_seek)(column, pk_name, rank, cursor)
+    rows = get_projection(SERIALIZERS[event_type]).values(
+        queryset.filter(seek).order_by(f'-{column}', f'-{pk_name}')
+    )[:limit]
+    events = []
+    for row in rows:
+        moment = row[column] if to_moment is None else to_moment(row[column])
+        events.append((TimelineKey(moment, rank, row[pk_name]), event_type, row))
+    return events
+
+
+def patient_timeline(patient_id, page_size=TIMELINE_PAGE_SIZE, cursor=None):
+    """
+    One page of a patient's history, newest first: appointments,
+    consultations, medicine prescriptions, lab results, lab reports and bills,
+    as {'type', 'date', 'data'} dicts. Returns (events, key of the last event
+    when there is a next page, else None).
+
+    Appointments, reports and bills are each read with one range query on
+    their (patient, date) index from the cursor on, at most one page long.
+    Consultations, medicine prescriptions and lab results have no patient or
+    date of their own: they sort at their appointment's time and are read
+    with one query per kind for the appointments of this page. The streams
+    are merged with a heap, so a page costs the same at any depth of history.
+    Appointments without a date (and what belongs to them) are left out.
+    """
+    limit = page_size + 1
+    appointments = _dated_source(
+        Appointment.objects.filter(patient_id=patient_id, appointment_date__isnull=False),
+        APPOINTMENT, 'appointment_date', cursor, limit,
+    )
+    streams = [appointments]
+
+    # Any visit event of this page belongs to one of these appointments:
+    # an event sorts just above its own appointment
+    visits = {row['appointment_id']: key.moment for key, _, row in appointments}
+    for event_type, model in VISIT_SOURCES:
+        if not visits:
+            break
+        pk_name = model._meta.pk.attname
+        rank = RANKS[event_type]
+        rows = get_projection(SERIALIZERS[event_type]).values(model.objects.filter(appointment_id__in=visits))
+        events = [(TimelineKey(visits[row['appointment']], rank, row[pk_name]), event_type, row) for row in rows]
+        if cursor is not None:
+            events = [event for event in events if event[0] < cursor]
+        events.sort(key=itemgetter(0), reverse=True)
+        streams.append(events)
+
+    streams.append(_dated_source(
+        LabTestReport.objects.filter(patient_id=patient_id), LAB_REPORT, 'report_date', cursor, limit,
+    ))
+    streams.append(_dated_source(
+        Billing.objects.filter(patient_id=patient_id, bill_date__isnull=False), BILL, 'bill_date', cursor, limit,
+        to_moment=_day_start,
+    ))
+
+    page = list(islice(heapq.merge(*streams, key=itemgetter(0), reverse=True), limit))
+    next_key = page[page_size - 1][0] if len(page) > page_size else None
+    events = [
+        {
+            'type': event_type,
+            'date': _date_field.to_representation(key.moment),
+            'data': get_projection(SERIALIZERS[event_type]).serialize([row])[0],
+        }
+        for key, event_type, row in page[:page_size]
+    ]
+    return events, next_key
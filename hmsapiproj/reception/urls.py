@@ -3,6 +3,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import PatientViewSet, DoctorViewSet, AppointmentViewSet
+from . import async_views
 
 # 1. Create a router instance
 router = DefaultRouter()
@@ -19,4 +20,7 @@ router.register(r'appointments', AppointmentViewSet, basename='appointment')
 # The router includes all generated URLs under the base path
 urlpatterns = [
     path('', include(router.urls)),
+    # Async versions of the busiest reads (ASGI server, hmsapiproj/asgi.py)
+    path('async/patients/<str:pk>/', async_views.patient_detail, name='async-patient-detail'),
+    path('async/doctors/', async_views.doctor_directory, name='async-doctor-list'),
 ]
@@ -2,8 +2,20 @@ from django.shortcuts import render
 
 from rest_framework.permissions import IsAuthenticated
 # Create your views here.
-from rest_framework import viewsets
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from apibackendapp.models import Patient, Doctor, Appointment
+from apibackendapp.exporting import export_response, export_format, date_range_filter
+from apibackendapp.optimizer import OptimizedQuerysetMixin
+from apibackendapp.pagination import KeysetPagination
+from apibackendapp.projection import ProjectionListMixin
+from apibackendapp.search import search_patients
+from apibackendapp.utils import allocate_token_numbers, ensure_token_counter, next_id, token_day
 from .serializers import (
     PatientSerializer,
     DoctorListSerializer,
@@ -11,8 +23,12 @@ from .serializers import (
     AppointmentDetailSerializer,
 )
 from .permissions import IsReceptionStaff, IsDoctorReadOnly
+from .directory import get_directory, filter_by_specialization, make_etag
+from .importer import import_uploaded_file, ImportFileError, FORMATS
+from .booking import book_appointments, MAX_BULK_APPOINTMENTS
+from .timeline import patient_timeline, encode_cursor, decode_cursor, TIMELINE_PAGE_SIZE, MAX_TIMELINE_PAGE_SIZE
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows Patients to be viewed or edited (Registered/Updated).
     Receptionists handle new patient registration and profile updates.
@@ -23,32 +39,139 @@ class PatientViewSet(viewsets.ModelViewSet):
     # 2. Use the standard PatientSerializer for all actions (list, create, retrieve, update)
     serializer_class = PatientSerializer
 
+    # Seek on (patient_name, patient_id) instead of OFFSET for deep pages
+    pagination_class = KeysetPagination
+
     permission_classes = [IsAuthenticated, IsReceptionStaff]  # You can add custom permissions here if needed
 
+    # Max results the search box can ask for
+    search_max_results = 100
+
+    # Columns of /patients/export/
+    export_fields = [
+        'patient_id', 'patient_name', 'date_of_birth', 'gender',
+        'contact_info', 'address', 'blood_group',
+    ]
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        GET /patients/search/?q=<text>&limit=20
+        Finds returning patients by name prefix (accent/case-insensitive),
+        similar-sounding name, phone number prefix or date of birth (YYYY-MM-DD).
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.search_max_results)
+        except ValueError:
+            limit = 20
+
+        patients = search_patients(request.query_params.get('q', ''), limit=limit)
+        serializer = self.get_serializer(patients, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """
+        GET /patients/<id>/timeline/?page_size=50
+        The patient's appointments, consultations, medicine prescriptions, lab
+        results, lab reports and bills in one list, newest first. `next` links
+        to the following page (cursor pagination); every page costs the same
+        few queries however long the history is.
+        """
+        patient = self.get_object()
+        try:
+            page_size = min(max(int(request.query_params.get('page_size', TIMELINE_PAGE_SIZE)), 1),
+                            MAX_TIMELINE_PAGE_SIZE)
+        except ValueError:
+            page_size = TIMELINE_PAGE_SIZE
+
+        cursor = decode_cursor(request.query_params.get('cursor'))
+        events, next_key = patient_timeline(patient.pk, page_size, cursor)
+        next_url = None
+        if next_key is not None:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor(next_key))
+        return Response({'next': next_url, 'results': events})
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        POST /patients/import/ (multipart, field "file", optional "format": csv|ndjson)
+        Bulk-registers patients from a legacy export. Valid rows are saved in
+        chunks; invalid rows are listed with their line number and errors.
+        """
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.data.get('format') or None
+        if file_format and file_format not in FORMATS:
+            return Response({'format': [f'Expected one of {", ".join(FORMATS)}.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = import_uploaded_file(uploaded_file, file_format)
+        except ImportFileError as exc:
+            return Response({'file': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        response_status = status.HTTP_201_CREATED if result.imported else status.HTTP_400_BAD_REQUEST
+        return Response(result.as_dict(), status=response_status)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        GET /patients/export/?output=csv|ndjson
+        Streams every patient; ?from=/?to= (YYYY-MM-DD) filter on date of birth.
+        """
+        file_format = export_format(request.query_params)
+        patients = Patient.objects.filter(**date_range_filter(request.query_params, 'date_of_birth'))
+        return export_response(patients, self.export_fields, file_format, 'patients')
+
 
-class DoctorViewSet(viewsets.ReadOnlyModelViewSet):
+class DoctorViewSet(OptimizedQuerysetMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows Doctors to be viewed.
     Receptionists need this for scheduling appointments. This is read-only.
     """
-    # 1. Fetch all Doctor objects and pre-fetch the related Specialization for efficiency
-    queryset = Doctor.objects.all().select_related('specialization').order_by('name')
+    # 1. Fetch all Doctor objects (OptimizedQuerysetMixin joins the Specialization)
+    queryset = Doctor.objects.all().order_by('name')
     
     # 2. Use the minimal DoctorListSerializer
     serializer_class = DoctorListSerializer
     
-    # You could optionally add a search filter here, e.g., to filter by specialization
-    ermission_classes = [IsAuthenticated, IsDoctorReadOnly]
+    permission_classes = [IsAuthenticated, IsDoctorReadOnly]
 
+    def list(self, request, *args, **kwargs):
+        """
+        Served from the cached doctor directory (reception/directory.py), which is
+        rebuilt only after a Doctor or Specialization changes.
+        - ?specialization=<id or name> filters the cached snapshot
+        - If-None-Match with the last ETag returns 304 Not Modified
+        """
+        version, entries = get_directory()
+
+        etag = make_etag(version, request.META.get('QUERY_STRING', ''))
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        entries = filter_by_specialization(entries, request.query_params.get('specialization'))
+        doctors = [entry['data'] for entry in entries]
+
+        page = self.paginate_queryset(doctors)
+        response = self.get_paginated_response(page) if page is not None else Response(doctors)
+        response['ETag'] = etag
+        return response
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+
+class AppointmentViewSet(ProjectionListMixin, OptimizedQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows Appointments to be viewed, created, or updated.
     Receptionists manage the appointment scheduling process.
+    The list is built from a values() projection of AppointmentDetailSerializer
+    (apibackendapp/projection.py); retrieve uses the serializer itself.
     """
-    # 1. Fetch all Appointments and pre-fetch Patient and Doctor details
-    #    (and Doctor's Specialization) for efficient detail retrieval.
-    queryset = Appointment.objects.all().select_related('patient', 'doctor', 'doctor__specialization').order_by('-appointment_date')
+    # 1. Fetch all Appointments; OptimizedQuerysetMixin joins the Patient, Doctor
+    #    and Doctor's Specialization the detail serializer embeds.
+    queryset = Appointment.objects.all().order_by('-appointment_date')
+    pagination_class = KeysetPagination
 
     # 2. Override get_serializer_class to use different serializers for different actions
     def get_serializer_class(self):
@@ -64,13 +187,87 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     
     permission_classes = [IsAuthenticated, IsReceptionStaff]
 
-    # 3. Optional: Add a method to calculate and assign the token number automatically
-    #    This is best handled in a custom manager or the serializer's create method,
-    #    but for a simple view, we can demonstrate it here.
+    # Columns of /appointments/export/ (patient and doctor names joined in)
+    export_fields = [
+        'appointment_id', 'appointment_date', 'token_number', 'consultation_status',
+        'patient_id', 'patient__patient_name', 'doctor_id', 'doctor__name',
+    ]
+
+    # 3. Assign the next token number for the doctor's day automatically.
+    #    The token comes from a locked (doctor, date) counter row, allocated in
+    #    the same transaction as the insert so concurrent bookings never share a token.
+    #    The appointment ID is reserved first, outside that transaction, like
+    #    bulk bookings do (reception/booking.py): the ID and token locks are
+    #    never held together, so the two paths cannot deadlock.
     def perform_create(self, serializer):
-        # Example logic to find the next token number for the day
-        current_date = serializer.validated_data['appointment_date'].date()
-        next_token = Appointment.objects.filter(appointment_date__date=current_date).count() + 1
-        serializer.save(token_number=next_token)
-        serializer.save()
+        appointment_date = serializer.validated_data.get('appointment_date') or timezone.now()
+        doctor = serializer.validated_data['doctor']
+        appointment_id = next_id(Appointment)
+        ensure_token_counter(doctor.pk, token_day(appointment_date))
+
+        with transaction.atomic():
+            token_number = allocate_token_numbers(doctor.pk, token_day(appointment_date))[0]
+            serializer.save(appointment_id=appointment_id, appointment_date=appointment_date, token_number=token_number)
+
+    # 4. Moving an appointment to another doctor or day gives it a token in
+    #    that doctor's day; the old one would clash with a token issued there.
+    def perform_update(self, serializer):
+        appointment = serializer.instance
+        doctor = serializer.validated_data.get('doctor', appointment.doctor)
+        appointment_date = serializer.validated_data.get('appointment_date', appointment.appointment_date)
+        if appointment_date is None:
+            appointment_date = timezone.now()
+
+        old_slot = None
+        if appointment.appointment_date is not None:
+            old_slot = (appointment.doctor_id, token_day(appointment.appointment_date))
+        if (doctor.pk, token_day(appointment_date)) == old_slot:
+            serializer.save()
+            return
+
+        ensure_token_counter(doctor.pk, token_day(appointment_date))
+        with transaction.atomic():
+            token_number = allocate_token_numbers(doctor.pk, token_day(appointment_date))[0]
+            serializer.save(appointment_date=appointment_date, token_number=token_number)
+
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        GET /appointments/export/?output=csv|ndjson&from=YYYY-MM-DD&to=YYYY-MM-DD
+        Streams the appointment history for reporting instead of paging through the list.
+        """
+        file_format = export_format(request.query_params)
+        appointments = Appointment.objects.filter(
+            **date_range_filter(request.query_params, 'appointment_date', is_datetime=True)
+        )
+        return export_response(appointments, self.export_fields, file_format, 'appointments')
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        POST /appointments/bulk/ with a list of {"patient", "doctor", "appointment_date"}.
+        For camp days and follow-up scheduling. Valid items are booked in one
+        transaction; the response lists, per item and in order, either the
+        created appointment or the item's errors.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'non_field_errors': ['Expected a list of appointments.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_APPOINTMENTS:
+            return Response({'non_field_errors': [f'At most {MAX_BULK_APPOINTMENTS} appointments per request.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        created = 0
+        for index, result in enumerate(book_appointments(items)):
+            if isinstance(result, Appointment):
+                created += 1
+                results.append({'index': index, 'appointment': AppointmentCreateSerializer(result).data})
+            else:
+                results.append({'index': index, 'errors': result})
 
+        response_status = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'failed': len(results) - created, 'results': results},
+                        status=response_status)